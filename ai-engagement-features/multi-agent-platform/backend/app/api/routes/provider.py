@@ -7,6 +7,7 @@ from app.api.deps import SessionDep
 from app.core.auth.model_provider_auth import authenticate_provider
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
+from app.core.model_providers.router import get_router_stats
 from app.curd.modelprovider import (create_model_provider,
                                     delete_model_provider, get_model_provider,
                                     get_model_provider_list_with_models,
@@ -27,6 +28,14 @@ def create_provider(model_provider: ModelProviderCreate, session: SessionDep):
     return create_model_provider(session, model_provider)
 
 
+@router.get("/router/stats")
+def read_router_stats() -> list[dict[str, Any]]:
+    """
+    Load, latency and circuit breaker state of the routed model endpoints.
+    """
+    return get_router_stats()
+
+
 @router.get("/{model_provider_id}", response_model=ModelProviderOut)
 def read_provider(
     model_provider_id: int,
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import func, select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.workflow.utils.subgraph_cache import subgraph_cache
 from app.db.models import (Message, Subgraph, SubgraphCreate, SubgraphOut,
                            SubgraphsOut, SubgraphUpdate)
 
@@ -161,6 +162,7 @@ def create_subgraph(
             session.add(existing)
             session.commit()
             session.refresh(existing)
+            subgraph_cache.invalidate(existing.id)
             return existing
         else:
             raise HTTPException(
@@ -200,6 +202,7 @@ def update_subgraph(
     session.add(subgraph)
     session.commit()
     session.refresh(subgraph)
+    subgraph_cache.invalidate(id)
     return subgraph
 
 
@@ -220,4 +223,5 @@ def delete_subgraph(
 
     session.delete(subgraph)
     session.commit()
+    subgraph_cache.invalidate(id)
     return Message(message="Subgraph deleted successfully")
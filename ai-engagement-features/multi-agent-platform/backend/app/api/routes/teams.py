@@ -290,7 +290,14 @@ async def stream(
     for graph in graphs:
         graph.config = graph.config
     return StreamingResponse(
-        generator(team, members, team_chat.messages, thread_id, team_chat.interrupt),
+        generator(
+            team,
+            members,
+            team_chat.messages,
+            thread_id,
+            team_chat.interrupt,
+            team_chat.timeout,
+        ),
         media_type="text/event-stream",
     )
 
@@ -317,6 +324,7 @@ async def public_stream(
         - `interrupt` (object, optional): Approve/reject tool or reply to an ask-human tool.
             - `decision` (str): Can be `'approved'`, `'rejected'`, or `'replied'`.
             - `tool_message` (str or null, optional): If `decision` is `'rejected'` or `'replied'`, provide a message explaining the reason for rejection or the reply.
+        - `timeout` (float, optional): Seconds within which leader routing and classifier LLM calls must finish.
     Authorization:
     - API key must be provided in the request header as `x-api-key`.
     Responses:
@@ -348,6 +356,8 @@ async def public_stream(
         member.uploads = member.uploads
     messages = [team_chat.message] if team_chat.message else []
     return StreamingResponse(
-        generator(team, members, messages, thread_id, team_chat.interrupt),
+        generator(
+            team, members, messages, thread_id, team_chat.interrupt, team_chat.timeout
+        ),
         media_type="text/event-stream",
     )
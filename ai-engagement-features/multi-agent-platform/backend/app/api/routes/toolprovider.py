@@ -5,6 +5,7 @@ from pydantic import BaseModel
 
 from app.api.deps import SessionDep
 from app.core.auth.tool_provider_auth import authenticate_tool_provider
+from app.core.credential_cache import invalidate_tool_provider_credentials
 from app.core.mcp.mcp_manage import MCPManager
 from app.curd.toolprovider import (create_tool_provider, get_tool_provider,
                                    get_tool_provider_list_with_tools,
@@ -140,6 +141,8 @@ def update_provider(
         provider.encrypt_credentials()
         session.add(provider)
         session.commit()
+        # update_tool_provider 已失效一次，加密后的提交之前可能又被缓存
+        invalidate_tool_provider_credentials()
 
     # if provider.credentials:
     #     provider.decrypt_credentials()
@@ -177,6 +180,7 @@ async def delete_provider(tool_provider_id: int, session: SessionDep):
     # 删除提供者
     session.delete(provider)
     session.commit()
+    invalidate_tool_provider_credentials()
 
     return ToolProviderOut(
         id=provider.id,
@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import ValidationError
 
 from app.core.tools.api_tool import ToolDefinition
+from app.core.tools.tool_cache import get_tool_cache_stats
 from app.core.tools.tool_invoker import ToolInvokeResponse, invoke_tool
 from app.curd.tool import (_create_tool, _delete_tool, _update_tool,
                            get_all_tools, get_tools_by_provider,
@@ -109,6 +110,14 @@ async def invoke_tools(tool_id: int, tool_name: str, args: dict) -> ToolInvokeRe
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/cache/stats")
+def read_tool_cache_stats() -> dict[str, dict[str, int]]:
+    """
+    Hit/miss/bypass counters of the tool response caches in this process.
+    """
+    return get_tool_cache_stats()
+
+
 @router.patch("/{tool_id}/input-parameters")
 def update_tool_input_parameters(
     tool_id: int,
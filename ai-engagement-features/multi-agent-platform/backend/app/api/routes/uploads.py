@@ -1,6 +1,8 @@
+import asyncio
 import logging
 import os
 import shutil
+import time
 import uuid
 from datetime import datetime
 from tempfile import NamedTemporaryFile
@@ -16,6 +18,8 @@ from starlette import status
 
 from app.api.deps import CurrentUser, SessionDep, check_team_permission
 from app.core.config import settings
+from app.core.rag.qdrant import get_shared_qdrant_store
+from app.core.rag.retrieval_cache import retrieval_cache
 from app.core.security import resource_manager
 from app.db.models import (ActionType, Message, ResourceType, Upload,
                            UploadCreate, UploadOut, UploadsOut, UploadStatus,
@@ -424,6 +428,90 @@ async def search_upload(
     return {"task_id": task.id}
 
 
+@router.post("/{upload_id}/search/sync")
+async def search_upload_sync(
+    upload_id: int,
+    current_user: CurrentUser,
+    search_params: dict[str, Any],
+    session: SessionDep,
+):
+    """
+    Search within a specific upload and return the results inline.
+    Full-text and hybrid searches scan the whole upload in Python, so they
+    are still handed to Celery and return a task id to poll.
+    """
+    # 检查权限
+    check_team_permission(
+        session=session,
+        current_user=current_user,
+        resource_type=ResourceType.UPLOAD,
+        action_type=ActionType.READ,
+    )
+
+    upload = session.get(Upload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    search_type = search_params.get("search_type", "vector")
+    if search_type not in ["vector", "fulltext", "hybrid"]:
+        raise HTTPException(status_code=400, detail="Invalid search type")
+
+    query = search_params["query"]
+    top_k = search_params.get("top_k", 5)
+    score_threshold = search_params.get("score_threshold", 0.5)
+
+    if search_type != "vector":
+        task = perform_search.delay(
+            current_user.id, upload_id, query, search_type, top_k, score_threshold
+        )
+        return {"status": "pending", "task_id": task.id}
+
+    start = time.perf_counter()
+    timing: dict[str, Any] = {"cached": True}
+    # 首次调用时初始化 embedding 模型和 Qdrant 连接，之后进程内复用
+    qdrant_store = await asyncio.to_thread(get_shared_qdrant_store)
+
+    async def search():
+        timing["cached"] = False
+        embed_start = time.perf_counter()
+        query_vector = await qdrant_store.embedding_model.aembed_query(query)
+        search_start = time.perf_counter()
+        documents = await qdrant_store.avector_search(
+            current_user.id,
+            [upload_id],
+            top_k=top_k,
+            score_threshold=score_threshold,
+            query_vector=query_vector,
+        )
+        timing["embedding_ms"] = round((search_start - embed_start) * 1000, 2)
+        timing["search_ms"] = round((time.perf_counter() - search_start) * 1000, 2)
+        return documents
+
+    try:
+        results = await retrieval_cache.aget_or_search(
+            current_user.id,
+            [upload_id],
+            query,
+            search_type,
+            top_k,
+            score_threshold,
+            search,
+        )
+    except Exception as e:
+        logger.error(f"Error searching upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search upload") from e
+    timing["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return {
+        "status": "completed",
+        "results": [
+            {"content": doc.page_content, "score": doc.metadata.get("score", 0)}
+            for doc in results
+        ],
+        "timing": timing,
+    }
+
+
 @router.get("/{upload_id}/search/{task_id}")
 async def get_search_results(
     task_id: str,
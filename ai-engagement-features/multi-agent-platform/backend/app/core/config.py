@@ -141,6 +141,16 @@ class Settings(BaseSettings):
     # QDRANT_URL: str = "http://127.0.0.1:6333"
 
     QDRANT_COLLECTION: str | None = "kb_uploads"
+    # collection 存储与索引配置，修改后运行 scripts/migrate_qdrant_collection.py
+    # 应用到已有的 collection
+    QDRANT_ON_DISK: bool = False  # 原始向量和 payload 存放在磁盘上
+    QDRANT_QUANTIZATION: str | None = None  # scalar | binary
+    QDRANT_QUANTIZATION_RESCORE: bool = True  # 用原始向量对候选重新打分
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+    QDRANT_HNSW_M: int | None = None  # 全部按租户过滤时可设为 0，只建租户内的图
+    QDRANT_HNSW_EF_CONSTRUCT: int | None = None
+    QDRANT_HNSW_PAYLOAD_M: int | None = None  # 为 user_id 构建租户内 HNSW 图
+    QDRANT_HNSW_EF: int | None = None  # 查询时的 ef
 
     # Embeddings配置
     EMBEDDING_PROVIDER: str = "siliconflow"
@@ -154,16 +164,104 @@ class Settings(BaseSettings):
     SPARSE_EMBEDDING_MODEL: str = (
         "sentence-transformers/all-MiniLM-L6-v2"  # 默认的稀疏嵌入模型
     )
+    # EMBEDDING_PROVIDER = "fastembed" 时使用的本地 ONNX 模型
+    FASTEMBED_MODEL: str = "BAAI/bge-small-zh-v1.5"
+    FASTEMBED_BATCH_SIZE: int = 64
+    # ONNX Runtime 线程数，None 时使用全部核心；多个 worker 进程时应按核心数均分
+    FASTEMBED_THREADS: int | None = None
+    FASTEMBED_CACHE_DIR: str = "fastembed_cache"
+    # 检索结果重排与上下文打包
+    RAG_SEARCH_TYPE: str = "similarity"  # similarity | mmr
+    RAG_RERANK_MODEL: str | None = None  # 例如 "Xenova/ms-marco-MiniLM-L-6-v2"
+    RAG_RERANK_FETCH_K: int = 20  # 启用重排/MMR 时先召回的候选数量
+    RAG_CONTEXT_TOKEN_BUDGET: int | None = None
+    RAG_DEDUP_THRESHOLD: float | None = None  # 近重复判定阈值，例如 0.85
+
     ZHIPUAI_API_KEY: str | None = None
     SILICONFLOW_API_KEY: str | None = None
     OLLAMA_BASE_URL: str | None = None
 
+    # 模型提供商的额外端点/key，JSON 格式，例如
+    # {"siliconflow": [{"api_key": "sk-..."}, {"base_url": "http://...", "api_key": "..."}]}
+    # 未填写的字段沿用数据库中的配置；配置后调用在各端点间负载均衡并自动故障转移
+    LLM_ROUTER_ENDPOINTS: dict[str, list[dict[str, str]]] = {}
+    LLM_ROUTER_FAILURE_THRESHOLD: int = 3  # 连续失败多少次后熔断
+    LLM_ROUTER_COOLDOWN: float = 30.0  # 熔断时长（秒），429 时优先使用 Retry-After
+
+    # 每个 (模型提供商, key) 的限流，例如 {"siliconflow": {"rpm": 1000, "tpm": 50000}}
+    # 配置了 REDIS_URL 时在所有 API/Celery 进程间共享，超出限额的调用排队等待
+    LLM_RATE_LIMITS: dict[str, dict[str, int]] = {}
+    LLM_RATE_LIMIT_MAX_WAIT: float = 120.0  # 排队超过该秒数后报错
+
+    # Leader 路由和分类节点的 LLM 调用超过该模型 p90 延迟时，再发一个重复请求并取先返回的结果
+    LLM_HEDGING_ENABLED: bool = False
+    # 上述调用的截止时间（秒），0 表示只受请求传入的 timeout 限制
+    LLM_INTERACTIVE_TIMEOUT: float = 0.0
+
+    # LLM 响应缓存（需要 Redis），节点通过 llm_cache 配置开启，按团队隔离
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL: int = 3600  # 秒，节点未配置 ttl 时使用
+    LLM_CACHE_SIMILARITY_ENTRIES: int = 200  # 相似度层每组前缀保留的最近 prompt 数
+    # 层级团队 FinalAnswer 节点的缓存配置，格式同节点的 llm_cache，例如 {"enabled": true}
+    LLM_CACHE_FINAL_ANSWER: dict[str, Any] | None = None
+
+    # 进程内合并并发的相同 LLM 调用和可缓存工具调用：在进行中的调用开始后该秒数内
+    # 到达的相同调用共享其结果（流式调用共享 token 流），0 表示关闭
+    SINGLE_FLIGHT_WINDOW: float = 0.0
+
+    # 解密后的工具/模型提供商凭据在进程内缓存的秒数，0 表示不缓存
+    CREDENTIAL_CACHE_TTL: float = 60.0
+    CREDENTIAL_CACHE_MAX_ENTRIES: int = 256
+
+    # 按 app/core/tools/manifest.json 延迟导入内置工具，关闭后启动时导入全部工具包
+    TOOL_MANIFEST_ENABLED: bool = True
+
+    # 工具响应缓存总开关，各工具的缓存策略在工具提供商的 get_cache_config 中声明
+    TOOL_CACHE_ENABLED: bool = True
+
+    # 自定义 API 工具的 HTTP 请求
+    API_TOOL_TIMEOUT: float = 30.0
+    API_TOOL_CONNECT_TIMEOUT: float = 5.0
+    API_TOOL_MAX_RETRIES: int = 2  # 仅对 GET/PUT/DELETE 重试
+    API_TOOL_RETRY_BACKOFF: float = 0.5
+    API_TOOL_MAX_CONNECTIONS: int = 20  # 每个 host 的连接池大小
+    API_TOOL_MAX_RESPONSE_BYTES: int = 2 * 1024 * 1024
+
     # Celery
     CELERY_BROKER_URL: str | None = None
     CELERY_RESULT_BACKEND: str | None = None
+
+    # 跨进程共享状态使用的 Redis，未配置时回退到 redis:// 形式的 CELERY_BROKER_URL
+    REDIS_URL: str | None = None
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def SHARED_REDIS_URL(self) -> str | None:
+        if self.REDIS_URL:
+            return self.REDIS_URL
+        broker_url = self.CELERY_BROKER_URL or ""
+        return broker_url if broker_url.startswith(("redis://", "rediss://")) else None
+
+    RETRIEVAL_CACHE_ENABLED: bool = True
+    RETRIEVAL_CACHE_TTL: int = 600  # 秒
     MAX_UPLOAD_SIZE: int = 50_000_000
 
+    # 发送给多模态模型前缩小并重新编码聊天图片（data URL）
+    IMAGE_PREPROCESSING_ENABLED: bool = True
+    # 默认的有效分辨率（长边、短边，像素），超过后模型会自行缩小
+    IMAGE_MAX_LONG_SIDE: int = 2048
+    IMAGE_MAX_SHORT_SIDE: int = 768
+    # 按模型覆盖有效分辨率，例如 {"glm-4v": [1120, 1120]}
+    IMAGE_MODEL_RESOLUTIONS: dict[str, list[int]] = {}
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_CACHE_MAX_ENTRIES: int = 64  # 按内容哈希缓存的处理结果数
+    # 原图按内容哈希保存的目录（多个 worker 时应为共享存储），None 表示不保存。
+    # 消息的 additional_kwargs["original_image"] 记录原图的哈希
+    IMAGE_ORIGINALS_DIR: str | None = None
+
     RECURSION_LIMIT: int = 25
+    # CrewAI 节点同时运行的 crew 数量上限（每个 crew 占用一个线程）
+    CREWAI_MAX_WORKERS: int = 4
     TAVILY_API_KEY: str | None = None
 
     OPENAI_API_KEY: str | None = None
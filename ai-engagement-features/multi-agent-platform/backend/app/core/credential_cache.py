@@ -0,0 +1,107 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 缓存的命名空间，写入对应提供商时按命名空间失效
+TOOL_PROVIDER = "tool_provider"
+MODEL_PROVIDER = "model_provider"
+MODEL = "model"
+
+
+def _zero(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+class CredentialCache:
+    """Short-lived in-process cache of decrypted provider secrets.
+
+    Values are kept as JSON in a bytearray that is overwritten with zeros when
+    the entry expires, is evicted or invalidated, so decrypted secrets do not
+    outlive the TTL in this cache. Writes through app/curd invalidate the
+    affected namespace in the writing process; other processes (e.g. Celery
+    workers) pick up changes when their entries expire.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple[str, str], tuple[float, bytearray]] = (
+            OrderedDict()
+        )
+        # 每个命名空间的失效计数，防止失效前开始的加载写回旧值
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        _, buffer = self._entries.pop(key)
+        _zero(buffer)
+
+    def _get(self, key: tuple[str, str]) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, json.loads(entry[1])
+
+    def _set(self, key: tuple[str, str], value: Any, generation: int) -> None:
+        buffer = bytearray(json.dumps(value).encode())
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                _zero(buffer)
+                return
+            if key in self._entries:
+                self._drop(key)
+            expires_at = time.monotonic() + settings.CREDENTIAL_CACHE_TTL
+            self._entries[key] = (expires_at, buffer)
+            while len(self._entries) > settings.CREDENTIAL_CACHE_MAX_ENTRIES:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_load(self, namespace: str, name: str, load: Callable[[], T]) -> T:
+        """Return the cached value or call ``load`` (DB query + decryption).
+
+        ``load`` must return a JSON-serializable value; exceptions propagate
+        and nothing is cached.
+        """
+        if settings.CREDENTIAL_CACHE_TTL <= 0:
+            return load()
+        key = (namespace, name)
+        hit, value = self._get(key)
+        if hit:
+            return value
+        with self._lock:
+            generation = self._generations.get(namespace, 0)
+        value = load()
+        self._set(key, value, generation)
+        return value
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                self._drop(key)
+        logger.debug(f"Invalidated cached credentials: {namespace}")
+
+
+credential_cache = CredentialCache()
+
+
+def invalidate_tool_provider_credentials() -> None:
+    credential_cache.invalidate(TOOL_PROVIDER)
+
+
+def invalidate_model_provider_credentials() -> None:
+    # 模型信息中包含所属提供商的 api_key 和 base_url，一并失效
+    credential_cache.invalidate(MODEL_PROVIDER)
+    credential_cache.invalidate(MODEL)
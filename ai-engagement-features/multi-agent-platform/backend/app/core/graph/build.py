@@ -1,4 +1,5 @@
 import asyncio
+import time
 from collections import defaultdict, deque
 from collections.abc import AsyncGenerator, Hashable, Mapping
 from functools import partial
@@ -24,6 +25,9 @@ from app.core.graph.members import (GraphLeader, GraphMember, GraphTeam,
                                     SequentialWorkerNode, SummariserNode,
                                     WorkerNode)
 from app.core.graph.messages import ChatResponse, event_to_response
+from app.core.image_processing import ORIGINAL_IMAGE_KEY, preprocess_image
+from app.core.model_providers.hedging import DEADLINE
+from app.core.model_providers.response_cache import llm_cache_scope
 from app.core.state import GraphTool, GraphUpload
 from app.core.workflow.build_workflow import initialize_graph
 from app.db.models import (ChatMessage, Interrupt, InterruptDecision, Member,
@@ -370,6 +374,7 @@ async def create_hierarchical_graph(
                 provider=teams[leader_name].provider,
                 model=teams[leader_name].model,
                 temperature=teams[leader_name].temperature,
+                llm_cache=settings.LLM_CACHE_FINAL_ANSWER,
             ).summarise  # type: ignore[arg-type]
         ),
     )
@@ -623,9 +628,20 @@ async def generator(
     messages: list[ChatMessage],
     thread_id: str,
     interrupt: Interrupt | None = None,
+    timeout: float | None = None,
 ) -> AsyncGenerator[Any, Any]:
     """Create the graph and stream responses as JSON."""
 
+    # 图片在进入图之前缩小，避免原图写入消息和 checkpoint；消息中记录原图的哈希
+    image_digests: dict[int, str] = {}
+    for index, message in enumerate(messages):
+        if message.imgdata:
+            message.imgdata, digest = await asyncio.to_thread(
+                preprocess_image, message.imgdata
+            )
+            if digest:
+                image_digests[index] = digest
+
     formatted_messages = [
         (
             HumanMessage(
@@ -638,12 +654,19 @@ async def generator(
                     else message.content
                 ),
                 name="user",
+                additional_kwargs=(
+                    {ORIGINAL_IMAGE_KEY: image_digests[index]}
+                    if index in image_digests
+                    else {}
+                ),
             )
             if message.type == "human"
             else AIMessage(content=message.content)
         )
-        for message in messages
+        for index, message in enumerate(messages)
     ]
+    # LLM 响应缓存按团队隔离，图中各节点的任务会继承该上下文
+    llm_cache_scope.set(f"team:{team.id}")
 
     try:
         async with await AsyncConnection.connect(
@@ -727,6 +750,9 @@ async def generator(
                 "configurable": {"thread_id": thread_id},
                 "recursion_limit": settings.RECURSION_LIMIT,
             }
+            if timeout:
+                # 截止时间随 config 传给各节点，见 hedging.hedged_ainvoke
+                config["configurable"][DEADLINE] = time.time() + timeout
 
             # Handle interrupt logic by orriding state
             if interrupt and interrupt.interaction_type is None:
@@ -1,18 +1,22 @@
+import asyncio
 from collections.abc import Mapping, Sequence
 from typing import Annotated, Any
 
 from langchain_core.messages import AIMessage, AnyMessage
 from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import (RunnableConfig, RunnableLambda,
-                                      RunnableSerializable)
+from langchain_core.runnables import (Runnable, RunnableConfig,
+                                      RunnableLambda, RunnableSerializable)
 from langchain_core.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from langgraph.graph import add_messages
 from typing_extensions import NotRequired, TypedDict
 
+from app.core.image_processing import preprocess_message_content
+from app.core.model_providers.hedging import hedged_ainvoke, model_key
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
+from app.core.model_providers.router import RoutedChatModel
 from app.core.state import (GraphLeader, GraphMember, GraphTeam,
                             add_or_replace_messages, format_messages)
 from app.core.workflow.utils.db_utils import get_model_info
@@ -48,6 +52,7 @@ class BaseNode:
         provider: str,
         model: str,
         temperature: float,
+        llm_cache: dict[str, Any] | None = None,
     ):
         try:
             self.model_info = get_model_info(model)
@@ -66,6 +71,7 @@ class BaseNode:
                 temperature=0,
                 api_key=self.model_info["api_key"],
                 base_url=self.model_info["base_url"],
+                llm_cache=llm_cache,
             )
 
         except ValueError:
@@ -110,10 +116,21 @@ class BaseNode:
         ):
             from langchain_core.messages import HumanMessage
 
-            temp_state = [HumanMessage(content=all_messages[-1].content, name="user")]
-            return await self.model.ainvoke(temp_state, config)
+            # 按当前模型的有效分辨率处理图片，结果按内容哈希缓存
+            content = await asyncio.to_thread(
+                preprocess_message_content,
+                all_messages[-1].content,
+                self.model_info["ai_model_name"],
+            )
+            temp_state = [HumanMessage(content=content, name="user")]
+            return await self._ainvoke(self.model, temp_state, config)
+
+        return await self._ainvoke(chain, state, config)
 
-        return await chain.ainvoke(state, config)
+    async def _ainvoke(
+        self, runnable: Runnable, input: Any, config: RunnableConfig
+    ) -> Any:
+        return await runnable.ainvoke(input, config)
 
 
 class WorkerNode(BaseNode):
@@ -329,6 +346,12 @@ class LeaderNode(BaseNode):
             },
         }
 
+    async def _ainvoke(
+        self, runnable: Runnable, input: Any, config: RunnableConfig
+    ) -> Any:
+        # 路由调用很短但决定了响应速度，使用对冲请求和截止时间
+        return await hedged_ainvoke(runnable, input, config, model_key(self.model_info))
+
     async def delegate(
         self, state: GraphTeamState, config: RunnableConfig
     ) -> dict[str, Any]:
@@ -338,7 +361,7 @@ class LeaderNode(BaseNode):
         options = list(team.members) + ["FINISH"]
         tools = [self.get_tool_definition(options)]
         # Disable default parallel tool calls from ChatOpenAI
-        if isinstance(self.model, ChatOpenAI):
+        if isinstance(self.model, (ChatOpenAI, RoutedChatModel)):
             bind_tool = self.model.bind_tools(tools=tools, parallel_tool_calls=False)
         else:
             bind_tool = self.model.bind_tools(tools=tools)
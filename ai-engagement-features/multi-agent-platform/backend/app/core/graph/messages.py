@@ -131,6 +131,18 @@ def event_to_response(
                     name=name,
                     content=output.content,
                 )
+    elif kind == "on_custom_event" and event["name"] == "crewai_step":
+        # CrewAI 中间步骤：每个步骤使用独立的 id，前端会按条展示而不是拼接
+        data = event["data"]
+        if data.get("content"):
+            node_id = data["node_id"]
+            name = get_node_label(node_id, nodes) if nodes else node_id
+            return ChatResponse(
+                type="ai",
+                id=f"{id}-{data['step']}",
+                name=name,
+                content=f"[{data['name']}] {data['content']}",
+            )
     elif kind == "on_chain_stream":
         output = event["data"]["chunk"]
         node_id = event.get("name", "")
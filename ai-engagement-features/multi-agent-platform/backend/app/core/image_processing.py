@@ -0,0 +1,205 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from PIL import ExifTags, Image, ImageOps
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_URL_PREFIX = "data:"
+# 消息 additional_kwargs 中记录原图内容哈希的键
+ORIGINAL_IMAGE_KEY = "original_image"
+# 原图扩展名，按解码出的格式保存
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+
+
+def get_image_resolution(model: str | None = None) -> tuple[int, int]:
+    """(long side, short side) beyond which the model gains nothing"""
+    resolution = settings.IMAGE_MODEL_RESOLUTIONS.get(model or "")
+    if resolution:
+        return resolution[0], resolution[1]
+    return settings.IMAGE_MAX_LONG_SIDE, settings.IMAGE_MAX_SHORT_SIDE
+
+
+def _target_size(size: tuple[int, int], long_side: int, short_side: int):
+    width, height = size
+    scale = min(
+        1.0, long_side / max(width, height), short_side / max(1, min(width, height))
+    )
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def decode_data_url(url: str) -> tuple[str, bytes] | None:
+    """Split ``data:<mime>;base64,<data>`` into (mime, bytes)"""
+    if not url.startswith(DATA_URL_PREFIX) or ";base64," not in url:
+        return None
+    header, _, data = url.partition(";base64,")
+    try:
+        return header[len(DATA_URL_PREFIX) :], base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def original_image_path(digest: str) -> str | None:
+    """Path of a stored original, looked up by the digest recorded on the message"""
+    if not settings.IMAGE_ORIGINALS_DIR:
+        return None
+    for extension in (*_EXTENSIONS.values(), ".bin"):
+        path = os.path.join(settings.IMAGE_ORIGINALS_DIR, f"{digest}{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def store_original(data: bytes, image_format: str | None, digest: str) -> None:
+    """Keep the uploaded image outside of messages and checkpoints"""
+    if not settings.IMAGE_ORIGINALS_DIR:
+        return
+    extension = _EXTENSIONS.get(image_format or "", ".bin")
+    path = os.path.join(settings.IMAGE_ORIGINALS_DIR, f"{digest}{extension}")
+    if os.path.exists(path):
+        return
+    try:
+        os.makedirs(settings.IMAGE_ORIGINALS_DIR, exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+    except OSError as e:
+        logger.warning(f"Failed to store original image {digest}: {e}")
+
+
+def downscale_image(
+    data: bytes, long_side: int, short_side: int
+) -> tuple[str, bytes, str | None]:
+    """Resize to fit the resolution and re-encode; returns (mime, bytes, source format).
+
+    Images that already fit and are no larger than their re-encoded version
+    are returned unchanged.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        source_format = image.format
+        # JPEG 可以直接按缩小的尺寸解码，大图解码快很多。EXIF 旋转前方向未知，
+        # 按长边取正方形，保证解码结果两边都不小于目标尺寸
+        bound = max(_target_size(image.size, long_side, short_side))
+        image.draft("RGB", (bound, bound))
+        rotated = image.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        image = ImageOps.exif_transpose(image)
+        target = _target_size(image.size, long_side, short_side)
+        resized = image.size != target
+        if resized:
+            image = image.resize(target, Image.Resampling.LANCZOS)
+        # 带透明通道的图片保存为 PNG，其余统一为 JPEG
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            output_format, mime = "PNG", "image/png"
+            options: dict[str, Any] = {"optimize": True}
+            image = image.convert("RGBA")
+        else:
+            output_format, mime = "JPEG", "image/jpeg"
+            options = {"quality": settings.IMAGE_JPEG_QUALITY, "optimize": True}
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=output_format, **options)
+
+    encoded = buffer.getvalue()
+    unchanged = not resized and not rotated and source_format in _EXTENSIONS
+    if unchanged and len(encoded) >= len(data):
+        return Image.MIME[source_format], data, source_format
+    return mime, encoded, source_format
+
+
+class ImageCache:
+    """Processed (data URL, original digest) by (content hash, resolution), LRU bounded"""
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple[str, int, int], tuple[str, str]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, int, int]) -> tuple[str, str] | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: tuple[str, int, int], value: tuple[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.IMAGE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+
+image_cache = ImageCache()
+
+
+def preprocess_image(url: str, model: str | None = None) -> tuple[str, str | None]:
+    """Downscale and re-encode a base64 data URL for a multimodal model.
+
+    Returns the processed URL and the SHA-256 of the original image, under
+    which it is kept in IMAGE_ORIGINALS_DIR. Remote URLs are returned as is
+    (the provider fetches them) and images that cannot be decoded are passed
+    through unchanged, both without a digest.
+    """
+    if not settings.IMAGE_PREPROCESSING_ENABLED:
+        return url, None
+    decoded = decode_data_url(url)
+    if decoded is None:
+        return url, None
+    _, data = decoded
+    long_side, short_side = get_image_resolution(model)
+    digest = hashlib.sha256(data).hexdigest()
+    key = (digest, long_side, short_side)
+    cached = image_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        mime, processed, source_format = downscale_image(data, long_side, short_side)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning(f"Image preprocessing skipped: {e}")
+        return url, None
+    store_original(data, source_format, digest)
+    result = f"data:{mime};base64,{base64.b64encode(processed).decode()}"
+    logger.debug(
+        f"Preprocessed image {digest[:12]}: {len(data)} -> {len(processed)} bytes"
+    )
+    image_cache.set(key, (result, digest))
+    # 结果再次经过同样的处理时（例如节点按模型再处理一次）原样返回，避免重复压缩
+    processed_digest = hashlib.sha256(processed).hexdigest()
+    image_cache.set((processed_digest, long_side, short_side), (result, digest))
+    return result, digest
+
+
+def preprocess_image_url(url: str, model: str | None = None) -> str:
+    """``preprocess_image`` without the original's digest"""
+    return preprocess_image(url, model)[0]
+
+
+def preprocess_message_content(content: Any, model: str | None = None) -> Any:
+    """Apply ``preprocess_image_url`` to the image_url parts of a message"""
+    if not isinstance(content, list):
+        return content
+    processed = []
+    for item in content:
+        if isinstance(item, dict) and item.get("type") == "image_url":
+            image_url = item.get("image_url")
+            url = image_url.get("url") if isinstance(image_url, dict) else image_url
+            if isinstance(url, str):
+                new_url = preprocess_image_url(url, model)
+                image_url = (
+                    {**image_url, "url": new_url}
+                    if isinstance(image_url, dict)
+                    else new_url
+                )
+                item = {**item, "image_url": image_url}
+        processed.append(item)
+    return processed
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.single_flight import bypass_single_flight
+
+logger = logging.getLogger(__name__)
+
+# 每个模型保留的最近延迟样本数
+LATENCY_WINDOW = 200
+# 样本太少时分位数不可靠，此时不发起对冲
+MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.9
+# 请求的截止时间（time.time() 时间戳），放在 config["configurable"] 中随图向下传递
+DEADLINE = "deadline"
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies per model"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: defaultdict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key: str, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def model_key(model_info: dict[str, Any]) -> str:
+    return f"{model_info['provider_name']}:{model_info['ai_model_name']}"
+
+
+def get_deadline(config: RunnableConfig | None, timeout: float) -> float | None:
+    """The request's deadline or ``timeout`` seconds from now, whichever is first"""
+    deadline = ((config or {}).get("configurable") or {}).get(DEADLINE)
+    if timeout > 0:
+        node_deadline = time.time() + timeout
+        deadline = node_deadline if deadline is None else min(deadline, node_deadline)
+    return deadline
+
+
+async def hedged_ainvoke(
+    runnable: Runnable,
+    input: Any,
+    config: RunnableConfig | None,
+    key: str,
+) -> Any:
+    """Invoke a short, latency-critical LLM call with hedging and a deadline.
+
+    With LLM_HEDGING_ENABLED, a call still running after the p90 latency
+    observed for ``key`` gets one duplicate; the first to finish wins and the
+    other is cancelled. On a RoutedChatModel the duplicate goes to the least
+    loaded endpoint, i.e. a fallback endpoint when one is configured. The
+    duplicate runs without callbacks so streamed events are not emitted twice.
+
+    Raises TimeoutError once the deadline (see ``get_deadline``) has passed.
+    """
+    deadline = get_deadline(config, settings.LLM_INTERACTIVE_TIMEOUT)
+    loop = asyncio.get_running_loop()
+    loop_deadline = None if deadline is None else loop.time() + deadline - time.time()
+    hedge_after = (
+        latency_tracker.percentile(key, HEDGE_PERCENTILE)
+        if settings.LLM_HEDGING_ENABLED
+        else None
+    )
+
+    async def attempt(attempt_config: RunnableConfig | None, hedge: bool) -> Any:
+        if hedge:
+            # 重复请求不能与原请求合并，否则对冲没有意义
+            bypass_single_flight.set(True)
+        start = time.monotonic()
+        result = await runnable.ainvoke(input, attempt_config)
+        latency_tracker.record(key, time.monotonic() - start)
+        return result
+
+    tasks = [asyncio.create_task(attempt(config, hedge=False))]
+    try:
+        if hedge_after is not None and (
+            loop_deadline is None or loop.time() + hedge_after < loop_deadline
+        ):
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                logger.info(f"Hedging LLM call to {key} after {hedge_after:.2f}s")
+                # callbacks 为 None 时会继承节点的回调，需显式传入空列表
+                hedge_config: RunnableConfig = {**(config or {}), "callbacks": []}
+                tasks.append(asyncio.create_task(attempt(hedge_config, hedge=True)))
+        error: BaseException | None = None
+        while tasks:
+            timeout = None if loop_deadline is None else loop_deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            done, _ = await asyncio.wait(
+                tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        if error is not None and not tasks:
+            raise error
+        raise TimeoutError(f"LLM call to {key} did not finish before its deadline")
+    finally:
+        for task in tasks:
+            task.cancel()
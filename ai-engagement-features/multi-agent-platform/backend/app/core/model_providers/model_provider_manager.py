@@ -3,6 +3,15 @@ import os
 from collections.abc import Callable
 from typing import Any
 
+from app.core.config import settings
+from app.core.model_providers.rate_limiter import rate_limiter
+from app.core.model_providers.response_cache import get_response_cache
+from app.core.model_providers.router import (
+    RoutedChatModel,
+    get_endpoint_state,
+    get_provider_endpoints,
+)
+
 
 class ModelProviderManager:
     def __init__(self):
@@ -69,16 +78,66 @@ class ModelProviderManager:
         temperature: float,
         api_key: str,
         base_url: str,
+        llm_cache: dict[str, Any] | None = None,
         **kwargs,
     ):
+        """Create the provider's chat model.
+
+        ``llm_cache`` is a node's opt-in response cache configuration, see
+        response_cache.get_response_cache.
+        """
         init_function = self.init_functions.get(provider_name)
         if init_function:
-
-            return init_function(model, temperature, api_key, base_url, **kwargs)
+            chat_model = self._init_chat_model(
+                init_function,
+                provider_name,
+                model,
+                temperature,
+                api_key,
+                base_url,
+                **kwargs,
+            )
+            cache = get_response_cache(llm_cache)
+            if cache is not None:
+                chat_model.cache = cache
+            return chat_model
         else:
             raise ValueError(
                 f"No initialization function found for provider: {provider_name}"
             )
 
+    def _init_chat_model(
+        self,
+        init_function: Callable,
+        provider_name: str,
+        model: str,
+        temperature: float,
+        api_key: str,
+        base_url: str,
+        **kwargs,
+    ):
+        endpoints = get_provider_endpoints(provider_name, api_key, base_url)
+        if (
+            len(endpoints) == 1
+            and not rate_limiter.is_limited(provider_name)
+            and settings.SINGLE_FLIGHT_WINDOW <= 0
+        ):
+            return init_function(model, temperature, api_key, base_url, **kwargs)
+
+        if len(endpoints) > 1:
+            # 多个端点时由路由层切换端点，底层客户端不再对同一端点重试。
+            # 只有一个端点（仅为限流或合并请求而包装）时保留客户端自身的重试
+            kwargs.setdefault("max_retries", 0)
+        return RoutedChatModel(
+            models=[
+                init_function(model, temperature, endpoint_key, endpoint_url, **kwargs)
+                for endpoint_url, endpoint_key in endpoints
+            ],
+            endpoints=[
+                get_endpoint_state(provider_name, endpoint_url, endpoint_key)
+                for endpoint_url, endpoint_key in endpoints
+            ],
+        )
+
 
 model_provider_manager = ModelProviderManager()
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 令牌桶的补充周期：rpm/tpm 均按每分钟计
+WINDOW_SECONDS = 60.0
+# 避免排队的调用在同一时刻一起重试
+MAX_JITTER = 0.05
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def _refill(tokens: float, updated_at: float, limit: float, now: float) -> float:
+    return min(limit, tokens + (now - updated_at) * limit / WINDOW_SECONDS)
+
+
+def _wait_time(tokens: float, cost: float, limit: float) -> float:
+    # 单次消耗超过桶容量时只要求桶是满的，否则会永远等待
+    needed = min(cost, limit)
+    return 0.0 if tokens >= needed else (needed - tokens) * WINDOW_SECONDS / limit
+
+
+class InMemoryTokenBuckets:
+    """Token buckets of this process, for single-node deployments and tests"""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._queued: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def take(self, costs: dict[str, tuple[float, float]], force: bool = False) -> float:
+        """Take ``cost`` from every bucket if all have enough tokens.
+
+        ``costs`` maps bucket keys to (limit, cost). Returns 0 when the tokens
+        were taken, otherwise the seconds until they would be available.
+        ``force`` takes the tokens unconditionally (usage reconciliation).
+        """
+        with self._lock:
+            now = time.monotonic()
+            states = {}
+            wait = 0.0
+            for key, (limit, cost) in costs.items():
+                tokens, updated_at = self._buckets.get(key, (limit, now))
+                states[key] = _refill(tokens, updated_at, limit, now)
+                wait = max(wait, _wait_time(states[key], cost, limit))
+            if force:
+                wait = 0.0
+            for key, (_, cost) in costs.items():
+                tokens = states[key] - cost if wait == 0 else states[key]
+                self._buckets[key] = (tokens, now)
+            return wait
+
+    def add_queued(self, key: str, delta: int) -> None:
+        with self._lock:
+            self._queued[key] += delta
+
+    def queued(self, key: str) -> int:
+        return self._queued.get(key, 0)
+
+
+# 与 InMemoryTokenBuckets.take 相同的逻辑，在 Redis 中原子执行。
+# 使用 Redis 的时钟，避免各进程之间的时钟偏差
+TAKE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local window = tonumber(ARGV[1])
+local force = ARGV[2] == '1'
+local wait = 0
+local states = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[1 + 2 * i])
+    local cost = tonumber(ARGV[2 + 2 * i])
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or limit
+    local updated_at = tonumber(data[2]) or now
+    tokens = math.min(limit, tokens + (now - updated_at) * limit / window)
+    states[i] = tokens
+    local needed = math.min(cost, limit)
+    if tokens < needed then
+        wait = math.max(wait, (needed - tokens) * window / limit)
+    end
+end
+if force then
+    wait = 0
+end
+for i, key in ipairs(KEYS) do
+    local tokens = states[i]
+    if wait == 0 then
+        tokens = tokens - tonumber(ARGV[2 + 2 * i])
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(window * 2))
+end
+return tostring(wait)
+"""
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by all API and Celery processes"""
+
+    QUEUED_KEY = "{}:queued"
+    # 进程异常退出时排队计数可能残留，过期后自动清除
+    QUEUED_TTL = 300
+
+    def __init__(self, redis_url: str):
+        self._client = redis.Redis.from_url(redis_url, socket_timeout=1)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, costs: dict[str, tuple[float, float]], force: bool = False) -> float:
+        args: list[float | str] = [WINDOW_SECONDS, "1" if force else "0"]
+        for limit, cost in costs.values():
+            args += [limit, cost]
+        return float(self._take(keys=list(costs), args=args))
+
+    def add_queued(self, key: str, delta: int) -> None:
+        queued_key = self.QUEUED_KEY.format(key)
+        pipeline = self._client.pipeline()
+        pipeline.incrby(queued_key, delta)
+        pipeline.expire(queued_key, self.QUEUED_TTL)
+        pipeline.execute()
+
+    def queued(self, key: str) -> int:
+        return max(0, int(self._client.get(self.QUEUED_KEY.format(key)) or 0))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits per (provider, key).
+
+    Calls over the limit wait in line instead of failing; a call that would
+    wait longer than LLM_RATE_LIMIT_MAX_WAIT raises ``RateLimitTimeout``. The
+    token cost is estimated before the call and corrected with the reported
+    usage afterwards. When Redis is unavailable the limiter falls back to
+    per-process buckets.
+    """
+
+    KEY_PREFIX = "llm_rate"
+
+    def __init__(self, redis_url: str | None):
+        self.local = InMemoryTokenBuckets()
+        self.shared = RedisTokenBuckets(redis_url) if redis_url else None
+
+    def _costs(
+        self, provider_name: str, key_id: str, requests: int, tokens: int
+    ) -> dict[str, tuple[float, float]]:
+        limits = settings.LLM_RATE_LIMITS.get(provider_name, {})
+        prefix = f"{self.KEY_PREFIX}:{provider_name}:{key_id}"
+        costs = {}
+        if limits.get("rpm"):
+            costs[f"{prefix}:rpm"] = (limits["rpm"], requests)
+        if limits.get("tpm"):
+            costs[f"{prefix}:tpm"] = (limits["tpm"], tokens)
+        return costs
+
+    def _call(self, method: str, *args):
+        if self.shared is not None:
+            try:
+                return getattr(self.shared, method)(*args)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter falling back to local buckets: {e}")
+        return getattr(self.local, method)(*args)
+
+    def _queue_key(self, provider_name: str, key_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{provider_name}:{key_id}"
+
+    def try_acquire(self, provider_name: str, key_id: str, tokens: int) -> float:
+        """Take the call's quota without waiting; returns the wait time if full"""
+        costs = self._costs(provider_name, key_id, 1, tokens)
+        return self._call("take", costs) if costs else 0.0
+
+    def _check_deadline(self, provider_name: str, wait: float, deadline: float):
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(
+                f"Rate limit of {provider_name} would delay the call by more than "
+                f"{settings.LLM_RATE_LIMIT_MAX_WAIT:g}s"
+            )
+
+    def acquire(self, provider_name: str, key_id: str, tokens: int) -> None:
+        wait = self.try_acquire(provider_name, key_id, tokens)
+        if wait == 0:
+            return
+        deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+        queue_key = self._queue_key(provider_name, key_id)
+        self._call("add_queued", queue_key, 1)
+        try:
+            while wait > 0:
+                self._check_deadline(provider_name, wait, deadline)
+                time.sleep(wait + random.uniform(0, MAX_JITTER))
+                wait = self.try_acquire(provider_name, key_id, tokens)
+        finally:
+            self._call("add_queued", queue_key, -1)
+
+    async def aacquire(self, provider_name: str, key_id: str, tokens: int) -> None:
+        wait = await asyncio.to_thread(self.try_acquire, provider_name, key_id, tokens)
+        if wait == 0:
+            return
+        deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+        queue_key = self._queue_key(provider_name, key_id)
+        await asyncio.to_thread(self._call, "add_queued", queue_key, 1)
+        try:
+            while wait > 0:
+                self._check_deadline(provider_name, wait, deadline)
+                await asyncio.sleep(wait + random.uniform(0, MAX_JITTER))
+                wait = await asyncio.to_thread(
+                    self.try_acquire, provider_name, key_id, tokens
+                )
+        finally:
+            await asyncio.to_thread(self._call, "add_queued", queue_key, -1)
+
+    def record_usage(
+        self, provider_name: str, key_id: str, estimated: int, actual: int
+    ) -> None:
+        """Charge (or refund) the difference between estimated and used tokens"""
+        costs = self._costs(provider_name, key_id, 0, actual - estimated)
+        costs = {key: cost for key, cost in costs.items() if key.endswith(":tpm")}
+        if costs and actual != estimated:
+            self._call("take", costs, True)
+
+    def queue_depth(self, provider_name: str, key_id: str) -> int:
+        """Calls currently waiting for this key's quota, across processes"""
+        return self._call("queued", self._queue_key(provider_name, key_id))
+
+    def is_limited(self, provider_name: str) -> bool:
+        return bool(settings.LLM_RATE_LIMITS.get(provider_name))
+
+
+rate_limiter = RateLimiter(settings.SHARED_REDIS_URL)
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import logging
+import warnings
+from collections.abc import Sequence
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+import redis
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 缓存按团队隔离：build.generator 在运行图之前设置，未设置时不读写缓存
+llm_cache_scope: ContextVar[str | None] = ContextVar("llm_cache_scope", default=None)
+
+_VECTOR_DTYPE = np.float32
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.sha256("\n".join(parts).encode()).digest()
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=_VECTOR_DTYPE)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+def _loads(value: str) -> Any:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LangChainBetaWarning)
+        return loads(value)
+
+
+@lru_cache(maxsize=1024)
+def _embed(provider_name: str, text: str) -> bytes:
+    # 查询未命中后写入时会再次用到同一个向量
+    from app.core.rag.embeddings import get_shared_embedding_model
+
+    embedding_model = get_shared_embedding_model(provider_name)
+    return _normalize(embedding_model.embed_query(text)).tobytes()
+
+
+class LLMResponseCache(BaseCache):
+    """Redis cache of chat model responses for deterministic nodes.
+
+    The exact tier is keyed by a hash of the model's serialized parameters
+    (model, temperature, bound tools, ...) and the rendered messages. With a
+    ``similarity_threshold`` a miss falls back to the embedding-similarity
+    tier: among recent prompts whose messages match up to the last one, the
+    response of the most similar last message is reused when its cosine
+    similarity reaches the threshold. Entries are scoped by ``llm_cache_scope``
+    (the team) and expire after ``ttl`` seconds.
+    """
+
+    KEY_PREFIX = "llm_cache"
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int,
+        similarity_threshold: float | None = None,
+    ):
+        self._client = client
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+    def _key(self, scope: str, digest: bytes) -> str:
+        return f"{self.KEY_PREFIX}:{scope}:{digest.hex()}"
+
+    def _index_key(self, scope: str, prompt: str, llm_string: str) -> str:
+        # 相似度层只比较最后一条消息，之前的消息（系统提示等）必须完全相同
+        prefix = _digest(llm_string, json.dumps(json.loads(prompt)[:-1]))
+        return f"{self.KEY_PREFIX}:{scope}:similar:{prefix.hex()}"
+
+    def _last_message_vector(self, prompt: str) -> np.ndarray | None:
+        # prompt 是 langchain_core.load.dumps 序列化的消息列表
+        messages = json.loads(prompt)
+        text = str(messages[-1]["kwargs"].get("content") or "") if messages else ""
+        if not text:
+            return None
+        try:
+            vector = _embed(settings.EMBEDDING_PROVIDER, text)
+        except Exception as e:
+            logger.warning(f"LLM cache similarity lookup skipped: {e}")
+            return None
+        return np.frombuffer(vector, dtype=_VECTOR_DTYPE)
+
+    def _find_similar(self, scope: str, prompt: str, llm_string: str) -> str | None:
+        vector = self._last_message_vector(prompt)
+        if vector is None:
+            return None
+        index_key = self._index_key(scope, prompt, llm_string)
+        best_digest, best_similarity = None, self.similarity_threshold
+        # 每个条目为 响应 key 的摘要 + 最后一条消息的归一化向量
+        for entry in self._client.lrange(index_key, 0, -1):
+            candidate = np.frombuffer(entry[_DIGEST_SIZE:], dtype=_VECTOR_DTYPE)
+            if candidate.shape != vector.shape:
+                continue
+            similarity = float(candidate @ vector)
+            if similarity >= best_similarity:
+                best_digest, best_similarity = entry[:_DIGEST_SIZE], similarity
+        if best_digest is None:
+            return None
+        logger.debug(f"LLM cache similar prompt found: {best_similarity:.4f}")
+        return self._key(scope, best_digest)
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        scope = llm_cache_scope.get()
+        if scope is None:
+            return None
+        try:
+            cached = self._client.get(self._key(scope, _digest(llm_string, prompt)))
+            if cached is None and self.similarity_threshold is not None:
+                similar_key = self._find_similar(scope, prompt, llm_string)
+                if similar_key is not None:
+                    cached = self._client.get(similar_key)
+        except redis.RedisError as e:
+            logger.warning(f"LLM cache unavailable: {e}")
+            return None
+        if cached is None:
+            return None
+        logger.debug(f"LLM cache hit: {scope}")
+        return _loads(cached.decode())
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        scope = llm_cache_scope.get()
+        if scope is None:
+            return
+        digest = _digest(llm_string, prompt)
+        vector = (
+            self._last_message_vector(prompt)
+            if self.similarity_threshold is not None
+            else None
+        )
+        try:
+            pipeline = self._client.pipeline()
+            pipeline.set(self._key(scope, digest), dumps(return_val), ex=self.ttl)
+            if vector is not None:
+                index_key = self._index_key(scope, prompt, llm_string)
+                pipeline.lpush(index_key, digest + vector.tobytes())
+                pipeline.ltrim(index_key, 0, settings.LLM_CACHE_SIMILARITY_ENTRIES - 1)
+                pipeline.expire(index_key, self.ttl)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store LLM cache entry: {e}")
+
+    async def alookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(
+        self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE
+    ) -> None:
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        scope = kwargs.get("scope") or llm_cache_scope.get()
+        if scope is None:
+            return
+        try:
+            keys = list(self._client.scan_iter(f"{self.KEY_PREFIX}:{scope}:*"))
+            if keys:
+                self._client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to clear LLM cache for {scope}: {e}")
+
+
+@lru_cache(maxsize=1)
+def _get_client() -> redis.Redis | None:
+    if not settings.LLM_CACHE_ENABLED or not settings.SHARED_REDIS_URL:
+        return None
+    return redis.Redis.from_url(settings.SHARED_REDIS_URL, socket_timeout=1)
+
+
+def get_response_cache(options: dict[str, Any] | None) -> LLMResponseCache | None:
+    """Build the cache for a node's ``llm_cache`` options, if it opted in.
+
+    ``options``: {"enabled": true, "ttl": 3600, "similarity_threshold": 0.95};
+    ``similarity_threshold`` is optional and enables the embedding tier.
+    """
+    if not options or not options.get("enabled"):
+        return None
+    client = _get_client()
+    if client is None:
+        logger.info("LLM response cache disabled: no Redis configured")
+        return None
+    return LLMResponseCache(
+        client,
+        ttl=int(options.get("ttl") or settings.LLM_CACHE_TTL),
+        similarity_threshold=options.get("similarity_threshold"),
+    )
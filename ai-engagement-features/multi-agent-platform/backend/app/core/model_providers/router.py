@@ -0,0 +1,461 @@
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+import openai
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict
+
+from app.core.config import settings
+from app.core.model_providers.rate_limiter import rate_limiter
+from app.core.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# 延迟的指数加权系数
+LATENCY_EWMA_ALPHA = 0.2
+# 这些状态码通常只影响当前 key 或端点，换一个端点重试
+FAILOVER_STATUS_CODES = frozenset({401, 403, 408, 409, 429})
+CONNECTION_ERRORS = (
+    openai.APIConnectionError,
+    httpx.TransportError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def _status_code(error: BaseException) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def should_fail_over(error: BaseException) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in FAILOVER_STATUS_CODES or status >= 500
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+def estimate_tokens(messages: list[BaseMessage]) -> int:
+    """Rough prompt size used to charge the tokens-per-minute limit up front"""
+    # 中文约 1~2 个字符一个 token，英文约 4 个，取偏保守的估计
+    return sum(len(str(message.content)) for message in messages) // 2 + 1
+
+
+def total_tokens(result: ChatResult) -> int | None:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    for generation in result.generations:
+        usage_metadata = getattr(generation.message, "usage_metadata", None)
+        if usage_metadata:
+            return usage_metadata["total_tokens"]
+    return None
+
+
+def _add_usage(used_tokens: int | None, chunk: ChatGenerationChunk) -> int | None:
+    usage_metadata = getattr(chunk.message, "usage_metadata", None)
+    if not usage_metadata:
+        return used_tokens
+    return (used_tokens or 0) + usage_metadata["total_tokens"]
+
+
+class EndpointState:
+    """Load, latency and circuit breaker state of one (base_url, api_key)"""
+
+    def __init__(self, provider_name: str, base_url: str | None, key_id: str):
+        self.provider_name = provider_name
+        self.base_url = base_url
+        self.key_id = key_id
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.failures = 0
+        self.is_open = False
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def is_available(self, now: float) -> bool:
+        if not self.is_open:
+            return True
+        # 半开：冷却结束后只放行一个探测请求
+        return now >= self.open_until and self.in_flight == 0
+
+    def score(self) -> tuple[float, int]:
+        return (self.in_flight + 1) * (self.latency or 0.0), self.in_flight
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def try_acquire(self, tokens: int) -> float:
+        return rate_limiter.try_acquire(self.provider_name, self.key_id, tokens)
+
+    def acquire(self, tokens: int) -> None:
+        if rate_limiter.is_limited(self.provider_name):
+            rate_limiter.acquire(self.provider_name, self.key_id, tokens)
+
+    async def aacquire(self, tokens: int) -> None:
+        if rate_limiter.is_limited(self.provider_name):
+            await rate_limiter.aacquire(self.provider_name, self.key_id, tokens)
+
+    def record_usage(self, estimated: int, actual: int | None) -> None:
+        if actual is not None and rate_limiter.is_limited(self.provider_name):
+            rate_limiter.record_usage(
+                self.provider_name, self.key_id, estimated, actual
+            )
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += LATENCY_EWMA_ALPHA * (elapsed - self.latency)
+            self.failures = 0
+            self.is_open = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            rate_limited = _status_code(error) == 429
+            if (
+                rate_limited
+                or self.is_open
+                or self.failures >= settings.LLM_ROUTER_FAILURE_THRESHOLD
+            ):
+                cooldown = settings.LLM_ROUTER_COOLDOWN
+                if rate_limited:
+                    cooldown = _retry_after(error) or cooldown
+                self.is_open = True
+                self.open_until = time.monotonic() + cooldown
+                logger.warning(
+                    f"Circuit opened for {self.provider_name} endpoint "
+                    f"{self.base_url} ({self.key_id}) for {cooldown:.0f}s: {error!r}"
+                )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "provider_name": self.provider_name,
+            "base_url": self.base_url,
+            "key_id": self.key_id,
+            "in_flight": self.in_flight,
+            "latency": self.latency,
+            "failures": self.failures,
+            "queued": (
+                rate_limiter.queue_depth(self.provider_name, self.key_id)
+                if rate_limiter.is_limited(self.provider_name)
+                else 0
+            ),
+            "state": (
+                "closed"
+                if not self.is_open
+                else "half_open" if time.monotonic() >= self.open_until else "open"
+            ),
+        }
+
+
+# 端点状态在进程内共享，每次构建节点时创建的模型实例都使用同一份健康信息
+_endpoints: dict[tuple[str, str | None, str], EndpointState] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint_state(
+    provider_name: str, base_url: str | None, api_key: str | None
+) -> EndpointState:
+    key_id = hashlib.sha256((api_key or "").encode()).hexdigest()[:12]
+    key = (provider_name, base_url, key_id)
+    with _endpoints_lock:
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _endpoints[key] = EndpointState(provider_name, base_url, key_id)
+        return endpoint
+
+
+def get_router_stats() -> list[dict[str, Any]]:
+    with _endpoints_lock:
+        endpoints = list(_endpoints.values())
+    return [endpoint.stats() for endpoint in endpoints]
+
+
+def get_provider_endpoints(
+    provider_name: str, api_key: str | None, base_url: str | None
+) -> list[tuple[str | None, str | None]]:
+    """The provider's own endpoint followed by LLM_ROUTER_ENDPOINTS entries"""
+    endpoints = [(base_url, api_key)]
+    for extra in settings.LLM_ROUTER_ENDPOINTS.get(provider_name, []):
+        # 未填写的字段沿用数据库中的配置，便于同一端点配置多个 key
+        endpoint = (extra.get("base_url") or base_url, extra.get("api_key") or api_key)
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that spreads calls over several endpoints of one provider.
+
+    Each call goes to the available endpoint with the fewest in-flight
+    requests weighted by observed latency. Rate limits, auth errors, 5xx and
+    connection errors open that endpoint's circuit breaker and the call is
+    retried on the next endpoint. Streaming calls only fail over before the
+    first chunk. Calls wait for the endpoint's rate-limit quota (see
+    rate_limiter) and prefer endpoints that have quota left. Concurrent
+    identical async calls share one request (see single_flight).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    models: list[BaseChatModel]
+    endpoints: list[EndpointState]
+
+    @property
+    def _llm_type(self) -> str:
+        return f"routed-{self.models[0]._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        # 底层模型的参数只有模型名和采样参数；加入提供商和端点，
+        # 避免不同提供商的同名模型共用合并请求和响应缓存
+        return {
+            **self.models[0]._identifying_params,
+            "provider_name": self.endpoints[0].provider_name,
+            "base_urls": [endpoint.base_url for endpoint in self.endpoints],
+        }
+
+    def _combine_llm_outputs(self, llm_outputs: list[dict | None]) -> dict:
+        return self.models[0]._combine_llm_outputs(llm_outputs)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        # 由底层模型把工具转换成请求参数，调用时再转发给选中的端点
+        binding = self.models[0].bind_tools(tools, **kwargs)
+        return self.bind(**binding.kwargs)
+
+    def _candidates(self) -> list[tuple[EndpointState, BaseChatModel]]:
+        now = time.monotonic()
+        pairs = list(zip(self.endpoints, self.models, strict=True))
+        random.shuffle(pairs)
+        available = [pair for pair in pairs if pair[0].is_available(now)]
+        if not available:
+            # 全部熔断时不直接失败，优先尝试最早恢复的端点
+            return sorted(pairs, key=lambda pair: pair[0].open_until)
+        return sorted(available, key=lambda pair: pair[0].score())
+
+    def _admit(
+        self, candidates: list[tuple[EndpointState, BaseChatModel]], tokens: int
+    ) -> list[tuple[EndpointState, BaseChatModel]]:
+        """Move the first endpoint with free rate-limit quota to the front.
+
+        When every endpoint is at its limit the call queues on the best one.
+        The returned first endpoint has already been charged.
+        """
+        if not rate_limiter.is_limited(candidates[0][0].provider_name):
+            return candidates
+        for index, (endpoint, _) in enumerate(candidates):
+            if endpoint.try_acquire(tokens) == 0:
+                return [candidates.pop(index)] + candidates
+        candidates[0][0].acquire(tokens)
+        return candidates
+
+    async def _aadmit(
+        self, candidates: list[tuple[EndpointState, BaseChatModel]], tokens: int
+    ) -> list[tuple[EndpointState, BaseChatModel]]:
+        if not rate_limiter.is_limited(candidates[0][0].provider_name):
+            return candidates
+        for index, (endpoint, _) in enumerate(candidates):
+            if await asyncio.to_thread(endpoint.try_acquire, tokens) == 0:
+                return [candidates.pop(index)] + candidates
+        await candidates[0][0].aacquire(tokens)
+        return candidates
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = estimate_tokens(messages)
+        candidates = self._admit(self._candidates(), tokens)
+        for index, (endpoint, model) in enumerate(candidates):
+            if index > 0:
+                endpoint.acquire(tokens)
+            start = time.monotonic()
+            try:
+                with endpoint.track():
+                    result = model._generate(
+                        messages, stop=stop, run_manager=run_manager, **kwargs
+                    )
+            except Exception as e:
+                if not should_fail_over(e):
+                    raise
+                endpoint.record_failure(e)
+                if index == len(candidates) - 1:
+                    raise
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            endpoint.record_usage(tokens, total_tokens(result))
+            return result
+        raise AssertionError("unreachable")
+
+    def _flight_key(
+        self, messages: list[BaseMessage], stop: list[str] | None, **kwargs: Any
+    ) -> str:
+        # 模型参数（含绑定的工具）和消息完全相同的调用才会合并
+        raw_key = self._get_llm_string(stop=stop, **kwargs) + dumps(messages)
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await single_flight.run(
+            self._flight_key(messages, stop, **kwargs),
+            lambda: self._agenerate_routed(messages, stop, run_manager, **kwargs),
+        )
+
+    async def _agenerate_routed(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = estimate_tokens(messages)
+        candidates = await self._aadmit(self._candidates(), tokens)
+        for index, (endpoint, model) in enumerate(candidates):
+            if index > 0:
+                await endpoint.aacquire(tokens)
+            start = time.monotonic()
+            try:
+                with endpoint.track():
+                    result = await model._agenerate(
+                        messages, stop=stop, run_manager=run_manager, **kwargs
+                    )
+            except Exception as e:
+                if not should_fail_over(e):
+                    raise
+                endpoint.record_failure(e)
+                if index == len(candidates) - 1:
+                    raise
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            await asyncio.to_thread(endpoint.record_usage, tokens, total_tokens(result))
+            return result
+        raise AssertionError("unreachable")
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = estimate_tokens(messages)
+        candidates = self._admit(self._candidates(), tokens)
+        for index, (endpoint, model) in enumerate(candidates):
+            if index > 0:
+                endpoint.acquire(tokens)
+            start = time.monotonic()
+            started = False
+            used_tokens = None
+            try:
+                with endpoint.track():
+                    for chunk in model._stream(
+                        messages, stop=stop, run_manager=run_manager, **kwargs
+                    ):
+                        if not started:
+                            # 流式调用以首个 chunk 的耗时作为延迟
+                            started = True
+                            endpoint.record_success(time.monotonic() - start)
+                        used_tokens = _add_usage(used_tokens, chunk)
+                        yield chunk
+            except Exception as e:
+                if started or not should_fail_over(e):
+                    raise
+                endpoint.record_failure(e)
+                if index == len(candidates) - 1:
+                    raise
+                continue
+            endpoint.record_usage(tokens, used_tokens)
+            return
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in single_flight.stream(
+            self._flight_key(messages, stop, **kwargs),
+            lambda: self._astream_routed(messages, stop, run_manager, **kwargs),
+        ):
+            yield chunk
+
+    async def _astream_routed(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = estimate_tokens(messages)
+        candidates = await self._aadmit(self._candidates(), tokens)
+        for index, (endpoint, model) in enumerate(candidates):
+            if index > 0:
+                await endpoint.aacquire(tokens)
+            start = time.monotonic()
+            started = False
+            used_tokens = None
+            try:
+                with endpoint.track():
+                    async for chunk in model._astream(
+                        messages, stop=stop, run_manager=run_manager, **kwargs
+                    ):
+                        if not started:
+                            started = True
+                            endpoint.record_success(time.monotonic() - start)
+                        used_tokens = _add_usage(used_tokens, chunk)
+                        yield chunk
+            except Exception as e:
+                if started or not should_fail_over(e):
+                    raise
+                endpoint.record_failure(e)
+                if index == len(candidates) - 1:
+                    raise
+                continue
+            await asyncio.to_thread(endpoint.record_usage, tokens, used_tokens)
+            return
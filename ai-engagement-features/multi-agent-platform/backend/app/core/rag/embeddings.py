@@ -1,14 +1,18 @@
+import hashlib
 import json
 import logging
+from functools import cache, lru_cache
+from typing import Any
 
 import requests
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from sqlmodel import select
 
 from app.core.config import settings
+from app.core.credential_cache import MODEL_PROVIDER, credential_cache
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
 from app.core.workflow.utils.db_utils import db_operation
@@ -26,7 +30,9 @@ def get_api_key(provider_name: str) -> str:
             raise ValueError(f"Provider {provider_name} not found")
         return provider.decrypted_api_key
 
-    return db_operation(_get_api_key)
+    return credential_cache.get_or_load(
+        MODEL_PROVIDER, provider_name, lambda: db_operation(_get_api_key)
+    )
 
 
 def get_embedding_dimension(provider_name: str, model_name: str) -> int:
@@ -133,6 +139,63 @@ class SiliconFlowEmbeddings(BaseModel, Embeddings):
         return self.embed_documents([text])[0]
 
 
+class FastEmbedEmbeddings(BaseModel, Embeddings):
+    """Batched CPU embeddings with ONNX Runtime (fastembed)"""
+
+    model_name: str
+    batch_size: int = 64
+    threads: int | None = None
+    cache_dir: str | None = None
+    dimension: int | None = None
+    _model: Any = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from fastembed import TextEmbedding
+
+        self._model = TextEmbedding(
+            model_name=self.model_name, cache_dir=self.cache_dir, threads=self.threads
+        )
+        self.dimension = len(self.embed_query("Sample text for dimension"))
+
+    class Config:
+        extra = "forbid"
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [
+            embedding.tolist()
+            for embedding in self._model.embed(texts, batch_size=self.batch_size)
+        ]
+
+    def embed_query(self, text: str) -> list[float]:
+        return next(iter(self._model.query_embed(text))).tolist()
+
+
+# 本地模型加载开销大，每个进程只加载一次
+@cache
+def _load_local_embeddings(model_name: str) -> HuggingFaceEmbeddings:
+    embedding_model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": "cpu"},
+    )
+    # 对于local模型，我们可以通过实际嵌入一个样本文本来获取维度
+    sample_embedding = embedding_model.embed_query("Sample text for dimension")
+    embedding_model.dimension = len(sample_embedding)
+    return embedding_model
+
+
+@cache
+def _load_fastembed_embeddings(
+    model_name: str, batch_size: int, threads: int | None, cache_dir: str
+) -> FastEmbedEmbeddings:
+    return FastEmbedEmbeddings(
+        model_name=model_name,
+        batch_size=batch_size,
+        threads=threads,
+        cache_dir=cache_dir,
+    )
+
+
 def get_embedding_model(model__provider_name: str) -> Embeddings:
     logger.info(f"Initializing embedding model: {model__provider_name}")
     try:
@@ -149,13 +212,14 @@ def get_embedding_model(model__provider_name: str) -> Embeddings:
             api_key = get_api_key("siliconflow")
             embedding_model = SiliconFlowEmbeddings(api_key=api_key)
         elif model__provider_name == "local":
-            embedding_model = HuggingFaceEmbeddings(
-                model_name=settings.DENSE_EMBEDDING_MODEL,
-                model_kwargs={"device": "cpu"},
+            embedding_model = _load_local_embeddings(settings.DENSE_EMBEDDING_MODEL)
+        elif model__provider_name == "fastembed":
+            embedding_model = _load_fastembed_embeddings(
+                settings.FASTEMBED_MODEL,
+                settings.FASTEMBED_BATCH_SIZE,
+                settings.FASTEMBED_THREADS,
+                settings.FASTEMBED_CACHE_DIR,
             )
-            # 对于local模型，我们可以通过实际嵌入一个样本文本来获取维度
-            sample_embedding = embedding_model.embed_query("Sample text for dimension")
-            embedding_model.dimension = len(sample_embedding)
         else:
             raise ValueError(
                 f"Unsupported embedding model pvovider: {model__provider_name}"
@@ -168,3 +232,35 @@ def get_embedding_model(model__provider_name: str) -> Embeddings:
     except Exception as e:
         logger.error(f"Error initializing embedding model: {e}", exc_info=True)
         raise
+
+
+# 使用提供商 api_key 的 embedding 模型
+API_KEY_PROVIDERS = ("openai", "zhipuai", "siliconflow")
+
+
+# 键中包含 api_key 的摘要，轮换后的旧实例会被逐出
+@lru_cache(maxsize=8)
+def _get_shared_embedding_model(
+    model__provider_name: str, credential_digest: str
+) -> Embeddings:
+    return get_embedding_model(model__provider_name)
+
+
+def embedding_credential_digest(model__provider_name: str) -> str:
+    """Digest of the provider's current API key (empty key for local models)"""
+    api_key = (
+        get_api_key(model__provider_name)
+        if model__provider_name in API_KEY_PROVIDERS
+        else None
+    )
+    return hashlib.sha256((api_key or "").encode()).hexdigest()
+
+
+def get_shared_embedding_model(model__provider_name: str) -> Embeddings:
+    """Process-wide embedding model for callers that embed on the request path.
+
+    A rotated API key (seen through credential_cache) gets a new instance.
+    """
+    return _get_shared_embedding_model(
+        model__provider_name, embedding_credential_digest(model__provider_name)
+    )
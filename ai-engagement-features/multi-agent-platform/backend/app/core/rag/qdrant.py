@@ -1,12 +1,18 @@
+import asyncio
+import hashlib
 import logging
 import math
 import re
+import threading
+import time
+import uuid
 from collections import Counter
 from collections.abc import Callable
+from weakref import WeakKeyDictionary
 
 from langchain_core.documents import Document
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models as rest
 from qdrant_client.http.models import PayloadSelectorExclude, UpdateResult
 from qdrant_client.models import Distance, VectorParams
@@ -14,16 +20,160 @@ from qdrant_client.models import Distance, VectorParams
 from app.core.config import settings
 from app.core.rag.document_processor import load_and_split_document
 from app.core.rag.embeddings import get_embedding_model
+from app.core.rag.retrieval_cache import retrieval_cache
 
 logger = logging.getLogger(__name__)
 
+# 所有检索都按 user_id 过滤，它是租户字段
+TENANT_FIELD = "metadata.user_id"
+UPLOAD_FIELD = "metadata.upload_id"
+# collection 使用未命名向量
+DEFAULT_VECTOR_NAME = ""
+# 重新向量化期间指向影子 collection 的别名后缀
+SHADOW_ALIAS_SUFFIX = "_shadow"
+# 旧版本以配置名称直接创建了 collection，切换时改用带此后缀的别名
+LEGACY_ALIAS_SUFFIX = "_active"
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2e4a-3b8d-4c57-9a1e-0d2f7b5c8e91")
+
+
+def chunk_point_ids(user_id: int, upload_id: int, docs: list[Document]) -> list[str]:
+    """Deterministic point ids derived from the chunk content hashes.
+
+    Also stores the hash in each chunk's metadata. Identical chunks within an
+    upload are told apart by their occurrence number.
+    """
+    occurrences: Counter[str] = Counter()
+    ids = []
+    for doc in docs:
+        chunk_hash = hashlib.sha256(doc.page_content.encode()).hexdigest()
+        doc.metadata["chunk_hash"] = chunk_hash
+        key = f"{user_id}:{upload_id}:{chunk_hash}:{occurrences[chunk_hash]}"
+        occurrences[chunk_hash] += 1
+        ids.append(str(uuid.uuid5(CHUNK_ID_NAMESPACE, key)))
+    return ids
+
+
+def new_collection_name(alias: str, provider: str) -> str:
+    # 物理 collection 名称记录所用的 embedding provider：{alias}__{provider}__{时间戳}
+    return f"{alias}__{provider}__{int(time.time())}"
+
+
+def collection_provider(collection_name: str) -> str | None:
+    """Embedding provider encoded in a physical collection name"""
+    parts = collection_name.rsplit("__", 2)
+    return parts[1] if len(parts) == 3 else None
+
+
+def active_alias(client: QdrantClient, alias: str) -> str:
+    """Name of the alias that points at the active collection.
+
+    This is the configured name, except for deployments created before
+    aliases were used: they have a plain collection with that name, which an
+    alias cannot replace without deleting it, so they use ``{alias}_active``.
+    """
+    aliases = {item.alias_name for item in client.get_aliases().aliases}
+    if alias in aliases:
+        return alias
+    if alias + LEGACY_ALIAS_SUFFIX in aliases or client.collection_exists(alias):
+        return alias + LEGACY_ALIAS_SUFFIX
+    return alias
+
+
+def resolve_collections(
+    client: QdrantClient, alias: str
+) -> tuple[str | None, str | None]:
+    """Physical (active, shadow) collections behind the configured name.
+
+    The configured name is an alias, or a plain collection for deployments
+    created before aliases were used (see ``active_alias``).
+    """
+    aliases = {
+        item.alias_name: item.collection_name for item in client.get_aliases().aliases
+    }
+    shadow = aliases.get(alias + SHADOW_ALIAS_SUFFIX)
+    for name in (alias, alias + LEGACY_ALIAS_SUFFIX):
+        if name in aliases:
+            return aliases[name], shadow
+    if client.collection_exists(alias):
+        return alias, shadow
+    return None, shadow
+
+
+def _quantization_config() -> rest.QuantizationConfig | None:
+    quantization = settings.QDRANT_QUANTIZATION
+    if not quantization:
+        return None
+    if quantization == "scalar":
+        return rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(
+                type=rest.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if quantization == "binary":
+        return rest.BinaryQuantization(
+            binary=rest.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unsupported Qdrant quantization: {quantization}")
+
+
+def _hnsw_config() -> rest.HnswConfigDiff | None:
+    params = {
+        "m": settings.QDRANT_HNSW_M,
+        "ef_construct": settings.QDRANT_HNSW_EF_CONSTRUCT,
+        "payload_m": settings.QDRANT_HNSW_PAYLOAD_M,
+    }
+    params = {key: value for key, value in params.items() if value is not None}
+    return rest.HnswConfigDiff(**params) if params else None
+
+
+def _search_params() -> rest.SearchParams | None:
+    quantization = (
+        rest.QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        )
+        if settings.QDRANT_QUANTIZATION
+        else None
+    )
+    if quantization is None and settings.QDRANT_HNSW_EF is None:
+        return None
+    return rest.SearchParams(hnsw_ef=settings.QDRANT_HNSW_EF, quantization=quantization)
+
+
+# 异步客户端绑定创建它的事件循环，每个事件循环共用一个，不随 QdrantStore 创建
+_async_clients: WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncQdrantClient] = (
+    WeakKeyDictionary()
+)
+_async_clients_lock = threading.Lock()
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Async client shared by every store in the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = AsyncQdrantClient(
+                url=settings.QDRANT_URL,
+                api_key=settings.QDRANT_SERVICE_API_KEY,
+                prefer_grpc=False,
+            )
+        return client
+
+
+async def close_async_qdrant_client() -> None:
+    """Close the running event loop's async client (application shutdown)"""
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
 
 class QdrantStore:
     def __init__(self) -> None:
-        self.collection_name = settings.QDRANT_COLLECTION
+        self.alias = settings.QDRANT_COLLECTION
         # self.url = "http://localhost:6333"
         self.url = settings.QDRANT_URL
-        self.embedding_model = get_embedding_model(settings.EMBEDDING_PROVIDER)
 
         logger.debug(f"Initializing QdrantStore with URL: {self.url}")
 
@@ -32,32 +182,47 @@ class QdrantStore:
         )
         logger.debug("QdrantClient initialized successfully")
 
+        self.collection_name, self.shadow_collection_name = resolve_collections(
+            self.client, self.alias
+        )
+        # 查询必须使用与 collection 相同的 embedding 模型
+        self.provider = settings.EMBEDDING_PROVIDER
+        if self.collection_name:
+            self.provider = (
+                collection_provider(self.collection_name) or settings.EMBEDDING_PROVIDER
+            )
+        if self.provider != settings.EMBEDDING_PROVIDER:
+            logger.warning(
+                f"Collection {self.collection_name} is embedded with {self.provider}, "
+                f"EMBEDDING_PROVIDER is {settings.EMBEDDING_PROVIDER}; "
+                "run the reindex_embeddings task to switch"
+            )
+        self.embedding_model = get_embedding_model(self.provider)
+        self.shadow_vector_store: QdrantVectorStore | None = None
+
         self._initialize_vector_store()
 
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        return get_async_qdrant_client()
+
     def _initialize_vector_store(self):
         try:
-            collections = self.client.get_collections().collections
-            if self.collection_name not in [
-                collection.name for collection in collections
-            ]:
+            if self.collection_name is None:
+                self.collection_name = new_collection_name(self.alias, self.provider)
                 logger.debug(f"Creating new collection: {self.collection_name}")
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.embedding_model.dimension, distance=Distance.COSINE
-                    ),
+                self.create_collection(
+                    self.collection_name, self.embedding_model.dimension
                 )
-                logger.debug("Creating payload index for user_id")
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="metadata.user_id",
-                    field_schema="integer",
-                )
-                logger.debug("Creating payload index for upload_id")
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="metadata.upload_id",
-                    field_schema="integer",
+                self.client.update_collection_aliases(
+                    change_aliases_operations=[
+                        rest.CreateAliasOperation(
+                            create_alias=rest.CreateAlias(
+                                collection_name=self.collection_name,
+                                alias_name=self.alias,
+                            )
+                        )
+                    ]
                 )
             else:
                 logger.debug(f"Using existing collection: {self.collection_name}")
@@ -70,10 +235,124 @@ class QdrantStore:
                 collection_name=self.collection_name,
                 embedding=self.embedding_model,
             )
+
+            if self.shadow_collection_name:
+                # 重新向量化进行中：新写入同时写入影子 collection
+                logger.info(
+                    f"Collection {self.alias} is being re-embedded into "
+                    f"{self.shadow_collection_name}, writing to both"
+                )
+                self.shadow_vector_store = QdrantVectorStore(
+                    client=self.client,
+                    collection_name=self.shadow_collection_name,
+                    embedding=get_embedding_model(
+                        collection_provider(self.shadow_collection_name)
+                        or settings.EMBEDDING_PROVIDER
+                    ),
+                )
         except Exception as e:
             logger.error(f"Error initializing vector store: {str(e)}", exc_info=True)
             raise
 
+    def create_collection(self, collection_name: str, dimension: int) -> None:
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(
+                size=dimension,
+                distance=Distance.COSINE,
+                on_disk=settings.QDRANT_ON_DISK,
+            ),
+            on_disk_payload=settings.QDRANT_ON_DISK,
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config(),
+        )
+        self._create_payload_indexes(collection_name)
+
+    def _create_payload_indexes(self, collection_name: str) -> None:
+        # 过滤字段只需要精确匹配，不建范围索引
+        for field_name in (TENANT_FIELD, UPLOAD_FIELD):
+            logger.debug(f"Creating payload index for {field_name}")
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=rest.IntegerIndexParams(
+                    type=rest.IntegerIndexType.INTEGER, lookup=True, range=False
+                ),
+            )
+
+    def migrate_collection_config(self) -> None:
+        """Apply the configured storage and index settings to the collection.
+
+        Qdrant rebuilds the affected segments in the background; searches keep
+        working while the optimizer runs.
+        """
+        logger.info(f"Updating configuration of collection {self.collection_name}")
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            vectors_config={
+                DEFAULT_VECTOR_NAME: rest.VectorParamsDiff(
+                    on_disk=settings.QDRANT_ON_DISK
+                )
+            },
+            collection_params=rest.CollectionParamsDiff(
+                on_disk_payload=settings.QDRANT_ON_DISK
+            ),
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config() or rest.Disabled.DISABLED,
+        )
+        self._create_payload_indexes(self.collection_name)
+
+    def _vector_stores(self) -> list[QdrantVectorStore]:
+        # 重新向量化期间写操作需要同时作用于影子 collection
+        if self.shadow_vector_store is None:
+            return [self.vector_store]
+        return [self.vector_store, self.shadow_vector_store]
+
+    def _load_documents(
+        self,
+        file_path_or_url: str,
+        upload_id: int,
+        user_id: int,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> list[Document]:
+        docs = load_and_split_document(
+            file_path_or_url, user_id, upload_id, chunk_size, chunk_overlap
+        )
+        # Ensure metadata is correctly set
+        for doc in docs:
+            doc.metadata["user_id"] = user_id
+            doc.metadata["upload_id"] = upload_id
+        return docs
+
+    def _upload_points(self, user_id: int, upload_id: int) -> dict[str, dict]:
+        """Ids and metadata of the points stored for an upload"""
+        points: dict[str, dict] = {}
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=rest.Filter(
+                    must=[
+                        rest.FieldCondition(
+                            key="metadata.user_id", match=rest.MatchValue(value=user_id)
+                        ),
+                        rest.FieldCondition(
+                            key="metadata.upload_id",
+                            match=rest.MatchValue(value=upload_id),
+                        ),
+                    ]
+                ),
+                limit=256,
+                offset=offset,
+                with_payload=rest.PayloadSelectorInclude(include=["metadata"]),
+                with_vectors=False,
+            )
+            for record in records:
+                points[str(record.id)] = (record.payload or {}).get("metadata", {})
+            if offset is None:
+                return points
+
     def add(
         self,
         file_path_or_url: str,
@@ -84,13 +363,9 @@ class QdrantStore:
         callback: Callable[[], None] | None = None,
     ) -> None:
         try:
-            docs = load_and_split_document(
-                file_path_or_url, user_id, upload_id, chunk_size, chunk_overlap
+            docs = self._load_documents(
+                file_path_or_url, upload_id, user_id, chunk_size, chunk_overlap
             )
-            # Ensure metadata is correctly set
-            for doc in docs:
-                doc.metadata["user_id"] = user_id
-                doc.metadata["upload_id"] = upload_id
 
             initial_count = self.client.count(
                 collection_name=self.collection_name,
@@ -107,7 +382,10 @@ class QdrantStore:
                 ),
             ).count
 
-            self.vector_store.add_documents(docs)
+            # 使用固定 id，重新向量化任务复制同一个点时不会产生重复
+            ids = chunk_point_ids(user_id, upload_id, docs)
+            for vector_store in self._vector_stores():
+                vector_store.add_documents(docs, ids=ids)
             final_count = self.client.count(
                 collection_name=self.collection_name,
                 count_filter=rest.Filter(
@@ -158,6 +436,11 @@ class QdrantStore:
                 points_selector=rest.Filter(**filter_condition),
             )
             logger.debug(f"Delete operation result: {result}")
+            if self.shadow_collection_name:
+                self.client.delete(
+                    collection_name=self.shadow_collection_name,
+                    points_selector=rest.Filter(**filter_condition),
+                )
 
             if isinstance(result, UpdateResult) and result.status == "completed":
                 final_count = self.client.count(
@@ -201,16 +484,75 @@ class QdrantStore:
         chunk_overlap: int = 50,
         callback: Callable[[], None] | None = None,
     ) -> None:
-        deletion_successful = self.delete(upload_id, user_id)
-        if not deletion_successful:
-            logger.warning(
-                f"Failed to delete existing documents for upload_id: {upload_id}, user_id: {user_id}. Proceeding with add operation."
+        try:
+            docs = self._load_documents(
+                file_path_or_url, upload_id, user_id, chunk_size, chunk_overlap
             )
-        self.add(file_path_or_url, upload_id, user_id, chunk_size, chunk_overlap)
-        if callback:
-            callback()
+            ids = chunk_point_ids(user_id, upload_id, docs)
+            existing = self._upload_points(user_id, upload_id)
+
+            # 只删除消失的 chunk、只向量化新增的 chunk，未变化的向量保持不动
+            new_ids = set(ids)
+            removed_ids = [point_id for point_id in existing if point_id not in new_ids]
+            added = [
+                (point_id, doc)
+                for point_id, doc in zip(ids, docs, strict=True)
+                if point_id not in existing
+            ]
+            # 内容未变但元数据（如页码）变化的 chunk 只更新 payload
+            moved = [
+                (point_id, doc)
+                for point_id, doc in zip(ids, docs, strict=True)
+                if point_id in existing and existing[point_id] != doc.metadata
+            ]
 
-    def search(self, user_id: int, upload_ids: list[int], query: str) -> list[Document]:
+            if removed_ids:
+                for vector_store in self._vector_stores():
+                    self.client.delete(
+                        collection_name=vector_store.collection_name,
+                        points_selector=rest.PointIdsList(points=removed_ids),
+                    )
+            for point_id, doc in moved:
+                self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"metadata": doc.metadata},
+                    points=[point_id],
+                )
+            if added:
+                self.vector_store.add_documents(
+                    [doc for _, doc in added], ids=[point_id for point_id, _ in added]
+                )
+            if self.shadow_vector_store is not None and (added or moved):
+                # 影子 collection 中可能还没有这些点，直接整体写入
+                self.shadow_vector_store.add_documents(
+                    [doc for _, doc in added + moved],
+                    ids=[point_id for point_id, _ in added + moved],
+                )
+
+            logger.info(
+                f"Updated upload_id: {upload_id}, user_id: {user_id}: "
+                f"{len(added)} chunks added, {len(removed_ids)} removed, "
+                f"{len(docs) - len(added)} unchanged"
+            )
+            if callback:
+                callback()
+        except Exception as e:
+            logger.error(f"Error updating document: {str(e)}", exc_info=True)
+            raise
+
+    def search(
+        self, user_id: int, upload_ids: list[int], query: str, use_cache: bool = True
+    ) -> list[Document]:
+        if use_cache:
+            return retrieval_cache.get_or_search(
+                user_id,
+                upload_ids,
+                query,
+                "similarity",
+                4,
+                None,
+                lambda: self.search(user_id, upload_ids, query, use_cache=False),
+            )
 
         query_vector = self.embedding_model.embed_query(query)
 
@@ -227,6 +569,7 @@ class QdrantStore:
             query_vector=query_vector,
             query_filter=filter_condition,
             limit=4,
+            search_params=_search_params(),
         )
 
         documents = [
@@ -239,7 +582,14 @@ class QdrantStore:
 
         return documents
 
-    def retriever(self, user_id: int, upload_id: int):
+    def retriever(
+        self,
+        user_id: int,
+        upload_id: int,
+        k: int = 5,
+        search_type: str = "similarity",
+        fetch_k: int = 20,
+    ):
         logger.debug(
             f"Creating retriever for user_id: {user_id}, upload_id: {upload_id}"
         )
@@ -249,9 +599,16 @@ class QdrantStore:
                 {"key": "metadata.upload_id", "match": {"value": upload_id}},
             ]
         }
+        search_kwargs = {"filter": filter_condition, "k": k}
+        search_params = _search_params()
+        if search_params is not None:
+            search_kwargs["search_params"] = search_params
+        if search_type == "mmr":
+            # MMR 使用 Qdrant 返回的向量计算多样性，不需要重新向量化
+            search_kwargs["fetch_k"] = max(fetch_k, k)
         retriever = self.vector_store.as_retriever(
-            search_kwargs={"filter": filter_condition, "k": 5},
-            search_type="similarity",
+            search_kwargs=search_kwargs,
+            search_type=search_type,
         )
         logger.debug(f"Retriever created: {retriever}")
         return retriever
@@ -289,7 +646,20 @@ class QdrantStore:
         query: str,
         top_k: int = 5,
         score_threshold: float = 0.5,
+        use_cache: bool = True,
     ):
+        if use_cache:
+            return retrieval_cache.get_or_search(
+                user_id,
+                upload_ids,
+                query,
+                "vector",
+                top_k,
+                score_threshold,
+                lambda: self.vector_search(
+                    user_id, upload_ids, query, top_k, score_threshold, use_cache=False
+                ),
+            )
         query_vector = self.embedding_model.embed_query(query)
         filter_condition = {
             "must": [
@@ -303,6 +673,35 @@ class QdrantStore:
             query_filter=filter_condition,
             limit=top_k,
             score_threshold=score_threshold,
+            search_params=_search_params(),
+        )
+        return [self._convert_to_document(result) for result in search_results]
+
+    async def avector_search(
+        self,
+        user_id: int,
+        upload_ids: list[int],
+        query: str = "",
+        top_k: int = 5,
+        score_threshold: float | None = None,
+        query_vector: list[float] | None = None,
+    ) -> list[Document]:
+        """Async vector search; pass query_vector to reuse one embedding"""
+        if query_vector is None:
+            query_vector = await self.embedding_model.aembed_query(query)
+        filter_condition = {
+            "must": [
+                {"key": "metadata.user_id", "match": {"value": user_id}},
+                {"key": "metadata.upload_id", "match": {"any": upload_ids}},
+            ]
+        }
+        search_results = await self.async_client.search(
+            collection_name=self.collection_name,
+            query_vector=query_vector,
+            query_filter=rest.Filter(**filter_condition),
+            limit=top_k,
+            score_threshold=score_threshold,
+            search_params=_search_params(),
         )
         return [self._convert_to_document(result) for result in search_results]
 
@@ -313,7 +712,20 @@ class QdrantStore:
         query: str,
         top_k: int = 5,
         score_threshold: float = 0.5,
+        use_cache: bool = True,
     ):
+        if use_cache:
+            return retrieval_cache.get_or_search(
+                user_id,
+                upload_ids,
+                query,
+                "fulltext",
+                top_k,
+                score_threshold,
+                lambda: self.fulltext_search(
+                    user_id, upload_ids, query, top_k, score_threshold, use_cache=False
+                ),
+            )
         filter_condition = {
             "must": [
                 {"key": "metadata.user_id", "match": {"value": user_id}},
@@ -397,15 +809,51 @@ class QdrantStore:
         query: str,
         top_k: int = 5,
         score_threshold: float = 0.5,
+        use_cache: bool = True,
     ):
+        if use_cache:
+            return retrieval_cache.get_or_search(
+                user_id,
+                upload_ids,
+                query,
+                "hybrid",
+                top_k,
+                score_threshold,
+                lambda: self.hybrid_search(
+                    user_id, upload_ids, query, top_k, score_threshold, use_cache=False
+                ),
+            )
         vector_results = self.vector_search(
-            user_id, upload_ids, query, top_k, score_threshold
+            user_id, upload_ids, query, top_k, score_threshold, use_cache=False
         )
         fulltext_results = self.fulltext_search(
-            user_id, upload_ids, query, top_k, score_threshold
+            user_id, upload_ids, query, top_k, score_threshold, use_cache=False
         )
 
         # 合并结果并按分数排序
         combined_results = vector_results + fulltext_results
         combined_results.sort(key=lambda x: x.metadata["score"], reverse=True)
         return combined_results[:top_k]
+
+
+_shared_store: QdrantStore | None = None
+_shared_store_checked_at = 0.0
+_shared_store_lock = threading.Lock()
+# 共享实例定期检查别名，重新向量化切换后改用新的 collection 和模型
+SHARED_STORE_REFRESH_INTERVAL = 10.0
+
+
+def get_shared_qdrant_store() -> QdrantStore:
+    """Process-wide store for request-path searches (API process)"""
+    global _shared_store, _shared_store_checked_at
+    with _shared_store_lock:
+        now = time.monotonic()
+        if _shared_store is None:
+            _shared_store = QdrantStore()
+        elif now - _shared_store_checked_at > SHARED_STORE_REFRESH_INTERVAL:
+            active, _ = resolve_collections(_shared_store.client, _shared_store.alias)
+            if active != _shared_store.collection_name:
+                logger.info(f"Collection {_shared_store.alias} switched to {active}")
+                _shared_store = QdrantStore()
+        _shared_store_checked_at = now
+        return _shared_store
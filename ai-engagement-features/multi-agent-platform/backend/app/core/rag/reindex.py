@@ -0,0 +1,230 @@
+import logging
+
+from langchain_core.embeddings import Embeddings
+from qdrant_client.http import models as rest
+
+from app.core.rag.embeddings import get_embedding_model
+from app.core.rag.qdrant import (
+    SHADOW_ALIAS_SUFFIX,
+    QdrantStore,
+    active_alias,
+    collection_provider,
+    new_collection_name,
+)
+from app.core.rag.retrieval_cache import retrieval_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert_embedded(
+    qdrant_store: QdrantStore,
+    target: str,
+    embedding_model: Embeddings,
+    points: list[rest.Record],
+) -> None:
+    # 复用已存储的 chunk 文本重新向量化，不需要重新解析原始文件
+    vectors = embedding_model.embed_documents(
+        [point.payload.get("page_content", "") for point in points]
+    )
+    qdrant_store.client.upsert(
+        collection_name=target,
+        points=[
+            rest.PointStruct(id=point.id, vector=vector, payload=point.payload)
+            for point, vector in zip(points, vectors, strict=True)
+        ],
+    )
+
+
+def _scroll(qdrant_store: QdrantStore, collection_name: str, batch_size: int):
+    offset = None
+    while True:
+        points, offset = qdrant_store.client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if points:
+            yield points
+        if offset is None:
+            return
+
+
+def _existing_ids(
+    qdrant_store: QdrantStore, collection_name: str, points: list[rest.Record]
+) -> set:
+    return {
+        point.id
+        for point in qdrant_store.client.retrieve(
+            collection_name=collection_name,
+            ids=[point.id for point in points],
+            with_payload=False,
+            with_vectors=False,
+        )
+    }
+
+
+def _copy_missing(
+    qdrant_store: QdrantStore,
+    target: str,
+    embedding_model: Embeddings,
+    points: list[rest.Record],
+) -> None:
+    present = _existing_ids(qdrant_store, target, points)
+    missing = [point for point in points if point.id not in present]
+    if missing:
+        _upsert_embedded(qdrant_store, target, embedding_model, missing)
+
+
+def _reconcile(
+    qdrant_store: QdrantStore,
+    source: str,
+    target: str,
+    embedding_model: Embeddings,
+    batch_size: int,
+) -> set:
+    """Catch up with writes made by stores created before the shadow alias.
+
+    Returns the ids of the points found in ``source``.
+    """
+    source_ids = set()
+    for points in _scroll(qdrant_store, source, batch_size):
+        _copy_missing(qdrant_store, target, embedding_model, points)
+        source_ids.update(point.id for point in points)
+
+    for points in _scroll(qdrant_store, target, batch_size):
+        present = _existing_ids(qdrant_store, source, points)
+        deleted = [point.id for point in points if point.id not in present]
+        if deleted:
+            qdrant_store.client.delete(
+                collection_name=target,
+                points_selector=rest.PointIdsList(points=deleted),
+            )
+    return source_ids
+
+
+def _copy_new_points(
+    qdrant_store: QdrantStore,
+    source: str,
+    target: str,
+    embedding_model: Embeddings,
+    batch_size: int,
+    known_ids: set,
+) -> set[int]:
+    """Copy points added to ``source`` since the last reconcile.
+
+    Runs after the switch: stores created before the shadow alias still write
+    to the old collection only. Points that were already reconciled are
+    skipped, so uploads deleted through the new collection since the switch
+    are not copied back. Returns the upload ids of the copied points.
+    """
+    upload_ids = set()
+    for points in _scroll(qdrant_store, source, batch_size):
+        added = [point for point in points if point.id not in known_ids]
+        if added:
+            _copy_missing(qdrant_store, target, embedding_model, added)
+            upload_ids.update(
+                point.payload.get("metadata", {}).get("upload_id") for point in added
+            )
+    return upload_ids
+
+
+def reindex_collection(
+    provider: str, batch_size: int = 64, drop_old: bool = False
+) -> str:
+    """Re-embed the knowledge base with another embedding provider.
+
+    Builds a shadow collection for the new model while the current one keeps
+    serving searches; stores created during the run write to both. When the
+    copy is complete the active alias (see ``active_alias``) is switched to the
+    new collection and writes made meanwhile by older stores are copied over.
+    The old collection is kept for rollback unless ``drop_old`` is set.
+    Returns the name of the new collection.
+    """
+    qdrant_store = QdrantStore()
+    client = qdrant_store.client
+    alias = qdrant_store.alias
+    source = qdrant_store.collection_name
+    pointer = active_alias(client, alias)
+    shadow_alias = alias + SHADOW_ALIAS_SUFFIX
+    embedding_model = get_embedding_model(provider)
+
+    target = qdrant_store.shadow_collection_name
+    if target is not None and collection_provider(target) != provider:
+        raise ValueError(
+            f"Collection {alias} is already being re-embedded into {target}"
+        )
+    if target is None:
+        target = new_collection_name(alias, provider)
+        qdrant_store.create_collection(target, embedding_model.dimension)
+        client.update_collection_aliases(
+            change_aliases_operations=[
+                rest.CreateAliasOperation(
+                    create_alias=rest.CreateAlias(
+                        collection_name=target, alias_name=shadow_alias
+                    )
+                )
+            ]
+        )
+    else:
+        # 上次任务中断，继续写入已有的影子 collection（upsert 是幂等的）
+        logger.info(f"Resuming re-embedding into {target}")
+
+    upload_ids: set[int] = set()
+    copied = 0
+    for points in _scroll(qdrant_store, source, batch_size):
+        _upsert_embedded(qdrant_store, target, embedding_model, points)
+        upload_ids.update(
+            point.payload.get("metadata", {}).get("upload_id") for point in points
+        )
+        copied += len(points)
+        logger.info(f"Re-embedded {copied} points from {source} into {target}")
+
+    reconciled_ids = _reconcile(
+        qdrant_store, source, target, embedding_model, batch_size
+    )
+
+    # 旧版本部署（source 即配置名称）首次切换时还没有别名，旧 collection 保留不动
+    operations = []
+    if source != alias:
+        operations.append(
+            rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=pointer))
+        )
+    operations += [
+        rest.CreateAliasOperation(
+            create_alias=rest.CreateAlias(collection_name=target, alias_name=pointer)
+        ),
+        rest.DeleteAliasOperation(
+            delete_alias=rest.DeleteAlias(alias_name=shadow_alias)
+        ),
+    ]
+    # 一次请求内完成别名切换，对读者是原子的
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"Switched {pointer} from {source} to {target}")
+
+    upload_ids |= _copy_new_points(
+        qdrant_store, source, target, embedding_model, batch_size, reconciled_ids
+    )
+    for upload_id in upload_ids - {None}:
+        retrieval_cache.bump_upload_version(upload_id)
+
+    if drop_old:
+        # 保留旧 collection 时，切换前创建的实例仍可继续读取，也可用于回滚
+        client.delete_collection(collection_name=source)
+        logger.info(f"Dropped collection {source}")
+        if source == alias:
+            # 配置名称已空出，改用它作为别名（新实例在此期间通过 pointer 读取）
+            client.update_collection_aliases(
+                change_aliases_operations=[
+                    rest.CreateAliasOperation(
+                        create_alias=rest.CreateAlias(
+                            collection_name=target, alias_name=alias
+                        )
+                    ),
+                    rest.DeleteAliasOperation(
+                        delete_alias=rest.DeleteAlias(alias_name=pointer)
+                    ),
+                ]
+            )
+    return target
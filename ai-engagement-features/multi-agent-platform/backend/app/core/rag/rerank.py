@@ -0,0 +1,131 @@
+import logging
+import re
+from functools import lru_cache
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class CrossEncoderReranker:
+    """Batched local cross-encoder (fastembed ONNX, CPU) for retrieved chunks"""
+
+    def __init__(
+        self, model_name: str, batch_size: int = 32, threads: int | None = None
+    ):
+        # fastembed 为可选依赖，仅在启用重排时导入
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = TextCrossEncoder(model_name=model_name, threads=threads)
+
+    def rerank(
+        self, query: str, docs: list[Document], top_n: int | None = None
+    ) -> list[Document]:
+        if not docs:
+            return docs
+        scores = list(
+            self.model.rerank(
+                query,
+                [doc.page_content for doc in docs],
+                batch_size=self.batch_size,
+            )
+        )
+        ranked = sorted(
+            zip(docs, scores, strict=True), key=lambda item: item[1], reverse=True
+        )
+        # 返回副本，调用方的文档（可能来自检索缓存）保持不变
+        return [
+            doc.model_copy(
+                update={"metadata": {**doc.metadata, "rerank_score": float(score)}}
+            )
+            for doc, score in ranked[:top_n]
+        ]
+
+
+@lru_cache(maxsize=4)
+def _load_reranker(model_name: str) -> CrossEncoderReranker | None:
+    try:
+        return CrossEncoderReranker(model_name)
+    except Exception as e:
+        logger.warning(f"Cross-encoder reranker {model_name} unavailable: {e}")
+        return None
+
+
+def get_reranker(model_name: str | None = None) -> CrossEncoderReranker | None:
+    """Process-wide reranker for the configured model, None when disabled"""
+    model_name = model_name or settings.RAG_RERANK_MODEL
+    if not model_name:
+        return None
+    return _load_reranker(model_name)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 无 tiktoken 时粗略估算：中日韩字符按 1 个 token，其余按 4 个字符 1 个 token
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    return cjk_chars + (len(text) - cjk_chars + 3) // 4
+
+
+def _shingles(text: str, size: int = 3) -> set[str]:
+    normalized = _WHITESPACE_PATTERN.sub(" ", text.lower()).strip()
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i : i + size] for i in range(len(normalized) - size + 1)}
+
+
+def _jaccard(left: set[str], right: set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def pack_documents(
+    docs: list[Document],
+    token_budget: int | None = None,
+    dedup_threshold: float | None = None,
+) -> list[Document]:
+    """Keep the best-ranked chunks that fit the token budget.
+
+    Chunks are taken in rank order. A chunk whose character-shingle Jaccard
+    similarity with an already kept chunk reaches ``dedup_threshold`` is
+    dropped as a near-duplicate; a chunk that does not fit the remaining
+    budget is skipped so that a shorter, lower-ranked one may still fit.
+    """
+    packed: list[Document] = []
+    kept_shingles: list[set[str]] = []
+    used_tokens = 0
+    for doc in docs:
+        if dedup_threshold is not None:
+            shingles = _shingles(doc.page_content)
+            if any(
+                _jaccard(shingles, kept) >= dedup_threshold for kept in kept_shingles
+            ):
+                continue
+        if token_budget is not None:
+            tokens = count_tokens(doc.page_content)
+            if used_tokens + tokens > token_budget:
+                continue
+            used_tokens += tokens
+        packed.append(doc)
+        if dedup_threshold is not None:
+            kept_shingles.append(shingles)
+    return packed
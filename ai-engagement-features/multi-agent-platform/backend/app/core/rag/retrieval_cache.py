@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from collections.abc import Awaitable, Callable
+
+import redis
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    # 全角转半角、统一大小写和空白，使等价的问题命中同一缓存
+    normalized = unicodedata.normalize("NFKC", query).lower()
+    return _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+
+
+class RetrievalCache:
+    """Redis cache of knowledge-base search results.
+
+    Every upload has a version counter; the versions of the searched uploads
+    are part of the cache key, so bumping a version (after the upload is added,
+    edited or removed) makes all cached results that include it unreachable.
+    Orphaned entries simply expire. The cache has to be shared by the API and
+    the Celery workers, so it is disabled when no Redis is configured.
+    """
+
+    VERSION_KEY = "kb:upload_version:{}"
+    RESULT_KEY = "kb:search:{}"
+
+    def __init__(self, redis_url: str | None, ttl: int = 600):
+        self.ttl = ttl
+        self._client = (
+            redis.Redis.from_url(redis_url, socket_timeout=1) if redis_url else None
+        )
+        if self._client is None:
+            logger.info("Retrieval cache disabled: no Redis configured")
+
+    @property
+    def enabled(self) -> bool:
+        return self._client is not None
+
+    def make_key(
+        self,
+        user_id: int,
+        upload_ids: list[int],
+        query: str,
+        search_type: str,
+        top_k: int,
+        score_threshold: float | None,
+    ) -> str:
+        upload_ids = sorted(set(upload_ids))
+        versions = self._client.mget(
+            [self.VERSION_KEY.format(upload_id) for upload_id in upload_ids]
+        )
+        raw_key = json.dumps(
+            [
+                user_id,
+                upload_ids,
+                [int(version or 0) for version in versions],
+                normalize_query(query),
+                search_type,
+                top_k,
+                score_threshold,
+            ]
+        )
+        return self.RESULT_KEY.format(hashlib.sha256(raw_key.encode()).hexdigest())
+
+    def _lookup(
+        self,
+        user_id: int,
+        upload_ids: list[int],
+        query: str,
+        search_type: str,
+        top_k: int,
+        score_threshold: float | None,
+    ) -> tuple[str | None, list[Document] | None]:
+        try:
+            # key 在检索之前计算：检索期间上传被修改时，结果会写入旧版本的 key
+            key = self.make_key(
+                user_id, upload_ids, query, search_type, top_k, score_threshold
+            )
+            cached = self._client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Retrieval cache unavailable: {e}")
+            return None, None
+
+        if cached is None:
+            logger.debug(f"Retrieval cache miss: {search_type} {upload_ids}")
+            return key, None
+        logger.debug(f"Retrieval cache hit: {search_type} {upload_ids}")
+        return key, [Document(**doc) for doc in json.loads(cached)]
+
+    def _store(self, key: str, documents: list[Document]) -> None:
+        try:
+            self._client.set(
+                key,
+                json.dumps(
+                    [
+                        {"page_content": doc.page_content, "metadata": doc.metadata}
+                        for doc in documents
+                    ],
+                    default=str,
+                ),
+                ex=self.ttl,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store retrieval cache entry: {e}")
+
+    def get_or_search(
+        self,
+        user_id: int,
+        upload_ids: list[int],
+        query: str,
+        search_type: str,
+        top_k: int,
+        score_threshold: float | None,
+        search: Callable[[], list[Document]],
+    ) -> list[Document]:
+        if not self.enabled:
+            return search()
+
+        key, cached = self._lookup(
+            user_id, upload_ids, query, search_type, top_k, score_threshold
+        )
+        if cached is not None:
+            return cached
+        documents = search()
+        if key is not None:
+            self._store(key, documents)
+        return documents
+
+    async def aget_or_search(
+        self,
+        user_id: int,
+        upload_ids: list[int],
+        query: str,
+        search_type: str,
+        top_k: int,
+        score_threshold: float | None,
+        search: Callable[[], Awaitable[list[Document]]],
+    ) -> list[Document]:
+        """Async variant; Redis calls run in a worker thread"""
+        if not self.enabled:
+            return await search()
+
+        key, cached = await asyncio.to_thread(
+            self._lookup,
+            user_id,
+            upload_ids,
+            query,
+            search_type,
+            top_k,
+            score_threshold,
+        )
+        if cached is not None:
+            return cached
+        documents = await search()
+        if key is not None:
+            await asyncio.to_thread(self._store, key, documents)
+        return documents
+
+    def bump_upload_version(self, upload_id: int) -> None:
+        """Invalidate every cached result that includes this upload"""
+        if not self.enabled:
+            return
+        try:
+            self._client.incr(self.VERSION_KEY.format(upload_id))
+        except redis.RedisError as e:
+            logger.warning(
+                f"Failed to invalidate retrieval cache for upload {upload_id}: {e}"
+            )
+
+
+def _get_redis_url() -> str | None:
+    if not settings.RETRIEVAL_CACHE_ENABLED:
+        return None
+    return settings.SHARED_REDIS_URL
+
+
+retrieval_cache = RetrievalCache(_get_redis_url(), ttl=settings.RETRIEVAL_CACHE_TTL)
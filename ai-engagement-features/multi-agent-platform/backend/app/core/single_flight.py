@@ -0,0 +1,130 @@
+import asyncio
+import copy
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 对冲请求需要真正发出第二个调用，在该上下文中不与进行中的调用合并
+bypass_single_flight: ContextVar[bool] = ContextVar(
+    "bypass_single_flight", default=False
+)
+
+
+class _Flight:
+    def __init__(self, started: float):
+        self.started = started
+        self.task: asyncio.Task | None = None
+        self.waiters = 0
+        # 流式调用：已产生的 chunk，后加入的调用从头回放
+        self.chunks: list[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """Lets concurrent identical calls in this process share one execution.
+
+    A call joins the in-flight call with the same key if that call started
+    less than SINGLE_FLIGHT_WINDOW seconds ago; nothing is kept once it
+    finishes (the response caches cover that). The shared execution runs in
+    its own task and is only cancelled when every caller has gone, so a
+    cancelled caller (e.g. a losing hedge) does not fail the others. Callers
+    get deep copies because LangChain sets run ids on returned messages.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self._streams: dict[str, _Flight] = {}
+
+    @staticmethod
+    def enabled() -> bool:
+        return settings.SINGLE_FLIGHT_WINDOW > 0 and not bypass_single_flight.get()
+
+    def _join(
+        self, flights: dict[str, _Flight], key: str, start: Callable[[_Flight], Any]
+    ) -> _Flight:
+        now = asyncio.get_running_loop().time()
+        flight = flights.get(key)
+        if (
+            flight is not None
+            and now - flight.started <= settings.SINGLE_FLIGHT_WINDOW
+            # 所有调用方都已离开、正在取消的调用不能再加入
+            and not flight.task.cancelling()
+        ):
+            logger.debug(f"Joined in-flight call: {key}")
+        else:
+            flight = flights[key] = _Flight(now)
+            flight.task = asyncio.create_task(start(flight))
+            flight.task.add_done_callback(
+                lambda _: flights.pop(key) if flights.get(key) is flight else None
+            )
+        flight.waiters += 1
+        return flight
+
+    @staticmethod
+    def _leave(flight: _Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.task.cancel()
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled():
+            return await call()
+        flight = self._join(self._flights, key, lambda _: call())
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            self._leave(flight)
+        return copy.deepcopy(result)
+
+    async def _produce(self, flight: _Flight, iterator: AsyncIterator[Any]) -> None:
+        try:
+            async for item in iterator:
+                flight.chunks.append(item)
+                flight.notify()
+        except Exception as e:
+            # 错误交给每个调用方抛出，任务本身正常结束
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+
+    async def stream(
+        self, key: str, call: Callable[[], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """Fan out one token stream to every concurrent identical call"""
+        if not self.enabled():
+            async for item in call():
+                yield item
+            return
+        flight = self._join(
+            self._streams, key, lambda flight: self._produce(flight, call())
+        )
+        index = 0
+        try:
+            while True:
+                while index < len(flight.chunks):
+                    yield copy.deepcopy(flight.chunks[index])
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            self._leave(flight)
+
+
+single_flight = SingleFlight()
@@ -7,9 +7,12 @@ from langgraph.graph import add_messages
 from pydantic import BaseModel, Field
 from typing_extensions import NotRequired, TypedDict
 
+from app.core.config import settings
 from app.core.rag.qdrant import QdrantStore
+from app.core.rag.rerank import get_reranker
 from app.core.tools.api_tool import dynamic_api_tool
 from app.core.tools.retriever_tool import create_retriever_tool_custom_modified
+from app.core.workflow.utils.template import compile_template
 
 
 class GraphTool(BaseModel):
@@ -40,8 +43,22 @@ class GraphUpload(BaseModel):
 
     @property
     def tool(self) -> BaseTool:
-        retriever = QdrantStore().retriever(self.owner_id, self.upload_id)
-        return create_retriever_tool_custom_modified(retriever)
+        reranker = get_reranker()
+        retriever = QdrantStore().retriever(
+            self.owner_id,
+            self.upload_id,
+            # 启用重排时多召回一些候选，由 cross-encoder 选出最终的 5 个
+            k=settings.RAG_RERANK_FETCH_K if reranker else 5,
+            search_type=settings.RAG_SEARCH_TYPE,
+            fetch_k=settings.RAG_RERANK_FETCH_K,
+        )
+        return create_retriever_tool_custom_modified(
+            retriever,
+            reranker=reranker,
+            rerank_top_n=5,
+            token_budget=settings.RAG_CONTEXT_TOKEN_BUDGET,
+            dedup_threshold=settings.RAG_DEDUP_THRESHOLD,
+        )
 
 
 class GraphPerson(BaseModel):
@@ -149,50 +166,55 @@ def update_node_outputs(
         return {**node_outputs, **new_outputs}
 
 
+def update_joins(joins: dict[str, Any], new_joins: dict[str, Any]) -> dict[str, Any]:
+    """Merge join arrival records from parallel branches. If new_joins is empty, clear joins instead."""
+    if not new_joins:
+        return {}
+    merged = dict(joins or {})
+    for join_id, update in new_joins.items():
+        current = merged.get(join_id, {"arrived": [], "fired": False})
+        merged[join_id] = {
+            "arrived": current["arrived"]
+            + [a for a in update.get("arrived", []) if a not in current["arrived"]],
+            "fired": current["fired"] or update.get("fired", False),
+            # 最近一次执行 join 节点的结果，供其出边路由使用
+            "status": update.get("status", current.get("status")),
+        }
+    return merged
+
+
 class WorkflowState(TypedDict):
     input_msg: any
     messages: Annotated[list[AnyMessage], add_messages]
     node_outputs: Annotated[dict[str, Any], update_node_outputs]
+    joins: Annotated[dict[str, Any], update_joins]
 
 
 # When returning teamstate, is it possible to exclude fields that you dont want to update
 class ReturnWorkflowState(TypedDict):
     messages: NotRequired[list[AnyMessage]]
     node_outputs: Annotated[dict[str, Any], update_node_outputs]
+    joins: NotRequired[dict[str, Any]]
 
 
 def parse_variables(text: str, node_outputs: dict, is_code: bool = False) -> str:
-    def replace_variable(match):
-        var_path = match.group(1).split(".")
-        value = node_outputs
-        for key in var_path:
-            if key in value:
-                value = value[key]
-            else:
-                return match.group(0)  # 如果找不到变量，保持原样
-
-        # 转换全角字符为半角字符
-        def convert_fullwidth_to_halfwidth(s: str) -> str:
-            # 全角字符范围是 0xFF01 到 0xFF5E
-            # 半角字符范围是 0x0021 到 0x007E
-            result = []
-            for char in str(s):
-                code = ord(char)
-                if 0xFF01 <= code <= 0xFF5E:
-                    # 转换全角字符到半角字符
-                    result.append(chr(code - 0xFEE0))
-                else:
-                    result.append(char)
-            return "".join(result)
-
-        str_value = str(value)
-        if is_code:
-            # 对于代码中的字符串，需要转换全角字符并正确转义
-            converted_value = convert_fullwidth_to_halfwidth(str_value)
-            # 转义引号和反斜杠
-            escaped_value = converted_value.replace('"', '\\"').replace("\\", "\\\\")
-            return f'"{escaped_value}"'
+    # 模板只在首次使用时编译一次，之后直接复用缓存的 accessor
+    return compile_template(text, is_code).render(node_outputs)
+
+
+def get_variable_value(reference: str, node_outputs: dict) -> Any:
+    """Resolve a single `${node.field}` reference to its raw (unstringified) value.
+
+    Returns None if any part of the path is missing.
+    """
+    match = re.fullmatch(r"\s*\${([^}]+)}\s*", reference)
+    var_path = (match.group(1) if match else reference).split(".")
+    value: Any = node_outputs
+    for key in var_path:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
         else:
-            return str_value
-
-    return re.sub(r"\${([^}]+)}", replace_variable, text)
+            return None
+    return value
@@ -1,14 +1,18 @@
+import hashlib
 import json
 import types
 from enum import Enum
 from typing import Any
 
-import requests
+import httpx
 from langchain.tools import StructuredTool
 from langchain_core.tools import ToolException
 from pydantic import (BaseModel, Field, ValidationError, create_model,
                       field_validator)
 
+from app.core.tools import http_client
+from app.core.tools.tool_cache import ToolCacheConfig, with_response_cache
+
 
 class ParameterProperties(BaseModel):
     type: str
@@ -45,6 +49,8 @@ class ToolDefinition(BaseModel):
     url: str
     method: str = Field(default="GET")
     headers: dict[str, str] | None = None
+    # 仅对 GET 请求生效
+    cache: ToolCacheConfig | None = None
 
     @field_validator("method")
     def method_must_be_valid(cls, v: Any) -> Any:
@@ -102,6 +108,20 @@ def dynamic_api_tool(tool_definition: dict[str, Any]) -> StructuredTool:
 
     DynamicInput = create_model(f"{name}Input", **fields)  # type: ignore[call-overload]
 
+    def prepare_request(arguments: dict[str, Any]) -> dict[str, Any]:
+        headers = validated_tool_definition.headers or {}
+        arguments = {
+            key: value.value if isinstance(value, Enum) else value
+            for key, value in arguments.items()
+        }
+
+        # Prepare data and params based on the HTTP method
+        if validated_tool_definition.method in ["POST", "PUT", "PATCH", "DELETE"]:
+            return {"headers": headers, "json": arguments}
+        # 与 requests 一致，省略值为 None 的查询参数
+        params = {key: value for key, value in arguments.items() if value is not None}
+        return {"headers": headers, "params": params}
+
     def api_call(**kwargs: Any) -> str:
         """
         Executes an API call based on the provided tool definition.
@@ -125,25 +145,30 @@ def dynamic_api_tool(tool_definition: dict[str, Any]) -> StructuredTool:
                         as JSON, or any other unexpected error occurs during the
                         API call.
         """
-        url = validated_tool_definition.url
-        method = validated_tool_definition.method
-        headers = validated_tool_definition.headers or {}
-
-        # Prepare data and params based on the HTTP method
-        if method in ["POST", "PUT", "PATCH", "DELETE"]:
-            data = kwargs
-            params = None
-        else:
-            data = None
-            params = kwargs
+        try:
+            body = http_client.request(
+                validated_tool_definition.method,
+                validated_tool_definition.url,
+                **prepare_request(kwargs),
+            )
+            return json.dumps(json.loads(body), indent=2)
+        except (httpx.HTTPError, http_client.ResponseTooLargeError) as e:
+            raise ToolException(f"HTTP request failed: {e}")
+        except ValueError as e:
+            raise ToolException(f"JSON decoding failed: {e}")
+        except Exception as e:
+            raise ToolException(f"An unexpected error occurred: {e}")
 
+    async def aapi_call(**kwargs: Any) -> str:
+        """Async variant of `api_call` on the pooled keep-alive client"""
         try:
-            response = requests.request(
-                method, url, headers=headers, json=data, params=params
+            body = await http_client.arequest(
+                validated_tool_definition.method,
+                validated_tool_definition.url,
+                **prepare_request(kwargs),
             )
-            response.raise_for_status()  # Raise an HTTPError for bad responses
-            return json.dumps(response.json(), indent=2)
-        except requests.RequestException as e:
+            return json.dumps(json.loads(body), indent=2)
+        except (httpx.HTTPError, http_client.ResponseTooLargeError) as e:
             raise ToolException(f"HTTP request failed: {e}")
         except ValueError as e:
             raise ToolException(f"JSON decoding failed: {e}")
@@ -152,6 +177,8 @@ def dynamic_api_tool(tool_definition: dict[str, Any]) -> StructuredTool:
 
     api_call.__name__ = name
     api_call.__doc__ = description
+    aapi_call.__name__ = name
+    aapi_call.__doc__ = description
 
     # Create a new function object dynamically
     dynamic_func = types.FunctionType(
@@ -165,6 +192,7 @@ def dynamic_api_tool(tool_definition: dict[str, Any]) -> StructuredTool:
     # Create a StructuredTool instance
     tool = StructuredTool.from_function(
         func=dynamic_func,
+        coroutine=aapi_call,
         name=name,
         description=description,
         args_schema=DynamicInput,
@@ -172,4 +200,15 @@ def dynamic_api_tool(tool_definition: dict[str, Any]) -> StructuredTool:
         handle_tool_error=True,
     )
 
+    if validated_tool_definition.cache and validated_tool_definition.method == "GET":
+        # headers 中通常带有各提供商自己的凭证，不同凭证的工具不能共用缓存
+        headers_digest = hashlib.sha256(
+            json.dumps(validated_tool_definition.headers or {}, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        tool = with_response_cache(
+            tool,
+            f"api:{name}:{validated_tool_definition.url}:{headers_digest}",
+            validated_tool_definition.cache,
+        )
+
     return tool
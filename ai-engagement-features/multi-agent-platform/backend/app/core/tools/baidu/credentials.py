@@ -36,3 +36,13 @@ def credentials_function() -> dict[str, Any]:
             "dest": "zh",
         },
     }
+
+
+def get_cache_config() -> dict[str, Any]:
+    return {
+        "baidutranslate": {
+            "ttl": 86400,
+            "key_fields": ["content", "dest"],
+            "max_entries": 1024,
+        }
+    }
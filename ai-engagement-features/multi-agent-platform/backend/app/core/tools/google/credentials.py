@@ -12,3 +12,13 @@ def get_provider_info() -> dict[str, str]:
 
 def get_credentials() -> dict[str, Any]:
     return {}
+
+
+def get_cache_config() -> dict[str, Any]:
+    return {
+        "googletranslate": {
+            "ttl": 86400,
+            "key_fields": ["content", "dest"],
+            "max_entries": 1024,
+        }
+    }
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 只有幂等请求在失败后自动重试
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+MAX_RETRY_DELAY = 10.0
+
+
+class ResponseTooLargeError(Exception):
+    pass
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _client_options() -> dict[str, Any]:
+    return {
+        "timeout": httpx.Timeout(
+            settings.API_TOOL_TIMEOUT, connect=settings.API_TOOL_CONNECT_TIMEOUT
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.API_TOOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.API_TOOL_MAX_CONNECTIONS,
+        ),
+        # 与 requests 一致，自动跟随重定向（http→https、末尾斜杠等）
+        "follow_redirects": True,
+    }
+
+
+# 异步客户端绑定创建它的事件循环，因此按事件循环和 host 分别缓存
+_async_clients: WeakKeyDictionary[asyncio.AbstractEventLoop, dict] = WeakKeyDictionary()
+_sync_clients: dict[str, httpx.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """Keep-alive client shared by all requests to the url's host"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        key = _host_key(url)
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = clients[key] = httpx.AsyncClient(**_client_options())
+        return client
+
+
+def get_client(url: str) -> httpx.Client:
+    with _clients_lock:
+        key = _host_key(url)
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            client = _sync_clients[key] = httpx.Client(**_client_options())
+        return client
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+    retry_after = response.headers.get("retry-after") if response else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_DELAY)
+    delay = settings.API_TOOL_RETRY_BACKOFF * 2**attempt
+    return min(delay + random.uniform(0, delay), MAX_RETRY_DELAY)
+
+
+def _check_content_length(response: httpx.Response, max_bytes: int) -> None:
+    content_length = response.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise ResponseTooLargeError(
+            f"Response of {content_length} bytes exceeds the limit of {max_bytes}"
+        )
+
+
+def _check_size(size: int, max_bytes: int) -> None:
+    if size > max_bytes:
+        raise ResponseTooLargeError(f"Response exceeds the limit of {max_bytes} bytes")
+
+
+async def arequest(method: str, url: str, **kwargs: Any) -> bytes:
+    """Send a request on the pooled client and return the response body.
+
+    Idempotent requests are retried with exponential backoff on connection
+    errors, timeouts and 429/502/503/504 responses. Raises
+    ``httpx.HTTPStatusError`` for error responses and ``ResponseTooLargeError``
+    when the body exceeds ``API_TOOL_MAX_RESPONSE_BYTES``.
+    """
+    client = get_async_client(url)
+    max_bytes = settings.API_TOOL_MAX_RESPONSE_BYTES
+    retries = settings.API_TOOL_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+    for attempt in range(retries + 1):
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                    delay = _retry_delay(attempt, response)
+                else:
+                    response.raise_for_status()
+                    _check_content_length(response, max_bytes)
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        _check_size(len(body), max_bytes)
+                    return bytes(body)
+        except httpx.TransportError as e:
+            if attempt >= retries:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def request(method: str, url: str, **kwargs: Any) -> bytes:
+    """Blocking variant of `arequest` for synchronous tool calls"""
+    client = get_client(url)
+    max_bytes = settings.API_TOOL_MAX_RESPONSE_BYTES
+    retries = settings.API_TOOL_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+    for attempt in range(retries + 1):
+        try:
+            with client.stream(method, url, **kwargs) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                    delay = _retry_delay(attempt, response)
+                else:
+                    response.raise_for_status()
+                    _check_content_length(response, max_bytes)
+                    body = bytearray()
+                    for chunk in response.iter_bytes():
+                        body += chunk
+                        _check_size(len(body), max_bytes)
+                    return bytes(body)
+        except httpx.TransportError as e:
+            if attempt >= retries:
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+        time.sleep(delay)
+    raise AssertionError("unreachable")
@@ -29,3 +29,7 @@ def credentials_function() -> dict[str, Any]:
             "city": "Beijing",
         },
     }
+
+
+def get_cache_config() -> dict[str, Any]:
+    return {"openweather": {"ttl": 600, "key_fields": ["city"], "max_entries": 512}}
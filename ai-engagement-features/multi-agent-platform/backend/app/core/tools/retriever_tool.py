@@ -7,6 +7,8 @@ from langchain_core.prompts import (BasePromptTemplate, PromptTemplate,
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.tools import BaseTool
 
+from app.core.rag.rerank import CrossEncoderReranker, pack_documents
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +20,11 @@ class RetrieverTool(BaseTool):
     retriever: BaseRetriever
     document_prompt: BasePromptTemplate | PromptTemplate
     document_separator: str
+    # 可选的本地重排与上下文打包
+    reranker: CrossEncoderReranker | None = None
+    rerank_top_n: int | None = None
+    token_budget: int | None = None
+    dedup_threshold: float | None = None
 
     def _run(
         self, query: Annotated[str, "query to look up in retriever"]
@@ -31,6 +38,12 @@ class RetrieverTool(BaseTool):
             logger.warning("No documents retrieved")
             return "", []
 
+        if self.reranker is not None:
+            docs = self.reranker.rerank(query, docs, self.rerank_top_n)
+        if self.token_budget is not None or self.dedup_threshold is not None:
+            docs = pack_documents(docs, self.token_budget, self.dedup_threshold)
+            logger.debug(f"Packed {len(docs)} documents into the context budget")
+
         result_string = self.document_separator.join(
             [format_document(doc, self.document_prompt) for doc in docs]
         )
@@ -44,10 +57,18 @@ def create_retriever_tool_custom_modified(
     retriever: BaseRetriever,
     document_prompt: BasePromptTemplate | None = None,
     document_separator: str = "\n\n",
+    reranker: CrossEncoderReranker | None = None,
+    rerank_top_n: int | None = None,
+    token_budget: int | None = None,
+    dedup_threshold: float | None = None,
 ) -> BaseTool:
     document_prompt = document_prompt or PromptTemplate.from_template("{page_content}")
     return RetrieverTool(
         retriever=retriever,
         document_prompt=document_prompt,
         document_separator=document_separator,
+        reranker=reranker,
+        rerank_top_n=rerank_top_n,
+        token_budget=token_budget,
+        dedup_threshold=dedup_threshold,
     )
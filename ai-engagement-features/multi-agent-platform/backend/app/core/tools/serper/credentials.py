@@ -31,3 +31,7 @@ def credentials_function() -> dict[str, Any]:
             "search_query": "What is the latest news of China?",
         },
     }
+
+
+def get_cache_config() -> dict[str, Any]:
+    return {"serper": {"ttl": 300, "key_fields": ["search_query"], "max_entries": 256}}
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from inspect import signature
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.core.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# 调用时在 config["configurable"] 中设置该标志可跳过缓存读取（结果仍会刷新缓存）
+BYPASS_TOOL_CACHE = "bypass_tool_cache"
+
+
+class ToolCacheConfig(BaseModel):
+    ttl: float = 300
+    # 参与缓存 key 的参数，None 表示全部参数
+    key_fields: list[str] | None = None
+    max_entries: int = 256
+
+
+@dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypasses: int = 0
+
+
+class ToolResponseCache:
+    """In-process TTL/LRU cache of one tool's responses"""
+
+    def __init__(self, name: str, config: ToolCacheConfig):
+        self.name = name
+        self.config = config
+        self.stats = ToolCacheStats()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, tool_input: dict[str, Any]) -> str:
+        if self.config.key_fields is not None:
+            tool_input = {
+                field: tool_input.get(field) for field in self.config.key_fields
+            }
+        raw_key = json.dumps(
+            tool_input, sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.stats.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.config.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config.max_entries:
+                self._entries.popitem(last=False)
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.stats.bypasses += 1
+
+
+_caches: dict[str, ToolResponseCache] = {}
+
+
+def get_response_cache(name: str, config: ToolCacheConfig) -> ToolResponseCache:
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = ToolResponseCache(name, config)
+    # API 工具每次构建图时重新包装，使用最新的配置
+    cache.config = config
+    return cache
+
+
+def get_tool_cache_stats() -> dict[str, dict[str, int]]:
+    """Hit/miss/bypass counters of every tool cache"""
+    return {name: asdict(cache.stats) for name, cache in _caches.items()}
+
+
+def should_bypass(config: RunnableConfig | None) -> bool:
+    if not settings.TOOL_CACHE_ENABLED:
+        return True
+    return bool(((config or {}).get("configurable") or {}).get(BYPASS_TOOL_CACHE))
+
+
+def is_error_response(result: Any) -> bool:
+    # 内置工具通过 format_tool_response 返回 {"success": false, "error": ...}
+    if not isinstance(result, str) or '"success"' not in result:
+        return False
+    try:
+        return json.loads(result).get("success") is False
+    except (ValueError, AttributeError):
+        return False
+
+
+def _forward(method: Any, config: RunnableConfig, run_manager: Any) -> dict:
+    parameters = signature(method).parameters
+    forwarded: dict[str, Any] = {}
+    if "config" in parameters:
+        forwarded["config"] = config
+    if "run_manager" in parameters:
+        forwarded["run_manager"] = run_manager
+    return forwarded
+
+
+class CachedTool(BaseTool):
+    """Serves repeated calls of an idempotent tool from its response cache.
+
+    Calls that raise or return the built-in error envelope are not cached.
+    Concurrent identical async calls on a miss share one execution.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tool: BaseTool
+    cache: ToolResponseCache
+
+    def _lookup(self, config: RunnableConfig, kwargs: dict) -> tuple[str, bool, Any]:
+        key = self.cache.make_key(kwargs)
+        if should_bypass(config):
+            self.cache.bypass()
+            return key, False, None
+        hit, value = self.cache.get(key)
+        logger.debug(f"Tool cache {'hit' if hit else 'miss'}: {self.cache.name}")
+        return key, hit, value
+
+    def _store(self, key: str, result: Any) -> None:
+        if not is_error_response(result):
+            self.cache.set(key, result)
+
+    def _run(
+        self, *args: Any, config: RunnableConfig, run_manager: Any = None, **kwargs
+    ) -> Any:
+        key, hit, value = self._lookup(config, kwargs)
+        if hit:
+            return value
+        result = self.tool._run(
+            *args, **_forward(self.tool._run, config, run_manager), **kwargs
+        )
+        self._store(key, result)
+        return result
+
+    async def _arun(
+        self, *args: Any, config: RunnableConfig, run_manager: Any = None, **kwargs
+    ) -> Any:
+        key, hit, value = self._lookup(config, kwargs)
+        if hit:
+            return value
+
+        async def call() -> Any:
+            result = await self.tool._arun(
+                *args, **_forward(self.tool._arun, config, run_manager), **kwargs
+            )
+            self._store(key, result)
+            return result
+
+        return await single_flight.run(f"tool:{self.cache.name}:{key}", call)
+
+
+def with_response_cache(
+    tool: BaseTool, name: str, config: ToolCacheConfig | dict[str, Any]
+) -> BaseTool:
+    """Wrap a tool with a response cache registered under ``name``"""
+    if isinstance(config, dict):
+        config = ToolCacheConfig(**config)
+    return CachedTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        return_direct=tool.return_direct,
+        handle_tool_error=tool.handle_tool_error,
+        tool=tool,
+        cache=get_response_cache(name, config),
+    )
@@ -1,4 +1,5 @@
 import importlib
+import json
 import logging
 import os
 from functools import cache
@@ -9,13 +10,20 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from pydantic import BaseModel
 from sqlmodel import select
 
+from app.core.config import settings
+from app.core.credential_cache import TOOL_PROVIDER, credential_cache
 from app.core.database import get_session
 from app.core.mcp.mcp_manage import MCPManager
 from app.core.security import decrypt_token
+from app.core.tools.tool_cache import with_response_cache
 from app.db.models import Tool, ToolProvider, ToolType
 
 logger = logging.getLogger(__name__)
 
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+# 由 scripts/generate_tool_manifest.py 生成
+MANIFEST_PATH = os.path.join(TOOLS_DIR, "manifest.json")
+
 
 def get_tool_provider_credentials(tool_provider_name: str) -> dict:
     session = next(get_session())
@@ -33,10 +41,15 @@ def get_tool_provider_credentials(tool_provider_name: str) -> dict:
 def get_tool_provider_credential_value(
     tool_provider_name: str, credential_key: str
 ) -> str:
-    credentials = get_tool_provider_credentials(tool_provider_name)
-    if credentials:
-        return decrypt_token(credentials.get(credential_key, {}).get("value", ""))
-    return ""
+    def _load() -> str:
+        credentials = get_tool_provider_credentials(tool_provider_name)
+        if credentials:
+            return decrypt_token(credentials.get(credential_key, {}).get("value", ""))
+        return ""
+
+    return credential_cache.get_or_load(
+        TOOL_PROVIDER, f"{tool_provider_name}:{credential_key}", _load
+    )
 
 
 class ToolInfo(BaseModel):
@@ -66,8 +79,17 @@ class ToolProviderInfo(BaseModel):
 
 
 class ToolManager:
+    """Catalog of the builtin tool providers.
+
+    Provider and tool metadata come from the generated ``manifest.json``, so
+    tool packages (and the SDKs they pull in) are imported only when a tool is
+    first requested. Folders missing from the manifest are scanned eagerly.
+    """
+
     def __init__(self):
         self.providers: dict[str, ToolProviderInfo] = {}
+        self.cache_configs: dict[str, dict[str, Any]] = {}
+        self._db_synced = False
         self.load_all_providers()
 
     @staticmethod
@@ -101,6 +123,27 @@ class ToolManager:
                 logger.warning(f"Failed to import credentials for {folder_name}: {e}")
         return credentials, provider_info
 
+    @staticmethod
+    def get_cache_config_from_folder(folder_path, folder_name) -> dict[str, Any]:
+        """Cacheable tools declared by a provider's credentials.get_cache_config.
+
+        get_cache_config returns {tool name: ToolCacheConfig fields}, e.g.
+        {"serper": {"ttl": 300, "key_fields": ["search_query"], "max_entries": 256}}:
+        ttl in seconds, the arguments that make up the cache key (all when
+        omitted) and the maximum number of cached responses.
+        """
+        if not os.path.exists(os.path.join(folder_path, "credentials.py")):
+            return {}
+        try:
+            module = importlib.import_module(
+                f"app.core.tools.{folder_name}.credentials"
+            )
+            if hasattr(module, "get_cache_config"):
+                return module.get_cache_config()
+        except Exception as e:
+            logger.warning(f"Failed to load cache config for {folder_name}: {e}")
+        return {}
+
     @staticmethod
     def get_tools_from_folder(folder_name):
         tools = []
@@ -201,12 +244,72 @@ class ToolManager:
             logger.error(f"Failed to import tools from {folder_name}: {str(e)}")
         return tools
 
-    def load_all_providers(self):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        tools_dir = os.path.abspath(os.path.join(base_dir, "."))
-        tool_folders = self.get_tool_folders(tools_dir)
+    @classmethod
+    def scan_provider(cls, folder: str) -> dict[str, Any]:
+        """Import a tool package and describe it as a manifest entry"""
+        folder_path = os.path.join(TOOLS_DIR, folder)
+        credentials, provider_info = cls.get_credentials_from_folder(
+            folder_path, folder
+        )
+        tools = cls.get_tools_from_folder(folder)
+        provider = ToolProviderInfo(
+            provider_name=folder,
+            display_name=provider_info.get("display_name", folder),
+            icon=provider_info.get("icon", folder),
+            description=provider_info.get("description", f"{folder}工具集合"),
+            credentials=credentials,
+            tools=tools,
+            mcp_endpoint_url=provider_info.get("mcp_endpoint_url"),
+            mcp_server_id=provider_info.get("mcp_server_id"),
+            mcp_connection_type=provider_info.get("mcp_connection_type"),
+            is_available=provider_info.get("is_available", False),
+            tool_type=provider_info.get("tool_type", ToolType.BUILTIN),
+        )
+        entry = provider.model_dump(
+            mode="json", exclude={"tools": {"__all__": {"tool"}}}
+        )
+        entry["cache_config"] = cls.get_cache_config_from_folder(folder_path, folder)
+        return entry
+
+    @classmethod
+    def build_manifest(cls) -> dict[str, Any]:
+        """Scan every tool folder; used by scripts/generate_tool_manifest.py"""
+        return {
+            "providers": {
+                folder: cls.scan_provider(folder)
+                for folder in sorted(cls.get_tool_folders(TOOLS_DIR))
+            }
+        }
+
+    @staticmethod
+    def read_manifest() -> dict[str, dict[str, Any]] | None:
+        if not settings.TOOL_MANIFEST_ENABLED or not os.path.exists(MANIFEST_PATH):
+            return None
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                return json.load(f)["providers"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to read tool manifest {MANIFEST_PATH}: {e}")
+            return None
 
-        # 先从数据库获取现有的providers
+    def load_all_providers(self):
+        manifest = self.read_manifest()
+        for folder in self.get_tool_folders(TOOLS_DIR):
+            entry = manifest.get(folder) if manifest is not None else None
+            if entry is None:
+                if manifest is not None:
+                    logger.warning(
+                        f"Tool provider {folder} is missing from the manifest, "
+                        "run scripts/generate_tool_manifest.py"
+                    )
+                entry = self.scan_provider(folder)
+            entry = dict(entry)
+            self.cache_configs[folder] = entry.pop("cache_config", {})
+            # 工具实例在首次使用时才导入，见 resolve_tool
+            self.providers[folder] = ToolProviderInfo.model_validate(entry)
+
+    def sync_with_db(self):
+        """Prefer provider settings already saved in the database"""
         session = next(get_session())
         try:
             existing_providers = {
@@ -216,56 +319,51 @@ class ToolManager:
         finally:
             session.close()
 
-        for folder in tool_folders:
-            folder_path = os.path.join(tools_dir, folder)
-            credentials, provider_info = self.get_credentials_from_folder(
-                folder_path, folder
-            )
-            provider_name = folder
-            description = provider_info.get("description", f"{folder}工具集合")
-            display_name = provider_info.get("display_name", folder)
-            icon = provider_info.get("icon", folder)
-            tools = self.get_tools_from_folder(folder)
-
-            # 获取新增字段的值
-            mcp_endpoint_url = provider_info.get("mcp_endpoint_url")
-            mcp_server_id = provider_info.get("mcp_server_id")
-            mcp_connection_type = provider_info.get("mcp_connection_type")
-            is_available = provider_info.get("is_available", False)
-            tool_type = provider_info.get("tool_type", ToolType.BUILTIN)
-
-            # 如果数据库中已存在该provider，使用数据库中的信息
-            if provider_name in existing_providers:
-                db_provider = existing_providers[provider_name]
-                credentials = db_provider.credentials or credentials
-
-                # 使用数据库中的新字段值（如果存在）
-                if db_provider.mcp_endpoint_url:
-                    mcp_endpoint_url = db_provider.mcp_endpoint_url
-                if db_provider.mcp_server_id:
-                    mcp_server_id = db_provider.mcp_server_id
-                if db_provider.mcp_connection_type:
-                    mcp_connection_type = db_provider.mcp_connection_type
-                is_available = db_provider.is_available
-                if hasattr(db_provider, "tool_type") and db_provider.tool_type:
-                    tool_type = db_provider.tool_type
-
-            self.providers[provider_name] = ToolProviderInfo(
-                provider_name=provider_name,
-                display_name=display_name,
-                icon=icon,
-                description=description,
-                credentials=credentials,
-                tools=tools,
-                # 添加新字段
-                mcp_endpoint_url=mcp_endpoint_url,
-                mcp_server_id=mcp_server_id,
-                mcp_connection_type=mcp_connection_type,
-                is_available=is_available,
-                tool_type=tool_type,
+        for provider_name, provider in self.providers.items():
+            if provider_name not in existing_providers:
+                continue
+            db_provider = existing_providers[provider_name]
+            provider.credentials = db_provider.credentials or provider.credentials
+
+            # 使用数据库中的新字段值（如果存在）
+            if db_provider.mcp_endpoint_url:
+                provider.mcp_endpoint_url = db_provider.mcp_endpoint_url
+            if db_provider.mcp_server_id:
+                provider.mcp_server_id = db_provider.mcp_server_id
+            if db_provider.mcp_connection_type:
+                provider.mcp_connection_type = db_provider.mcp_connection_type
+            provider.is_available = db_provider.is_available
+            if hasattr(db_provider, "tool_type") and db_provider.tool_type:
+                provider.tool_type = db_provider.tool_type
+        self._db_synced = True
+
+    def resolve_tool(self, provider_name: str, tool_info: ToolInfo) -> BaseTool | None:
+        """Import the tool instance on first use"""
+        if tool_info.tool is not None:
+            return tool_info.tool
+        try:
+            module = importlib.import_module(f"app.core.tools.{provider_name}")
+            tool = getattr(module, tool_info.name, None)
+        except Exception as e:
+            logger.error(f"Failed to import tools from {provider_name}: {str(e)}")
+            return None
+        if tool is None:
+            logger.error(f"Tool {tool_info.name} in {provider_name} is None")
+            return None
+        cache_config = self.cache_configs.get(provider_name, {})
+        if tool_info.name in cache_config:
+            tool = with_response_cache(
+                tool,
+                f"{provider_name}:{tool_info.name}",
+                cache_config[tool_info.name],
             )
+        tool_info.tool = tool
+        return tool
 
     def get_all_providers(self) -> dict[str, ToolProviderInfo]:
+        # 数据库查询推迟到首次使用，导入本模块时不需要数据库连接
+        if not self._db_synced:
+            self.sync_with_db()
         return self.providers
 
     def get_all_tools(self) -> dict[str, ToolInfo]:
@@ -332,7 +430,7 @@ class ToolManager:
 
         # 直接查找组合键
         if tool_name in all_tools:
-            tool = all_tools[tool_name].tool
+            tool = self.resolve_tool(tool_name.split(":", 1)[0], all_tools[tool_name])
             if tool is None:
                 raise ValueError(f"Tool instance is None for tool: {tool_name}")
             return tool
@@ -352,11 +450,12 @@ class ToolManager:
             # 在提供商的工具列表中查找指定名称的工具
             for tool_info in provider_info.tools:
                 if tool_info.name == simple_tool_name:
-                    if tool_info.tool is None:
+                    tool = self.resolve_tool(provider_name, tool_info)
+                    if tool is None:
                         raise ValueError(
                             f"Tool instance is None for tool: {simple_tool_name} in provider: {provider_name}"
                         )
-                    return tool_info.tool
+                    return tool
 
         raise ValueError(f"Unknown tool: {tool_name}")
 
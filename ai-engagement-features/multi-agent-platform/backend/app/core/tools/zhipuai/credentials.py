@@ -29,3 +29,7 @@ def credentials_function() -> dict[str, Any]:
             "query": "What is the latest news of China?",
         },
     }
+
+
+def get_cache_config() -> dict[str, Any]:
+    return {"websearch": {"ttl": 300, "key_fields": ["query"], "max_entries": 256}}
@@ -1,12 +1,16 @@
 import base64
+import mimetypes
 
 import zhipuai
 from langchain.tools import StructuredTool
 from pydantic import BaseModel, Field
 
+from app.core.image_processing import preprocess_image_url
 from app.core.tools.response_formatter import format_tool_response
 from app.core.tools.tool_manager import get_tool_provider_credential_value
 
+VISION_MODEL = "glm-4v"
+
 
 class ImageUnderstandingInput(BaseModel):
     """Input for the Image Understanding tool."""
@@ -19,18 +23,20 @@ def img_4v(image_url: str, qry: str):
     if image_url is None:
         return format_tool_response(False, error="Please provide an image path or url")
 
-    if (
-        image_url.startswith("http")
-        or image_url.startswith("https")
-        or image_url.startswith("data:image/")
-    ):
+    if image_url.startswith("http") or image_url.startswith("https"):
         img_base = image_url
+    elif image_url.startswith("data:image/"):
+        img_base = preprocess_image_url(image_url, VISION_MODEL)
     else:
         try:
             with open(image_url, "rb") as img_file:
-                img_base = base64.b64encode(img_file.read()).decode("utf-8")
+                img_data = base64.b64encode(img_file.read()).decode("utf-8")
         except Exception as e:
             return format_tool_response(False, error=str(e))
+        mime = mimetypes.guess_type(image_url)[0] or "image/jpeg"
+        img_url = preprocess_image_url(f"data:{mime};base64,{img_data}", VISION_MODEL)
+        # 本地文件沿用原来的纯 base64 格式
+        img_base = img_url.partition(";base64,")[2]
 
     api_key = get_tool_provider_credential_value("zhipuai", "ZHIPUAI_API_KEY")
 
@@ -40,7 +46,7 @@ def img_4v(image_url: str, qry: str):
     try:
         client = zhipuai(api_key=api_key)
         response = client.chat.completions.create(
-            model="glm-4v",
+            model=VISION_MODEL,
             messages=[
                 {
                     "role": "user",
@@ -1,4 +1,5 @@
 import time
+from collections import defaultdict
 from typing import Any
 
 from langchain_core.messages import AIMessage, AnyMessage
@@ -12,6 +13,7 @@ from app.core.tools.tool_manager import get_tool_by_tool_id_list
 from app.core.workflow.node.parameter_extractor_node import \
     ParameterExtractorNode
 from app.core.workflow.node.plugin_node import PluginNode
+from app.core.workflow.utils.template import validate_template_references
 from app.core.workflow.utils.tools_utils import get_retrieval_tool
 from app.db.models import InterruptType
 
@@ -24,7 +26,10 @@ from .node.crewai_node import CrewAINode
 from .node.human_node import HumanNode
 from .node.ifelse.ifelse_node import IfElseNode
 from .node.input_node import InputNode
+from .node.join_node import (JoinMode, JoinNode, record_join_arrival,
+                             should_continue_join)
 from .node.llm_node import LLMNode
+from .node.map_node import MapNode
 from .node.retrieval_node import RetrievalNode
 from .node.subgraph_node import SubgraphNode
 
@@ -34,43 +39,87 @@ def validate_config(config: dict[str, Any]) -> bool:
     return all(key in config for key in required_keys)
 
 
-# 添加一个全局变量来存储工具名称到节点ID的映射
-tool_name_to_node_id: dict[str, str] = {}
+class WorkflowBuildContext:
+    """Builder state for a single initialize_graph call.
 
+    Holds the workflow nodes/edges together with adjacency indexes so the
+    builder never rescans the full lists. Every build gets its own context and
+    the routing functions close over it, so workflows can be built
+    concurrently in the same process.
+    """
 
-def should_continue_tools(state: WorkflowState) -> str:
-    messages: list[AnyMessage] = state["messages"]
-    if messages and isinstance(messages[-1], AIMessage) and messages[-1].tool_calls:
-        for tool_call in messages[-1].tool_calls:
+    def __init__(self, nodes: list[dict[str, Any]], edges: list[dict[str, Any]]):
+        self.nodes = nodes
+        self.edges = edges
+        self.nodes_by_id: dict[str, dict[str, Any]] = {
+            node["id"]: node for node in nodes
+        }
+        self.outgoing: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self.incoming: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for edge in edges:
+            self.outgoing[edge["source"]].append(edge)
+            self.incoming[edge["target"]].append(edge)
+
+        # 工具名称 -> 工具节点ID
+        self.tool_name_to_node_id = _create_tool_name_mapping(nodes)
+        self.is_sequential, self.is_hierarchical = _determine_graph_type(self)
+        self.llm_children = _create_llm_children_dict(self)
+        self.conditional_edges = _create_conditional_edges_dict(nodes)
+
+    def get_node(self, node_id: str) -> dict[str, Any] | None:
+        return self.nodes_by_id.get(node_id)
+
+    def node_ids_of_type(self, node_type: str) -> list[str]:
+        return [node["id"] for node in self.nodes if node["type"] == node_type]
+
+    def successors(self, node_id: str) -> list[tuple[dict, dict]]:
+        """Return (edge, target node) pairs for the edges leaving node_id"""
+        return [
+            (edge, self.nodes_by_id[edge["target"]])
+            for edge in self.outgoing.get(node_id, [])
+            if edge["target"] in self.nodes_by_id
+        ]
 
-            tool_name = tool_call["name"].lower()
-            for node_id, tools in tool_name_to_node_id.items():
-                if tool_name in tools:
+
+def should_continue_tools(context: WorkflowBuildContext):
+    """Create the routing function for the tool calls of an LLM node"""
+
+    def route(state: WorkflowState) -> str:
+        messages: list[AnyMessage] = state["messages"]
+        if messages and isinstance(messages[-1], AIMessage) and messages[-1].tool_calls:
+            for tool_call in messages[-1].tool_calls:
+                node_id = context.tool_name_to_node_id.get(tool_call["name"].lower())
+                if node_id is not None:
                     return node_id
-    return "default"
+        return "default"
+
+    return route
 
 
-def should_continue_classifier(state: WorkflowState) -> str:
+def should_continue_classifier(classifier_node_id: str):
     """专门处理分类器节点的条件判断"""
-    if "node_outputs" in state:
-        for node_id, outputs in state["node_outputs"].items():
-            if "category_id" in outputs:
-                return outputs["category_id"]
-    return "default"
 
+    def route(state: WorkflowState) -> str:
+        outputs = state.get("node_outputs", {}).get(classifier_node_id, {})
+        return outputs.get("category_id", "default")
 
-def should_continue_ifelse(state: WorkflowState) -> str:
+    return route
+
+
+def should_continue_ifelse(ifelse_node_id: str):
     """处理 if-else 节点的条件判断"""
-    if "node_outputs" in state:
-        for node_id, outputs in state["node_outputs"].items():
-            if "result" in outputs:
-                return outputs["result"]
-    return "false_else"  # 默认返回 ELSE 分支
 
+    def route(state: WorkflowState) -> str:
+        outputs = state.get("node_outputs", {}).get(ifelse_node_id, {})
+        return outputs.get("result", "false_else")  # 默认返回 ELSE 分支
+
+    return route
 
-def _add_tools_conditional_edges(graph_builder, conditional_edges, nodes):
+
+def _add_tools_conditional_edges(graph_builder, context: WorkflowBuildContext):
     """Add conditional edges to graph"""
-    for node_id, conditions in conditional_edges.items():
+    router = should_continue_tools(context)
+    for node_id, conditions in context.conditional_edges.items():
         edges_dict = {
             "default": next(iter(conditions["default"].values()), END),
             **conditions["call_tools"],
@@ -80,88 +129,66 @@ def _add_tools_conditional_edges(graph_builder, conditional_edges, nodes):
             edges_dict["ask-human"] = next(iter(conditions["ask-human"].values()))
 
         if edges_dict != {"default": END}:
-            graph_builder.add_conditional_edges(
-                node_id, should_continue_tools, edges_dict
-            )
+            graph_builder.add_conditional_edges(node_id, router, edges_dict)
 
 
 def _add_classifier_conditional_edges(
-    graph_builder, classifier_node_id: str, nodes: list, edges: list
+    graph_builder, classifier_node_id: str, context: WorkflowBuildContext
 ):
     """专门处理分类器节点的条件边"""
-    # 获取分类器节点的配置
-    classifier_node = next(
-        (node for node in nodes if node["id"] == classifier_node_id), None
-    )
-    if not classifier_node:
+    if context.get_node(classifier_node_id) is None:
         return
 
     # 构建分类器的条件边字典
     edges_dict = {}
-
-    # 获取所有从分类器出发的边
-    classifier_edges = [edge for edge in edges if edge["source"] == classifier_node_id]
+    default_target = END
 
     # 为每个分类类别创建条件边
-    for edge in classifier_edges:
-        target_node = next(
-            (node for node in nodes if node["id"] == edge["target"]), None
-        )
-        if target_node:
-            # 检查边的sourceHandle是否匹配任何category_id
-            source_handle = edge.get("sourceHandle")
-            if source_handle:  # 如果有sourceHandle，使用它作为路由键
-                edges_dict[source_handle] = edge["target"]
+    for edge, _ in context.successors(classifier_node_id):
+        # 检查边的sourceHandle是否匹配任何category_id
+        source_handle = edge.get("sourceHandle")
+        if source_handle:  # 如果有sourceHandle，使用它作为路由键
+            edges_dict[source_handle] = edge["target"]
+        if edge.get("type") == "default" and default_target == END:
+            default_target = edge["target"]
 
     # 添加默认路径
-    default_edge = next(
-        (edge for edge in classifier_edges if edge.get("type") == "default"), None
-    )
-    edges_dict["default"] = default_edge["target"] if default_edge else END
+    edges_dict["default"] = default_target
 
     # 添加条件边到图中
-    if edges_dict:
-        graph_builder.add_conditional_edges(
-            classifier_node_id, should_continue_classifier, edges_dict
-        )
+    graph_builder.add_conditional_edges(
+        classifier_node_id,
+        should_continue_classifier(classifier_node_id),
+        edges_dict,
+    )
 
 
 def _add_ifelse_conditional_edges(
-    graph_builder, ifelse_node_id: str, nodes: list, edges: list
+    graph_builder, ifelse_node_id: str, context: WorkflowBuildContext
 ):
     """处理 if-else 节点的条件边"""
-    # 获取 if-else 节点的配置
-    ifelse_node = next((node for node in nodes if node["id"] == ifelse_node_id), None)
-    if not ifelse_node:
+    if context.get_node(ifelse_node_id) is None:
         return
 
     # 构建条件边字典
     edges_dict = {}
-
-    # 获取所有从 if-else 出发的边
-    ifelse_edges = [edge for edge in edges if edge["source"] == ifelse_node_id]
+    default_target = END
 
     # 为每个 case 创建条件边
-    for edge in ifelse_edges:
-        target_node = next(
-            (node for node in nodes if node["id"] == edge["target"]), None
-        )
-        if target_node:
-            source_handle = edge.get("sourceHandle")
-            if source_handle:  # 如果有 sourceHandle，使用它作为路由键
-                edges_dict[source_handle] = edge["target"]
+    for edge, _ in context.successors(ifelse_node_id):
+        source_handle = edge.get("sourceHandle")
+        if source_handle:  # 如果有 sourceHandle，使用它作为路由键
+            edges_dict[source_handle] = edge["target"]
+        if source_handle == "false" and default_target == END:
+            default_target = edge["target"]
 
     # 添加默认路径
-    default_edge = next(
-        (edge for edge in ifelse_edges if edge.get("sourceHandle") == "false"), None
-    )
-    edges_dict["false"] = default_edge["target"] if default_edge else END
+    edges_dict["false"] = default_target
 
     # 添加条件边到图中
-    if edges_dict:
-        graph_builder.add_conditional_edges(
-            ifelse_node_id, should_continue_ifelse, edges_dict
-        )
+    graph_builder.add_conditional_edges(
+        ifelse_node_id, should_continue_ifelse(ifelse_node_id), edges_dict
+    )
 
 
 async def initialize_graph(
@@ -169,8 +196,6 @@ async def initialize_graph(
     checkpointer: BaseCheckpointSaver,
     save_graph_img=False,
 ) -> CompiledGraph:
-    global tool_name_to_node_id
-
     if not validate_config(build_config):
         raise ValueError("Invalid configuration structure")
 
@@ -181,15 +206,11 @@ async def initialize_graph(
 
         graph_builder.add_node("InputNode", InputNode)
 
-        # 创建工具名称到节点ID的映射
-        tool_name_to_node_id = _create_tool_name_mapping(nodes)
-
-        # Determine graph type
-        is_sequential, is_hierarchical = _determine_graph_type(nodes, edges)
+        # 预编译所有变量模板并校验引用的节点是否存在
+        validate_template_references(nodes)
 
-        # Create dictionaries for LLM children and conditional edges
-        llm_children = _create_llm_children_dict(nodes, edges)
-        conditional_edges = _create_conditional_edges_dict(nodes)
+        # 本次构建的全部状态（索引、工具路由、条件边）都放在 context 中
+        context = WorkflowBuildContext(nodes, edges)
 
         # Add nodes
         for node in nodes:
@@ -207,21 +228,12 @@ async def initialize_graph(
                 _add_retrieval_node(graph_builder, node_id, node_data)
             elif node_type == "llm":
 
-                await _add_llm_node(
-                    graph_builder,
-                    node_id,
-                    node_data,
-                    nodes,
-                    edges,
-                    is_sequential,
-                    is_hierarchical,
-                    llm_children,
-                )
+                await _add_llm_node(graph_builder, node_id, node_data, context)
 
             elif node_type in ["tool", "toolretrieval"]:
                 await _add_tool_node(graph_builder, node_id, node_type, node_data)
             elif node_type == "classifier":
-                _add_classifier_node(graph_builder, node_id, node_data)
+                await _add_classifier_node(graph_builder, node_id, node_data)
             elif node_type == "code":
                 _add_code_node(graph_builder, node_id, node_data)
             elif node_type == "ifelse":
@@ -234,27 +246,33 @@ async def initialize_graph(
                 _add_plugin_node(graph_builder, node_id, node_data)
             elif node_type == "agent":
                 await _add_agent_node(graph_builder, node_id, node_data)
+            elif node_type == "map":
+                _add_map_node(graph_builder, node_id, node_data)
+            elif node_type == "join":
+                _add_join_node(graph_builder, node_id, node_data, context)
 
         # Add edges
+        join_nodes = {node["id"]: node for node in nodes if node["type"] == "join"}
         for edge in edges:
-            _add_edge(graph_builder, edge, nodes, conditional_edges)
+            if _is_join_managed_edge(edge, join_nodes):
+                continue
+            _add_edge(graph_builder, edge, context)
+
+        # 添加并行分支汇合节点的边
+        for join_node in join_nodes.values():
+            _add_join_edges(graph_builder, join_node, context)
 
         # Add conditional edges
-        _add_tools_conditional_edges(graph_builder, conditional_edges, nodes)
+        _add_tools_conditional_edges(graph_builder, context)
 
         # 添加分类器节点的条件边
-        classifier_nodes = [
-            node["id"] for node in nodes if node["type"] == "classifier"
-        ]
-
-        for classifier_node_id in classifier_nodes:
+        for classifier_node_id in context.node_ids_of_type("classifier"):
             _add_classifier_conditional_edges(
-                graph_builder, classifier_node_id, nodes, edges
+                graph_builder, classifier_node_id, context
             )
 
-        if_else_nodes = [node["id"] for node in nodes if node["type"] == "ifelse"]
-        for if_else_node_id in if_else_nodes:
-            _add_ifelse_conditional_edges(graph_builder, if_else_node_id, nodes, edges)
+        for if_else_node_id in context.node_ids_of_type("ifelse"):
+            _add_ifelse_conditional_edges(graph_builder, if_else_node_id, context)
 
         # Set entry point and compile graph
         graph_builder.set_entry_point("InputNode")
@@ -290,40 +308,31 @@ async def initialize_graph(
 
 # 辅助函数
 def _create_tool_name_mapping(nodes):
+    """Map every tool name to the first tool node that provides it"""
     tool_name_to_node_id = {}
     for node in nodes:
-        if node["type"] == "tool":
-            tool_name_to_node_id[node["id"]] = [
-                tool["name"].lower() for tool in node["data"]["tools"]
-            ]
-        if node["type"] == "toolretrieval":
-            tool_name_to_node_id[node["id"]] = [
-                tool["name"].lower() for tool in node["data"]["tools"]
-            ]
+        if node["type"] in ["tool", "toolretrieval"]:
+            for tool in node["data"]["tools"]:
+                tool_name_to_node_id.setdefault(tool["name"].lower(), node["id"])
     return tool_name_to_node_id
 
 
-def _determine_graph_type(nodes, edges):
-    llm_nodes = [node for node in nodes if node["type"] == "llm"]
+def _determine_graph_type(context: WorkflowBuildContext):
+    llm_nodes = context.node_ids_of_type("llm")
     is_sequential = len(llm_nodes) > 1 and all(
-        any(
-            edge["source"] == node["id"] and edge["target"] == next_node["id"]
-            for edge in edges
-        )
+        any(edge["target"] == next_node for edge in context.outgoing.get(node, []))
         for node, next_node in zip(llm_nodes[:-1], llm_nodes[1:], strict=False)
     )
     is_hierarchical = len(llm_nodes) > 1 and not is_sequential
     return is_sequential, is_hierarchical
 
 
-def _create_llm_children_dict(nodes, edges):
-    llm_children = {node["id"]: set() for node in nodes if node["type"] == "llm"}
-    for edge in edges:
-        source, target = edge["source"], edge["target"]
-        if source in llm_children:
-            target_node = next((node for node in nodes if node["id"] == target), None)
-            if target_node and target_node["type"] == "llm":
-                llm_children[source].add(target)
+def _create_llm_children_dict(context: WorkflowBuildContext):
+    llm_children = {node_id: set() for node_id in context.node_ids_of_type("llm")}
+    for source, children in llm_children.items():
+        for edge, target_node in context.successors(source):
+            if target_node["type"] == "llm":
+                children.add(edge["target"])
     return llm_children
 
 
@@ -354,26 +363,23 @@ def _add_retrieval_node(graph_builder, node_id, node_data):
             RetrievalNode(
                 node_id,
                 query=node_data["query"],
-                user_id=node_data["usr_id"],
-                kb_id=node_data["kb_id"],
+                user_id=node_data.get("usr_id"),
+                kb_id=node_data.get("kb_id"),
+                knowledge_bases=node_data.get("knowledge_bases"),
+                top_k=node_data.get("top_k", 5),
+                score_threshold=node_data.get("score_threshold"),
+                latency_budget=node_data.get("latency_budget"),
             ).work
         ),
     )
 
 
 async def _add_llm_node(
-    graph_builder,
-    node_id,
-    node_data,
-    nodes,
-    edges,
-    is_sequential,
-    is_hierarchical,
-    llm_children,
+    graph_builder, node_id, node_data, context: WorkflowBuildContext
 ):
     model_name = node_data["model"]
 
-    tools_to_bind = await _get_tools_to_bind(node_id, edges, nodes)
+    tools_to_bind = await _get_tools_to_bind(node_id, context)
 
     if node_data.get("type") == "subgraph":
         pass
@@ -394,7 +400,7 @@ async def _add_llm_node(
         )
 
 
-async def _get_tools_to_bind(node_id, edges, nodes):
+async def _get_tools_to_bind(node_id, context: WorkflowBuildContext):
     tools_to_bind = []
     # 存储已处理过的节点，避免循环
     processed_nodes = set()
@@ -404,32 +410,27 @@ async def _get_tools_to_bind(node_id, edges, nodes):
             return
         processed.add(current_node_id)
 
-        for edge in edges:
-            if edge["source"] == current_node_id:
-                target_node = next(
-                    (n for n in nodes if n["id"] == edge["target"]), None
-                )
-                if target_node:
-                    # 如果是工具节点，添加工具
-                    if target_node["type"] == "tool":
-                        tool_ids = [tool["id"] for tool in target_node["data"]["tools"]]
-                        tools = await get_tool_by_tool_id_list(tool_ids)
-                        tools_to_bind.extend(tools)
-                    elif target_node["type"] == "toolretrieval":
-                        tools_to_bind.extend(
-                            [
-                                get_retrieval_tool(
-                                    tool["name"],
-                                    tool["description"],
-                                    tool["usr_id"],
-                                    tool["kb_id"],
-                                )
-                                for tool in target_node["data"]["tools"]
-                            ]
+        for _, target_node in context.successors(current_node_id):
+            # 如果是工具节点，添加工具
+            if target_node["type"] == "tool":
+                tool_ids = [tool["id"] for tool in target_node["data"]["tools"]]
+                tools = await get_tool_by_tool_id_list(tool_ids)
+                tools_to_bind.extend(tools)
+            elif target_node["type"] == "toolretrieval":
+                tools_to_bind.extend(
+                    [
+                        get_retrieval_tool(
+                            tool["name"],
+                            tool["description"],
+                            tool["usr_id"],
+                            tool["kb_id"],
                         )
-                    # 如果是human节点，继续遍历其后续节点
-                    elif target_node["type"] == "human":
-                        await get_connected_tools(target_node["id"], processed)
+                        for tool in target_node["data"]["tools"]
+                    ]
+                )
+            # 如果是human节点，继续遍历其后续节点
+            elif target_node["type"] == "human":
+                await get_connected_tools(target_node["id"], processed)
 
     # 从起始节点开始遍历
     await get_connected_tools(node_id, processed_nodes)
@@ -453,9 +454,10 @@ async def _add_tool_node(graph_builder, node_id, node_type, node_data):
     graph_builder.add_node(node_id, ToolNode(tools))
 
 
-def _add_edge(graph_builder, edge, nodes, conditional_edges):
-    source_node = next(node for node in nodes if node["id"] == edge["source"])
-    target_node = next(node for node in nodes if node["id"] == edge["target"])
+def _add_edge(graph_builder, edge, context: WorkflowBuildContext):
+    source_node = context.nodes_by_id[edge["source"]]
+    target_node = context.nodes_by_id[edge["target"]]
+    conditional_edges = context.conditional_edges
 
     if source_node["type"] == "start":
         if edge["type"] == "default":
@@ -539,7 +541,7 @@ def _add_edge(graph_builder, edge, nodes, conditional_edges):
             graph_builder.add_edge(edge["source"], END)
         else:
             graph_builder.add_edge(edge["source"], edge["target"])
-    elif source_node["type"] == "agent":
+    elif source_node["type"] in ["agent", "map", "join"]:
         if target_node["type"] == "end":
             graph_builder.add_edge(edge["source"], END)
         else:
@@ -581,18 +583,20 @@ def _add_crewai_node(graph_builder, node_id, node_data):
         raise ValueError("Hierarchical process requires manager agent configuration")
 
 
-def _add_classifier_node(graph_builder, node_id, node_data):
+async def _add_classifier_node(graph_builder, node_id, node_data):
     """Add classifier node to graph"""
-
-    graph_builder.add_node(
-        node_id,
-        ClassifierNode(
-            node_id=node_id,
-            model_name=node_data["model"],
-            categories=node_data["categories"],
-            input=node_data["Input"],
-        ).work,
+    classifier_node = ClassifierNode(
+        node_id=node_id,
+        model_name=node_data["model"],
+        categories=node_data["categories"],
+        input=node_data["Input"],
+        embedding_routing=node_data.get("embedding_routing"),
+        llm_cache=node_data.get("llm_cache"),
     )
+    # 构建时预先向量化类别，避免首个请求承担这部分延迟
+    await classifier_node.prepare()
+
+    graph_builder.add_node(node_id, classifier_node.work)
 
 
 def _add_code_node(graph_builder, node_id, node_data):
@@ -660,6 +664,7 @@ def _add_parameter_extractor_node(graph_builder, node_id, node_data):
             parameter_schema=node_data["parameters"],
             input=node_data["Input"],
             instruction=node_data.get("instruction", ""),
+            llm_cache=node_data.get("llm_cache"),
         ).work,
     )
 
@@ -685,3 +690,165 @@ async def _add_agent_node(graph_builder, node_id, node_data):
             agent_name=node_data["label"],
         ).work,
     )
+
+
+def _create_map_child(child_id: str, child_type: str, child_data: dict[str, Any]):
+    """Create the node instance a map node runs for every item"""
+    if child_type == "llm":
+        return LLMNode(
+            child_id,
+            model_name=child_data["model"],
+            tools=[],
+            temperature=child_data["temperature"],
+            system_prompt=child_data.get("systemMessage", None),
+            user_prompt=child_data.get("userMessage", None),
+            agent_name=child_data.get("label", child_id),
+        )
+    elif child_type == "subgraph":
+        return SubgraphNode(
+            node_id=child_id,
+            subgraph_id=child_data["subgraphId"],
+            input=child_data["Input"],
+        )
+    elif child_type == "parameterExtractor":
+        return ParameterExtractorNode(
+            node_id=child_id,
+            model_name=child_data["model"],
+            parameter_schema=child_data["parameters"],
+            input=child_data["Input"],
+            instruction=child_data.get("instruction", ""),
+            llm_cache=child_data.get("llm_cache"),
+        )
+    elif child_type == "classifier":
+        return ClassifierNode(
+            node_id=child_id,
+            model_name=child_data["model"],
+            categories=child_data["categories"],
+            input=child_data["Input"],
+            embedding_routing=child_data.get("embedding_routing"),
+            llm_cache=child_data.get("llm_cache"),
+        )
+    elif child_type == "retrieval":
+        return RetrievalNode(
+            child_id,
+            query=child_data["query"],
+            user_id=child_data.get("usr_id"),
+            kb_id=child_data.get("kb_id"),
+            knowledge_bases=child_data.get("knowledge_bases"),
+            top_k=child_data.get("top_k", 5),
+            score_threshold=child_data.get("score_threshold"),
+            latency_budget=child_data.get("latency_budget"),
+        )
+    elif child_type == "plugin":
+        return PluginNode(child_id, child_data["tool"], child_data["args"])
+    elif child_type == "code":
+        return CodeNode(
+            node_id=child_id,
+            code=child_data["code"],
+            libraries=child_data.get("libraries", []),
+            timeout=child_data.get("timeout", 30),
+            memory_limit=child_data.get("memory_limit", "256m"),
+        )
+    raise ValueError(f"Node type {child_type} is not supported inside a map node")
+
+
+def _add_map_node(graph_builder, node_id: str, node_data: dict[str, Any]):
+    """Add a map node that runs a child node over every item of a list"""
+    child = node_data.get("child")
+    if not child or not child.get("type"):
+        raise ValueError("Map node requires a child node configuration")
+    child_id = child.get("id", f"{node_id}-child")
+
+    graph_builder.add_node(
+        node_id,
+        MapNode(
+            node_id=node_id,
+            items=node_data["items"],
+            child_id=child_id,
+            child=_create_map_child(child_id, child["type"], child.get("data", {})),
+            concurrency=node_data.get("concurrency", 4),
+            rate_limit=node_data.get("rate_limit"),
+            failure_policy=node_data.get("failure_policy", "fail_fast"),
+        ).work,
+    )
+
+
+def _get_join_mode(join_node: dict[str, Any]) -> str:
+    return join_node["data"].get("mode", JoinMode.ALL)
+
+
+def _get_join_predecessors(join_id: str, context: WorkflowBuildContext) -> list[str]:
+    return [
+        "InputNode" if edge["source"] == "start" else edge["source"]
+        for edge in context.incoming.get(join_id, [])
+    ]
+
+
+def _is_join_managed_edge(edge: dict, join_nodes: dict[str, dict]) -> bool:
+    """Edges into a join, and out of an any/quorum join, are added by _add_join_edges"""
+    if edge["target"] in join_nodes:
+        return True
+    source_join = join_nodes.get(edge["source"])
+    return source_join is not None and _get_join_mode(source_join) != JoinMode.ALL
+
+
+def _add_join_node(
+    graph_builder, node_id: str, node_data: dict, context: WorkflowBuildContext
+):
+    """Add a fan-in node that waits for its parallel predecessors"""
+    graph_builder.add_node(
+        node_id,
+        JoinNode(
+            node_id=node_id,
+            predecessors=_get_join_predecessors(node_id, context),
+            mode=node_data.get("mode", JoinMode.ALL),
+            quorum=node_data.get("quorum"),
+        ).work,
+    )
+
+
+def _add_join_edges(graph_builder, join_node: dict, context: WorkflowBuildContext):
+    """Connect the parallel branches of a join node.
+
+    Branches leaving the same node run in the same LangGraph superstep. In
+    "all" mode the join is reached through a waiting edge, so it runs once after
+    every predecessor finished. In "any"/"quorum" mode each predecessor records
+    its arrival and the join forwards to its targets only once the quorum is met.
+    """
+    join_id = join_node["id"]
+    mode = _get_join_mode(join_node)
+    predecessors = _get_join_predecessors(join_id, context)
+    if not predecessors:
+        raise ValueError(f"Join node {join_id} has no incoming edges")
+
+    if "InputNode" in predecessors:
+        graph_builder.add_edge(START, "InputNode")
+
+    for predecessor in predecessors:
+        predecessor_node = context.get_node(predecessor) or {}
+        if predecessor_node.get("type") in ["classifier", "ifelse"]:
+            raise ValueError(
+                f"Join node {join_id} cannot be reached through conditional node {predecessor}"
+            )
+
+    if mode == JoinMode.ALL:
+        graph_builder.add_edge(predecessors, join_id)
+        return
+
+    for predecessor in predecessors:
+        arrival_node_id = f"{join_id}__{predecessor}"
+        graph_builder.add_node(
+            arrival_node_id, record_join_arrival(join_id, predecessor)
+        )
+        graph_builder.add_edge(predecessor, arrival_node_id)
+        graph_builder.add_edge(arrival_node_id, join_id)
+
+    targets = [
+        END if target_node["type"] == "end" else edge["target"]
+        for edge, target_node in context.successors(join_id)
+    ]
+    graph_builder.add_conditional_edges(
+        join_id,
+        should_continue_join(join_id, targets or [END], END),
+        list(dict.fromkeys(targets + [END])),
+    )
@@ -1,14 +1,15 @@
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 
-from app.core.state import (ReturnWorkflowState, WorkflowState,
-                            parse_variables, update_node_outputs)
+from app.core.state import ReturnWorkflowState, WorkflowState, update_node_outputs
+from app.core.workflow.utils.template import compile_template
 
 
 class AnswerNode:
     def __init__(self, node_id: str, input_schema: str):
         self.node_id = node_id
         self.input_schema = input_schema
+        self.input_template = compile_template(input_schema) if input_schema else None
 
     async def work(
         self, state: WorkflowState, config: RunnableConfig
@@ -16,10 +17,8 @@ class AnswerNode:
         if "node_outputs" not in state:
             state["node_outputs"] = {}
 
-        if self.input_schema:
-            parsed_input_schema = parse_variables(
-                self.input_schema, state["node_outputs"]
-            )
+        if self.input_template:
+            parsed_input_schema = self.input_template.render(state["node_outputs"])
             result = AIMessage(content=parsed_input_schema)
         else:
             messages = state.get("messages", [])
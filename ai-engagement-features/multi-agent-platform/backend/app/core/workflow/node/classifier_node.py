@@ -1,16 +1,27 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
 from typing import Any
 
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import Runnable, RunnableConfig
 
+from app.core.model_providers.hedging import hedged_ainvoke, model_key
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
 from app.core.workflow.utils.db_utils import get_model_info
+from app.core.workflow.utils.embedding_router import (EmbeddingMatch,
+                                                      EmbeddingRouter,
+                                                      get_embedding_router)
 
 from ...state import (ReturnWorkflowState, WorkflowState, parse_variables,
                       update_node_outputs)
 
+logger = logging.getLogger(__name__)
+
 CLASSIFIER_SYSTEM_PROMPT = """
 ### Job Description
 You are a text classification engine that analyzes text data and assigns categories based on user input or automatically determined categories.
@@ -45,8 +56,61 @@ QUESTION_CLASSIFIER_USER_PROMPT = """
 """
 
 
+class ClassifierPath:
+    EMBEDDING = "embedding"  # 向量最近邻直接命中
+    LLM = "llm"  # 调用 LLM 分类
+    EMBEDDING_FALLBACK = "embedding_fallback"  # LLM 超时，使用向量最近邻的结果
+
+
+# 每个请求都会重新构建图，分类链按模型配置在进程内复用
+CHAIN_CACHE_SIZE = 64
+_chains: OrderedDict[tuple, Runnable] = OrderedDict()
+
+
+def _get_chain(
+    model_info: dict[str, Any], llm_cache: dict[str, Any] | None
+) -> Runnable:
+    key = (
+        model_info["provider_name"],
+        model_info["ai_model_name"],
+        model_info["base_url"],
+        hashlib.sha256((model_info["api_key"] or "").encode()).hexdigest(),
+        json.dumps(llm_cache, sort_keys=True),
+    )
+    chain = _chains.get(key)
+    if chain is not None:
+        _chains.move_to_end(key)
+        return chain
+
+    llm = model_provider_manager.init_model(
+        provider_name=model_info["provider_name"],
+        model=model_info["ai_model_name"],
+        temperature=0.1,
+        api_key=model_info["api_key"],
+        base_url=model_info["base_url"],
+        llm_cache=llm_cache,
+    )
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", CLASSIFIER_SYSTEM_PROMPT),
+            ("user", QUESTION_CLASSIFIER_USER_PROMPT),
+        ]
+    )
+    chain = _chains[key] = prompt | llm | JsonOutputParser()
+    while len(_chains) > CHAIN_CACHE_SIZE:
+        _chains.popitem(last=False)
+    return chain
+
+
 class ClassifierNode:
-    """Classifier Node for classifying input text into predefined categories"""
+    """Classifier Node for classifying input text into predefined categories
+
+    With ``embedding_routing`` enabled, category names and their ``examples``
+    are embedded once per process (see ``get_embedding_router``) and inputs
+    are matched to the nearest category centroid.
+    The LLM is only called when that match is below the configured confidence.
+    ``llm_cache`` opts the node into the LLM response cache.
+    """
 
     def __init__(
         self,
@@ -54,48 +118,58 @@ class ClassifierNode:
         model_name: str,
         categories: list[dict[str, str]],
         input: str = "",
+        embedding_routing: dict[str, Any] | None = None,
+        llm_cache: dict[str, Any] | None = None,
     ):
         self.node_id = node_id
         self.categories = categories
         self.input = input
         self.model_info = get_model_info(model_name)
+        self.embedding_routing = embedding_routing or {}
+        self._router: EmbeddingRouter | None = None
+        self._router_ready = False
+        self._router_lock = asyncio.Lock()
 
-    async def work(
-        self, state: WorkflowState, config: RunnableConfig
-    ) -> ReturnWorkflowState:
-        """Execute classification work"""
-        if "node_outputs" not in state:
-            state["node_outputs"] = {}
-
-        # Parse input variable if exists
-        input_text = (
-            parse_variables(self.input, state["node_outputs"]) if self.input else None
-        )
-        if not input_text and state.get("messages"):
-            input_text = state["messages"][-1].content
+        self.chain = _get_chain(self.model_info, llm_cache)
+        self.categories_list = [cat["category_name"] for cat in self.categories]
 
-        # Initialize LLM with provider info
-        llm = model_provider_manager.init_model(
-            provider_name=self.model_info["provider_name"],
-            model=self.model_info["ai_model_name"],
-            temperature=0.1,
-            api_key=self.model_info["api_key"],
-            base_url=self.model_info["base_url"],
-        )
+    async def prepare(self) -> EmbeddingRouter | None:
+        """Look up (or embed, on first use) the categories for the fast path"""
+        if self._router_ready or not self.embedding_routing.get("enabled"):
+            return self._router
+        async with self._router_lock:
+            if self._router_ready:
+                return self._router
+            try:
+                self._router = await get_embedding_router(
+                    self.categories,
+                    provider=self.embedding_routing.get("provider"),
+                    margin=self.embedding_routing.get("margin", 0.05),
+                    min_similarity=self.embedding_routing.get("min_similarity", 0.5),
+                )
+            except Exception as e:
+                # 向量化失败时退回到纯 LLM 分类
+                logger.warning(
+                    f"Classifier {self.node_id} embedding routing disabled: {e}"
+                )
+                self._router = None
+            self._router_ready = True
+        return self._router
 
-        # Prepare categories list and input in JSON format
-        categories_list = [cat["category_name"] for cat in self.categories]
-        input_json = {"input_text": [input_text], "categories": categories_list}
+    async def _classify_with_embeddings(self, input_text: str) -> EmbeddingMatch | None:
+        router = await self.prepare()
+        if router is None or not input_text:
+            return None
+        try:
+            return await router.classify(input_text)
+        except Exception as e:
+            logger.warning(f"Classifier {self.node_id} embedding lookup failed: {e}")
+            return None
 
-        # Prepare prompt and get classification result
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", CLASSIFIER_SYSTEM_PROMPT),
-                ("user", QUESTION_CLASSIFIER_USER_PROMPT),
-            ]
-        )
-        outputparser = JsonOutputParser()
-        chain = prompt | llm | outputparser
+    async def _classify_with_llm(
+        self, input_text: str, config: RunnableConfig | None = None
+    ) -> str:
+        input_json = {"input_text": [input_text], "categories": self.categories_list}
 
         # Add helper function to normalize result
         def normalize_category_result(result: Any) -> str:
@@ -116,16 +190,15 @@ class ClassifierNode:
                 # 出错时使用 others 分类
                 return "Others Intent"
 
-        result = await chain.ainvoke(input_json)
-
-        # Ensure categories is not empty and has valid format
-        if not self.categories or not isinstance(self.categories, list):
-            print("Invalid categories format")
-            return {"node_outputs": state.get("node_outputs", {})}
+        # 分类调用很短但决定了响应速度，使用对冲请求和截止时间
+        result = await hedged_ainvoke(
+            self.chain, input_json, config, model_key(self.model_info)
+        )
 
         # Get normalized category name
-        category_name = normalize_category_result(result)
+        return normalize_category_result(result)
 
+    def _match_category(self, category_name: str) -> dict[str, Any]:
         try:
             # Find matching category and get its ID
             matched_category = next(
@@ -160,14 +233,58 @@ class ClassifierNode:
                 ),
                 {"category_id": "others_category", "category_name": "Others Intent"},
             )
+        return matched_category
+
+    async def work(
+        self, state: WorkflowState, config: RunnableConfig
+    ) -> ReturnWorkflowState:
+        """Execute classification work"""
+        if "node_outputs" not in state:
+            state["node_outputs"] = {}
+
+        # Parse input variable if exists
+        input_text = (
+            parse_variables(self.input, state["node_outputs"]) if self.input else None
+        )
+        if not input_text and state.get("messages"):
+            input_text = state["messages"][-1].content
+
+        # Ensure categories is not empty and has valid format
+        if not self.categories or not isinstance(self.categories, list):
+            print("Invalid categories format")
+            return {"node_outputs": state.get("node_outputs", {})}
+
+        match = await self._classify_with_embeddings(input_text)
+        if match is not None and match.accepted:
+            path = ClassifierPath.EMBEDDING
+            matched_category = match.category
+        else:
+            path = ClassifierPath.LLM
+            try:
+                category_name = await self._classify_with_llm(input_text, config)
+                matched_category = self._match_category(category_name)
+            except TimeoutError:
+                if match is None:
+                    raise
+                # 超过截止时间时退回到向量最近邻的结果
+                logger.warning(
+                    f"Classifier {self.node_id} LLM timed out, "
+                    "using the nearest embedding category"
+                )
+                path = ClassifierPath.EMBEDDING_FALLBACK
+                matched_category = match.category
+
         print("matched_category:", matched_category)
         # Update node outputs with both category_id and category_name
-        new_output = {
-            self.node_id: {
-                "category_id": matched_category["category_id"],
-                "category_name": matched_category["category_name"],
-            }
+        classifier_output = {
+            "category_id": matched_category["category_id"],
+            "category_name": matched_category["category_name"],
+            "path": path,
         }
+        if match is not None:
+            classifier_output["similarity"] = round(match.similarity, 4)
+            classifier_output["margin"] = round(match.margin, 4)
+        new_output = {self.node_id: classifier_output}
         state["node_outputs"] = update_node_outputs(state["node_outputs"], new_output)
 
         return_state: ReturnWorkflowState = {
@@ -1,17 +1,34 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 from crewai import Agent, Crew, Process, Task
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 
+from app.core.config import settings
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
 from app.core.tools.tool_manager import get_tool_by_name
 from app.core.workflow.utils.db_utils import get_model_info
+from app.core.workflow.utils.template import compile_template
 
 from ...state import (ReturnWorkflowState, WorkflowState, parse_variables,
                       update_node_outputs)
 
+logger = logging.getLogger(__name__)
+
+# 流式输出中 CrewAI 中间步骤的自定义事件名
+CREWAI_STEP_EVENT = "crewai_step"
+
+# CrewAI 的 kickoff 是同步阻塞的，放到有界线程池中执行，避免阻塞事件循环
+_crew_executor = ThreadPoolExecutor(
+    max_workers=settings.CREWAI_MAX_WORKERS, thread_name_prefix="crewai"
+)
+
 
 class CrewAINode:
     DEFAULT_MANAGER_BACKSTORY = """You are a seasoned manager with a knack for getting the best out of your team.
@@ -81,6 +98,24 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
                 llm=self.llm,
             )
 
+        # 工具和不含变量的 agent 只在构建时创建一次，每次运行只复制
+        self.agent_tools = {
+            agent_config["id"]: self._get_tools(agent_config)
+            for agent_config in self.agents_config
+        }
+        self.static_agents = {
+            agent_config["id"]: self._create_agent(agent_config, {})
+            for agent_config in self.agents_config
+            if not self._has_variables(agent_config)
+        }
+
+    @staticmethod
+    def _has_variables(agent_config: dict[str, Any]) -> bool:
+        return any(
+            not compile_template(agent_config[field]).is_constant
+            for field in ("role", "goal", "backstory")
+        )
+
     def _get_tool_instance(self, tool_name: str):
         """Get tool instance by name"""
         for tool_id, tool_info in get_tool_by_name.items():
@@ -88,32 +123,43 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
                 return tool_info.tool
         return None
 
-    def _create_agent(
-        self, agent_config: dict[str, Any], state: WorkflowState
-    ) -> Agent:
-        """Create an agent from configuration with variable parsing"""
+    def _get_tools(self, agent_config: dict[str, Any]) -> list:
         tools = []
         # 从配置中获取工具列表
         for tool_name in agent_config.get("tools", []):
             tool = self._get_tool_instance(tool_name)
             if tool:
                 tools.append(tool)
+        return tools
 
+    def _create_agent(
+        self, agent_config: dict[str, Any], node_outputs: dict[str, Any]
+    ) -> Agent:
+        """Create an agent from configuration with variable parsing"""
         # Parse variables in agent configuration
-        role = parse_variables(agent_config["role"], state["node_outputs"])
-        goal = parse_variables(agent_config["goal"], state["node_outputs"])
-        backstory = parse_variables(agent_config["backstory"], state["node_outputs"])
+        role = parse_variables(agent_config["role"], node_outputs)
+        goal = parse_variables(agent_config["goal"], node_outputs)
+        backstory = parse_variables(agent_config["backstory"], node_outputs)
 
         return Agent(
             role=role,
             goal=goal,
             backstory=backstory,
             allow_delegation=agent_config.get("allow_delegation", False),
-            tools=tools,
+            tools=self.agent_tools.get(agent_config["id"], []),
             verbose=True,
             llm=self.llm,
         )
 
+    def _get_run_agent(
+        self, agent_config: dict[str, Any], state: WorkflowState
+    ) -> Agent:
+        """Return a per-run agent; crew runs mutate their agents"""
+        static_agent = self.static_agents.get(agent_config["id"])
+        if static_agent is not None:
+            return static_agent.copy()
+        return self._create_agent(agent_config, state["node_outputs"])
+
     def _create_task(
         self,
         task_config: dict[str, Any],
@@ -148,6 +194,45 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
             llm=self.llm,
         )
 
+    def _make_stream_callbacks(self, config: RunnableConfig):
+        """Forward CrewAI step/task output from the worker thread to the SSE stream"""
+        loop = asyncio.get_running_loop()
+        step_count = 0
+        pending: list[Future] = []
+
+        def emit(kind: str, name: str, content: str) -> None:
+            nonlocal step_count
+            step_count += 1
+            data = {
+                "node_id": self.node_id,
+                "step": step_count,
+                "kind": kind,
+                "name": name,
+                "content": content,
+            }
+            future = asyncio.run_coroutine_threadsafe(
+                adispatch_custom_event(CREWAI_STEP_EVENT, data, config=config), loop
+            )
+            future.add_done_callback(log_failure)
+            pending.append(future)
+
+        def log_failure(future) -> None:
+            if future.exception() is not None:
+                logger.debug(f"Failed to stream CrewAI step: {future.exception()}")
+
+        def step_callback(step: Any) -> None:
+            text = getattr(step, "text", None) or str(step)
+            emit("step", getattr(step, "tool", None) or self.node_id, text)
+
+        def task_callback(task_output: Any) -> None:
+            emit(
+                "task",
+                getattr(task_output, "agent", None) or self.node_id,
+                getattr(task_output, "raw", None) or str(task_output),
+            )
+
+        return step_callback, task_callback, pending
+
     async def work(
         self, state: WorkflowState, config: RunnableConfig
     ) -> ReturnWorkflowState:
@@ -156,7 +241,7 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
 
         # Create agents with variable parsing
         agents = {
-            agent_config["id"]: self._create_agent(agent_config, state)
+            agent_config["id"]: self._get_run_agent(agent_config, state)
             for agent_config in self.agents_config
         }
 
@@ -166,6 +251,10 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
             for task_config in self.tasks_config
         ]
 
+        step_callback, task_callback, pending_steps = self._make_stream_callbacks(
+            config
+        )
+
         # Create and run crew
         crew = Crew(
             agents=list(agents.values()),
@@ -177,12 +266,25 @@ Even though you don't perform tasks by yourself, you have a lot of experience in
             ),
             verbose=True,
             manager_agent=(
-                self.manager_agent if self.process_type == "hierarchical" else None
+                self.manager_agent.copy()
+                if self.process_type == "hierarchical"
+                else None
             ),
+            step_callback=step_callback,
+            task_callback=task_callback,
         )
 
-        # Run the crew
-        result = crew.kickoff()
+        # Run the crew in the bounded executor
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        result = await loop.run_in_executor(
+            _crew_executor, lambda: context.run(crew.kickoff)
+        )
+        # 确保所有中间步骤都先于最终结果发送
+        await asyncio.gather(
+            *(asyncio.wrap_future(future) for future in pending_steps),
+            return_exceptions=True,
+        )
         raw_result_str = result.raw
 
         # Update node_outputs
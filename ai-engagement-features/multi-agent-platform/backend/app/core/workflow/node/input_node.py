@@ -11,4 +11,6 @@ def InputNode(state: WorkflowState):
         human_message = messages[-1].content
     inputnode_outputs = {"start": {"query": human_message}}
     state["node_outputs"] = inputnode_outputs
+    # 每次运行开始时清空并行分支的汇合记录
+    state["joins"] = {}
     return state
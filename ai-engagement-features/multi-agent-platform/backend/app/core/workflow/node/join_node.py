@@ -0,0 +1,117 @@
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+from app.core.state import ReturnWorkflowState, WorkflowState, update_node_outputs
+
+
+class JoinMode:
+    ALL = "all"  # 等待所有前驱分支完成（LangGraph 的 waiting edge）
+    ANY = "any"  # 任一前驱分支完成即继续
+    QUORUM = "quorum"  # 达到指定数量的前驱分支完成即继续
+
+
+class JoinStatus:
+    FIRED = "fired"  # 本次触发满足条件，继续执行后续节点
+    WAITING = "waiting"  # 尚未达到条件
+    SKIPPED = "skipped"  # 已经触发过，后续到达的分支不再向下传递
+
+
+def record_join_arrival(join_id: str, predecessor_id: str):
+    """Create the node function that records a predecessor reaching a join."""
+
+    def arrive(state: WorkflowState) -> ReturnWorkflowState:
+        return {"joins": {join_id: {"arrived": [predecessor_id]}}}
+
+    return arrive
+
+
+class JoinNode:
+    """Fan-in node that merges the node_outputs of its parallel predecessors"""
+
+    def __init__(
+        self,
+        node_id: str,
+        predecessors: list[str],
+        mode: str = JoinMode.ALL,
+        quorum: int | None = None,
+    ):
+        if mode not in (JoinMode.ALL, JoinMode.ANY, JoinMode.QUORUM):
+            raise ValueError(f"Unknown join mode: {mode}")
+        if mode == JoinMode.QUORUM and not quorum:
+            raise ValueError("Quorum join requires a quorum size")
+
+        self.node_id = node_id
+        self.predecessors = predecessors
+        self.mode = mode
+        if mode == JoinMode.ALL:
+            self.quorum = len(predecessors)
+        elif mode == JoinMode.ANY:
+            self.quorum = 1
+        else:
+            self.quorum = min(quorum, len(predecessors))
+
+    def _merge_outputs(
+        self, node_outputs: dict[str, Any], arrived: list[str]
+    ) -> dict[str, Any]:
+        return {
+            predecessor: node_outputs.get(predecessor)
+            for predecessor in self.predecessors
+            if predecessor in arrived
+        }
+
+    async def work(
+        self, state: WorkflowState, config: RunnableConfig
+    ) -> ReturnWorkflowState:
+        if "node_outputs" not in state:
+            state["node_outputs"] = {}
+
+        if self.mode == JoinMode.ALL:
+            # waiting edge 保证此时所有前驱都已完成
+            arrived = self.predecessors
+            status = JoinStatus.FIRED
+            join_update: dict[str, Any] = {}
+        else:
+            join_state = state.get("joins", {}).get(self.node_id, {})
+            arrived = join_state.get("arrived", [])
+            if join_state.get("fired"):
+                status = JoinStatus.SKIPPED
+            elif len(arrived) >= self.quorum:
+                status = JoinStatus.FIRED
+            else:
+                status = JoinStatus.WAITING
+            join_update = {self.node_id: {"status": status}}
+            if status == JoinStatus.FIRED:
+                join_update[self.node_id]["fired"] = True
+            else:
+                # 未触发时只记录状态：join 已触发时下游节点可能仍在读取它的输出
+                return {"joins": join_update}
+
+        new_output = {
+            self.node_id: {
+                "status": status,
+                "results": self._merge_outputs(state["node_outputs"], arrived),
+            }
+        }
+        state["node_outputs"] = update_node_outputs(state["node_outputs"], new_output)
+
+        return_state: ReturnWorkflowState = {
+            "node_outputs": state["node_outputs"],
+        }
+        if join_update:
+            return_state["joins"] = join_update
+        return return_state
+
+
+def should_continue_join(join_id: str, targets: list[str], stop: str):
+    """Create the routing function for the outgoing edges of an any/quorum join.
+
+    Only the invocation that fires the join continues to `targets`; earlier and
+    later arrivals are routed to `stop` so downstream nodes run exactly once.
+    """
+
+    def route(state: WorkflowState) -> list[str] | str:
+        join_state = state.get("joins", {}).get(join_id, {})
+        return targets if join_state.get("status") == JoinStatus.FIRED else stop
+
+    return route
@@ -6,9 +6,9 @@ from langchain_core.tools import BaseTool
 
 from app.core.model_providers.model_provider_manager import \
     model_provider_manager
-from app.core.state import (ReturnWorkflowState, WorkflowState,
-                            parse_variables, update_node_outputs)
+from app.core.state import ReturnWorkflowState, WorkflowState, update_node_outputs
 from app.core.workflow.utils.db_utils import get_model_info
+from app.core.workflow.utils.template import compile_template
 
 
 class LLMBaseNode:
@@ -25,6 +25,11 @@ class LLMBaseNode:
         self.node_id = node_id
         self.system_prompt = system_prompt
         self.user_prompt = user_prompt
+        # 提示词模板在构建时编译，运行时只做取值和拼接
+        self.system_template = (
+            compile_template(system_prompt) if system_prompt else None
+        )
+        self.user_template = compile_template(user_prompt) if user_prompt else None
         self.agent_name = agent_name
         self.model_info = get_model_info(model_name)
         try:
@@ -58,21 +63,21 @@ class LLMNode(LLMBaseNode):
         history_messages = state.get("messages", [])
 
         final_prompt_for_model = []
-        if self.system_prompt:
+        if self.system_template:
             parsed_system_prompt = (
-                parse_variables(self.system_prompt, state["node_outputs"])
+                self.system_template.render(state["node_outputs"])
                 .replace("{", "{{")
                 .replace("}", "}}")
             )
             final_prompt_for_model.append(SystemMessage(content=parsed_system_prompt))
 
-        if not self.user_prompt:
+        if not self.user_template:
             raise ValueError(
                 "No input found in llm node, Please check your node settings."
             )
 
         parsed_user_prompt = (
-            parse_variables(self.user_prompt, state["node_outputs"])
+            self.user_template.render(state["node_outputs"])
             .replace("{", "{{")
             .replace("}", "}}")
         )
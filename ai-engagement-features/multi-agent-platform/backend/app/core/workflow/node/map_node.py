@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+from app.core.state import (
+    ReturnWorkflowState,
+    WorkflowState,
+    get_variable_value,
+    update_node_outputs,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MapFailurePolicy:
+    FAIL_FAST = "fail_fast"  # 任一条目失败即取消其余条目并抛出异常
+    CONTINUE = "continue"  # 记录错误，结果位置填 None，继续处理其余条目
+
+
+class _RateLimiter:
+    """Spaces out item start times to at most `rate` starts per second."""
+
+    def __init__(self, rate: float | None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class MapNode:
+    """Run a child node over every item of a list with bounded concurrency.
+
+    The current item is exposed to the child as `${<map_node_id>.item}` and its
+    position as `${<map_node_id>.index}`. Results are collected in input order.
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        items: str,
+        child_id: str,
+        child: Any,
+        concurrency: int = 4,
+        rate_limit: float | None = None,
+        failure_policy: str = MapFailurePolicy.FAIL_FAST,
+    ):
+        if concurrency < 1:
+            raise ValueError("Map node concurrency must be at least 1")
+        if failure_policy not in (
+            MapFailurePolicy.FAIL_FAST,
+            MapFailurePolicy.CONTINUE,
+        ):
+            raise ValueError(f"Unknown map failure policy: {failure_policy}")
+
+        self.node_id = node_id
+        self.items = items
+        self.child_id = child_id
+        # 子节点只构建一次，所有条目共用
+        self.child = child
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.failure_policy = failure_policy
+
+    def _resolve_items(self, node_outputs: dict[str, Any]) -> list[Any]:
+        value = get_variable_value(self.items, node_outputs)
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError(
+                    f"Map node {self.node_id} input is not a list: {value[:100]}"
+                )
+        if value is None:
+            raise ValueError(f"Map node {self.node_id} input {self.items} not found")
+        if isinstance(value, dict):
+            # 参数提取节点的输出通常是 {"rows": [...]}，取唯一的列表字段
+            lists = [v for v in value.values() if isinstance(v, list)]
+            if len(lists) == 1:
+                value = lists[0]
+        if not isinstance(value, list):
+            raise ValueError(f"Map node {self.node_id} input is not a list")
+        return value
+
+    async def _run_item(
+        self,
+        index: int,
+        item: Any,
+        state: WorkflowState,
+        config: RunnableConfig,
+        semaphore: asyncio.Semaphore,
+        limiter: _RateLimiter,
+    ) -> Any:
+        async with semaphore:
+            await limiter.wait()
+            item_state: WorkflowState = {
+                "messages": state.get("messages", []),
+                "node_outputs": update_node_outputs(
+                    state["node_outputs"],
+                    {self.node_id: {"item": item, "index": index}},
+                ),
+            }
+            result = await self.child.work(item_state, config)
+            child_output = result.get("node_outputs", {}).get(self.child_id)
+            if isinstance(child_output, dict) and set(child_output) == {"response"}:
+                return child_output["response"]
+            return child_output
+
+    async def work(
+        self, state: WorkflowState, config: RunnableConfig
+    ) -> ReturnWorkflowState:
+        if "node_outputs" not in state:
+            state["node_outputs"] = {}
+
+        items = self._resolve_items(state["node_outputs"])
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = _RateLimiter(self.rate_limit)
+
+        tasks = [
+            asyncio.create_task(
+                self._run_item(index, item, state, config, semaphore, limiter)
+            )
+            for index, item in enumerate(items)
+        ]
+
+        results: list[Any] = [None] * len(items)
+        errors: list[dict[str, Any]] = []
+        try:
+            if self.failure_policy == MapFailurePolicy.FAIL_FAST:
+                results = list(await asyncio.gather(*tasks))
+            else:
+                outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+                for index, outcome in enumerate(outcomes):
+                    if isinstance(outcome, BaseException):
+                        logger.warning(
+                            f"Map node {self.node_id} item {index} failed: {outcome}"
+                        )
+                        errors.append({"index": index, "error": str(outcome)})
+                    else:
+                        results[index] = outcome
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        new_output = {self.node_id: {"results": results, "errors": errors}}
+        state["node_outputs"] = update_node_outputs(state["node_outputs"], new_output)
+
+        return_state: ReturnWorkflowState = {
+            "node_outputs": state["node_outputs"],
+        }
+        return return_state
@@ -1,3 +1,5 @@
+from typing import Any
+
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
@@ -85,12 +87,14 @@ class ParameterExtractorNode:
         parameter_schema: list[dict],
         input: str = "",
         instruction: str = "",
+        llm_cache: dict[str, Any] | None = None,
     ):
         self.node_id = node_id
         self.parameter_schema = self._convert_schema_format(parameter_schema)
         self.input = input
         self.model_info = get_model_info(model_name)
         self.instruction = instruction
+        self.llm_cache = llm_cache
 
     def _convert_schema_format(self, schema_list: list[dict]) -> dict:
         """Convert schema from list format to single object format
@@ -141,6 +145,7 @@ class ParameterExtractorNode:
             temperature=0.1,
             api_key=self.model_info["api_key"],
             base_url=self.model_info["base_url"],
+            llm_cache=self.llm_cache,
         )
 
         # Prepare input in JSON format
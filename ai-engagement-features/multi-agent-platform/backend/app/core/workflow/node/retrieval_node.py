@@ -1,8 +1,13 @@
+import asyncio
 import logging
 import uuid
+from typing import Any
 
-from app.core.rag.qdrant import QdrantStore
-from app.core.tools.retriever_tool import create_retriever_tool_custom_modified
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.rag.qdrant import get_shared_qdrant_store
+from app.core.rag.rerank import get_reranker, pack_documents
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,13 +20,52 @@ from app.core.state import (ReturnWorkflowState, WorkflowState,
                             parse_variables, update_node_outputs)
 
 
+def merge_documents(documents: list[Document], top_k: int | None) -> list[Document]:
+    """Deduplicate by content, keeping the best score, and return the top_k"""
+    best: dict[str, Document] = {}
+    for doc in documents:
+        key = doc.page_content.strip()
+        current = best.get(key)
+        score = doc.metadata.get("score", 0)
+        if current is None or score > current.metadata.get("score", 0):
+            best[key] = doc
+    merged = sorted(
+        best.values(), key=lambda doc: doc.metadata.get("score", 0), reverse=True
+    )
+    return merged[:top_k]
+
+
 class RetrievalNode:
-    def __init__(self, node_id: str, query: str, user_id: int, kb_id: int):
+    """Query one or more knowledge bases concurrently and merge the results.
+
+    ``knowledge_bases`` is a list of ``{"usr_id", "kb_id"}``; the legacy single
+    ``user_id``/``kb_id`` pair is still accepted. ``latency_budget`` (seconds)
+    bounds the whole retrieval: knowledge bases that have not answered in time
+    are cancelled and the node continues with the results it has.
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        query: str,
+        user_id: int | None = None,
+        kb_id: int | None = None,
+        knowledge_bases: list[dict[str, Any]] | None = None,
+        top_k: int = 5,
+        score_threshold: float | None = None,
+        latency_budget: float | None = None,
+    ):
         self.node_id = node_id
         self.query = query
-        self.qdrant_store = QdrantStore()
-        self.user_id = user_id
-        self.kb_id = kb_id
+        self.knowledge_bases = knowledge_bases or (
+            [{"usr_id": user_id, "kb_id": kb_id}] if kb_id is not None else []
+        )
+        if not self.knowledge_bases:
+            raise ValueError(f"Retrieval node {node_id} requires a knowledge base")
+        self.top_k = top_k
+        self.score_threshold = score_threshold
+        self.latency_budget = latency_budget
+        self.reranker = get_reranker()
 
     async def work(
         self, state: WorkflowState, config: RunnableConfig
@@ -32,7 +76,7 @@ class RetrievalNode:
 
         if self.query:
             parsed_input_schema = parse_variables(self.query, state["node_outputs"])
-            retrieval_result = self._retrieval_work(parsed_input_schema)
+            retrieval_result = await self._retrieval_work(parsed_input_schema)
             result = ToolMessage(
                 content=retrieval_result,
                 # name="KnowledgeBase",
@@ -54,13 +98,87 @@ class RetrievalNode:
         }
         return return_state
 
-    def _retrieval_work(self, qry):
-
-        retriever = self.qdrant_store.retriever(self.user_id, self.kb_id)
-
-        retriever_tool = create_retriever_tool_custom_modified(retriever)
+    def _remaining(self, deadline: float | None) -> float | None:
+        if deadline is None:
+            return None
+        return max(0.0, deadline - asyncio.get_running_loop().time())
+
+    async def _search_knowledge_bases(self, qry: str) -> list[Document]:
+        deadline = (
+            asyncio.get_running_loop().time() + self.latency_budget
+            if self.latency_budget
+            else None
+        )
+        # 使用进程共享的实例，每次构建图时不再创建新的客户端
+        qdrant_store = await asyncio.to_thread(get_shared_qdrant_store)
+        # 查询只向量化一次，所有知识库共用
+        try:
+            query_vector = await asyncio.wait_for(
+                qdrant_store.embedding_model.aembed_query(qry),
+                timeout=self._remaining(deadline),
+            )
+        except TimeoutError:
+            logger.warning(
+                f"Retrieval node {self.node_id} exceeded its latency budget "
+                f"of {self.latency_budget}s while embedding the query"
+            )
+            return []
+
+        tasks = {
+            asyncio.create_task(
+                qdrant_store.avector_search(
+                    knowledge_base["usr_id"],
+                    [knowledge_base["kb_id"]],
+                    # 启用重排时每个知识库多召回一些候选
+                    top_k=settings.RAG_RERANK_FETCH_K if self.reranker else self.top_k,
+                    score_threshold=self.score_threshold,
+                    query_vector=query_vector,
+                )
+            ): knowledge_base["kb_id"]
+            for knowledge_base in self.knowledge_bases
+        }
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self._remaining(deadline))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if pending:
+            # 超出延迟预算的知识库直接放弃，使用已返回的结果
+            logger.warning(
+                f"Retrieval node {self.node_id} exceeded its latency budget of "
+                f"{self.latency_budget}s, skipped knowledge bases: "
+                f"{[tasks[task] for task in pending]}"
+            )
 
-        result_string, docs = retriever_tool._run(qry)
+        documents: list[Document] = []
+        for task in done:
+            if task.exception() is not None:
+                logger.warning(
+                    f"Retrieval node {self.node_id} failed to query knowledge base "
+                    f"{tasks[task]}: {task.exception()}"
+                )
+                continue
+            documents.extend(task.result())
+        return documents
+
+    async def _retrieval_work(self, qry):
+        documents = await self._search_knowledge_bases(qry)
+        if self.reranker is None:
+            docs = merge_documents(documents, self.top_k)
+        else:
+            docs = await asyncio.to_thread(
+                self.reranker.rerank, qry, merge_documents(documents, None), self.top_k
+            )
+        if (
+            settings.RAG_CONTEXT_TOKEN_BUDGET is not None
+            or settings.RAG_DEDUP_THRESHOLD is not None
+        ):
+            docs = pack_documents(
+                docs, settings.RAG_CONTEXT_TOKEN_BUDGET, settings.RAG_DEDUP_THRESHOLD
+            )
+        result_string = "\n\n".join(doc.page_content for doc in docs)
 
         logger.info(f"Retriever tool result: {result_string[:100]}...")
         return result_string
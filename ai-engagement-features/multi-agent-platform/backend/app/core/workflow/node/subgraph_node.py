@@ -5,7 +5,7 @@ from langchain_core.runnables import RunnableConfig
 
 from app.core.state import (ReturnWorkflowState, WorkflowState,
                             parse_variables, update_node_outputs)
-from app.core.workflow.utils.db_utils import get_subgraph_by_id
+from app.core.workflow.utils.subgraph_cache import subgraph_cache
 
 
 class SubgraphNode:
@@ -18,20 +18,8 @@ class SubgraphNode:
         input: str = "",
     ):
         self.node_id = node_id
+        self.subgraph_id = subgraph_id
         self.input = input
-        # 初始化时编译子图
-        self.subgraph_config, self.subgraph_name = get_subgraph_by_id(subgraph_id)
-
-    async def _build_subgraph(self):
-        """Build and compile subgraph"""
-        from app.core.workflow.build_workflow import initialize_graph
-
-        # 使用主图的初始化函数来构建子图
-        return await initialize_graph(
-            self.subgraph_config,
-            checkpointer=None,  # 子图不需要checkpointer
-            save_graph_img=False,
-        )
 
     async def work(
         self, state: WorkflowState, config: RunnableConfig
@@ -47,21 +35,22 @@ class SubgraphNode:
         if not input_text and state.get("messages"):
             input_text = state["messages"][-1].content
 
-        self.subgraph = await self._build_subgraph()
+        # 子图按 (id, version) 编译一次并在所有父工作流间共享
+        subgraph = await subgraph_cache.get(self.subgraph_id)
 
         if input_text:
 
             try:
-                # 执行子图
+                # 执行子图，传入父图 config 使子图事件（如 token 流）汇入父图的事件流
                 input_state = {
                     "messages": [HumanMessage(content=input_text, name="user")],
                     "node_outputs": state["node_outputs"],
                 }
-                result = await self.subgraph.ainvoke(input_state)
+                result = await subgraph.graph.ainvoke(input_state, config)
                 subgraph_output = result["messages"][-1]
                 subgraph_result = ToolMessage(
                     content=subgraph_output.content,
-                    name=self.subgraph_name,
+                    name=subgraph.name,
                     tool_call_id=str(uuid.uuid4()),
                 )
                 new_output = {self.node_id: {"response": subgraph_result.content}}
@@ -1,9 +1,11 @@
 from collections.abc import Callable
 from contextlib import contextmanager
+from datetime import datetime
 from typing import Any, TypeVar
 
 from sqlmodel import Session, select
 
+from app.core.credential_cache import MODEL, credential_cache
 from app.core.database import get_session
 from app.db.models import ModelProvider, Models, Subgraph
 
@@ -46,31 +48,53 @@ def get_model_info(model_name: str) -> dict[str, str]:
     """
     Get model information from all available models.
     """
-    with get_db_session() as session:
-        # 直接从数据库查询 Models 和关联的 ModelProvider
-        model = session.exec(
-            select(Models).join(ModelProvider).where(Models.ai_model_name == model_name)
-        ).first()
-
-        if not model:
-            raise ValueError(f"Model {model_name} not supported now.")
 
-        return {
-            "ai_model_name": model.ai_model_name,
-            "provider_name": model.provider.provider_name,
-            "base_url": model.provider.base_url,
-            "api_key": (
-                model.provider.decrypted_api_key
-            ),  # 现在可以使用decrypted_api_key
-        }
+    def _load() -> dict[str, str]:
+        with get_db_session() as session:
+            # 直接从数据库查询 Models 和关联的 ModelProvider
+            model = session.exec(
+                select(Models)
+                .join(ModelProvider)
+                .where(Models.ai_model_name == model_name)
+            ).first()
+
+            if not model:
+                raise ValueError(f"Model {model_name} not supported now.")
+
+            return {
+                "ai_model_name": model.ai_model_name,
+                "provider_name": model.provider.provider_name,
+                "base_url": model.provider.base_url,
+                "api_key": (
+                    model.provider.decrypted_api_key
+                ),  # 现在可以使用decrypted_api_key
+            }
+
+    # 每个节点构建时都会调用，缓存避免重复查询数据库和解密
+    return credential_cache.get_or_load(MODEL, model_name, _load)
+
+
+def get_subgraph_by_id(
+    subgraph_id: int,
+) -> tuple[dict[str, Any], str, datetime | None]:
+    """
+    Get subgraph config, name and version (last update time) by ID.
+    """
+    with get_db_session() as session:
+        subgraph = session.get(Subgraph, subgraph_id)
+        if not subgraph:
+            raise ValueError(f"Subgraph {subgraph_id} not found")
+        return subgraph.config, subgraph.name, subgraph.updated_at
 
 
-def get_subgraph_by_id(subgraph_id: int) -> dict[str, Any]:
+def get_subgraph_version(subgraph_id: int) -> datetime | None:
     """
-    Get subgraph config by ID.
+    Get the version (last update time) of a subgraph without loading its config.
     """
     with get_db_session() as session:
-        subgraph = session.get(Subgraph, subgraph_id)
+        subgraph = session.exec(
+            select(Subgraph.id, Subgraph.updated_at).where(Subgraph.id == subgraph_id)
+        ).first()
         if not subgraph:
             raise ValueError(f"Subgraph {subgraph_id} not found")
-        return subgraph.config, subgraph.name
+        return subgraph.updated_at
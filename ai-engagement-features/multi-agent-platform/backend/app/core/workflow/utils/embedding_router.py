@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.rag.embeddings import (
+    embedding_credential_digest,
+    get_shared_embedding_model,
+)
+
+logger = logging.getLogger(__name__)
+
+OTHERS_CATEGORY_ID = "others_category"
+# 进程内缓存的路由器数量上限
+ROUTER_CACHE_SIZE = 128
+
+
+@dataclass
+class EmbeddingMatch:
+    category: dict[str, Any]
+    similarity: float
+    # 与第二名的相似度差值，只有一个类别时等于 similarity
+    margin: float
+    accepted: bool
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingRouter:
+    """Nearest-centroid classifier over category names and example utterances.
+
+    Each category is represented by the normalized mean embedding of its name
+    and its optional ``examples``. A match is accepted only when it is similar
+    enough and ahead of the runner-up by at least ``margin``; callers fall back
+    to the LLM otherwise.
+    """
+
+    def __init__(
+        self,
+        categories: list[dict[str, Any]],
+        centroids: np.ndarray,
+        embedding_model: Embeddings,
+        margin: float = 0.05,
+        min_similarity: float = 0.5,
+    ):
+        self.categories = categories
+        self.centroids = centroids
+        self.embedding_model = embedding_model
+        self.margin = margin
+        self.min_similarity = min_similarity
+
+    @staticmethod
+    def category_texts(category: dict[str, Any]) -> list[str]:
+        texts = [category.get("category_name", "")]
+        texts.extend(category.get("examples") or [])
+        return [text for text in texts if text and text.strip()]
+
+    @classmethod
+    async def build(
+        cls,
+        categories: list[dict[str, Any]],
+        provider: str | None = None,
+        margin: float = 0.05,
+        min_similarity: float = 0.5,
+    ) -> "EmbeddingRouter | None":
+        # "其他" 类别只有在配置了示例时才参与最近邻匹配，否则它只作为兜底
+        routable = [
+            category
+            for category in categories
+            if category.get("category_id") != OTHERS_CATEGORY_ID
+            or category.get("examples")
+        ]
+        if not routable:
+            return None
+
+        embedding_model = await asyncio.to_thread(
+            get_shared_embedding_model, provider or settings.EMBEDDING_PROVIDER
+        )
+
+        # 所有类别的文本一次性批量向量化
+        texts: list[str] = []
+        spans: list[tuple[int, int]] = []
+        for category in routable:
+            category_texts = cls.category_texts(category)
+            spans.append((len(texts), len(texts) + len(category_texts)))
+            texts.extend(category_texts)
+        vectors = _normalize(
+            np.asarray(await embedding_model.aembed_documents(texts), dtype=np.float32)
+        )
+        centroids = _normalize(
+            np.stack([vectors[start:end].mean(axis=0) for start, end in spans])
+        )
+        logger.info(
+            f"Built embedding router for {len(routable)} categories "
+            f"from {len(texts)} texts"
+        )
+        return cls(routable, centroids, embedding_model, margin, min_similarity)
+
+    async def classify(self, text: str) -> EmbeddingMatch:
+        query = _normalize(
+            np.asarray(await self.embedding_model.aembed_query(text), dtype=np.float32)
+        )
+        similarities = self.centroids @ query
+        ranked = np.argsort(similarities)[::-1]
+        best = float(similarities[ranked[0]])
+        runner_up = float(similarities[ranked[1]]) if len(ranked) > 1 else 0.0
+        margin = best - runner_up
+        return EmbeddingMatch(
+            category=self.categories[int(ranked[0])],
+            similarity=best,
+            margin=margin,
+            accepted=best >= self.min_similarity and margin >= self.margin,
+        )
+
+
+# 每个请求都会重新构建图，类别向量按内容在进程内复用
+_routers: OrderedDict[tuple, EmbeddingRouter | None] = OrderedDict()
+
+
+async def get_embedding_router(
+    categories: list[dict[str, Any]],
+    provider: str | None = None,
+    margin: float = 0.05,
+    min_similarity: float = 0.5,
+) -> EmbeddingRouter | None:
+    """``EmbeddingRouter.build`` cached per process.
+
+    Keyed by the embedding provider, a digest of its API key, the categories'
+    ids and texts and the thresholds, so unchanged workflows only pay for the
+    embedding on their first request. Concurrent first requests may build the
+    same router twice.
+    """
+    provider = provider or settings.EMBEDDING_PROVIDER
+    credential_digest = await asyncio.to_thread(embedding_credential_digest, provider)
+    key = (
+        provider,
+        credential_digest,
+        json.dumps(
+            [
+                [category.get("category_id"), EmbeddingRouter.category_texts(category)]
+                for category in categories
+            ],
+            ensure_ascii=False,
+        ),
+        margin,
+        min_similarity,
+    )
+    if key in _routers:
+        _routers.move_to_end(key)
+        return _routers[key]
+
+    router = await EmbeddingRouter.build(categories, provider, margin, min_similarity)
+    _routers[key] = router
+    while len(_routers) > ROUTER_CACHE_SIZE:
+        _routers.popitem(last=False)
+    return router
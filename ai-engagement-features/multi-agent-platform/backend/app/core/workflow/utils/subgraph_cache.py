@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from langgraph.graph.graph import CompiledGraph
+
+from app.core.workflow.utils.db_utils import get_subgraph_by_id, get_subgraph_version
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompiledSubgraph:
+    subgraph_id: int
+    version: datetime | None
+    name: str
+    config: dict[str, Any]
+    graph: CompiledGraph
+
+
+class SubgraphCache:
+    """Process-wide cache of compiled subgraphs keyed by (subgraph id, version).
+
+    A compiled subgraph holds no per-run state (it is compiled without a
+    checkpointer), so one instance is shared by every parent workflow and
+    request that references it. The version is the subgraph's ``updated_at``;
+    it is read on every ``get`` so that changes made through another process
+    (other API workers, Celery) are picked up. ``invalidate`` additionally
+    drops entries right away when the subgraph is changed via this process's
+    subgraphs routes.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, CompiledSubgraph] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        # invalidate 时递增，编译期间被失效的结果不再写入缓存
+        self._generations: dict[int, int] = {}
+
+    def _get_lock(self, subgraph_id: int) -> asyncio.Lock:
+        lock = self._locks.get(subgraph_id)
+        if lock is None:
+            lock = self._locks[subgraph_id] = asyncio.Lock()
+        return lock
+
+    def _get_current(
+        self, subgraph_id: int, version: datetime | None
+    ) -> CompiledSubgraph | None:
+        entry = self._entries.get(subgraph_id)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    async def get(self, subgraph_id: int) -> CompiledSubgraph:
+        try:
+            version = await asyncio.to_thread(get_subgraph_version, subgraph_id)
+        except ValueError:
+            # 子图已在其他进程中删除
+            self.invalidate(subgraph_id)
+            raise
+        entry = self._get_current(subgraph_id, version)
+        if entry is not None:
+            return entry
+
+        # 同一子图并发首次调用时只编译一次
+        async with self._get_lock(subgraph_id):
+            entry = self._get_current(subgraph_id, version)
+            if entry is not None:
+                return entry
+
+            generation = self._generations.get(subgraph_id, 0)
+            config, name, version = await asyncio.to_thread(
+                get_subgraph_by_id, subgraph_id
+            )
+            entry = CompiledSubgraph(
+                subgraph_id=subgraph_id,
+                version=version,
+                name=name,
+                config=config,
+                graph=await self._compile(config),
+            )
+            if self._generations.get(subgraph_id, 0) == generation:
+                self._entries[subgraph_id] = entry
+            logger.info(f"Compiled subgraph {subgraph_id} (version {version})")
+            return entry
+
+    @staticmethod
+    async def _compile(config: dict[str, Any]) -> CompiledGraph:
+        from app.core.workflow.build_workflow import initialize_graph
+
+        # 使用主图的初始化函数来构建子图
+        return await initialize_graph(
+            config,
+            checkpointer=None,  # 子图不需要checkpointer
+            save_graph_img=False,
+        )
+
+    def invalidate(self, subgraph_id: int) -> None:
+        """Drop every cached version of a subgraph."""
+        self._generations[subgraph_id] = self._generations.get(subgraph_id, 0) + 1
+        if self._entries.pop(subgraph_id, None) is not None:
+            logger.info(f"Invalidated compiled subgraph {subgraph_id}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+subgraph_cache = SubgraphCache()
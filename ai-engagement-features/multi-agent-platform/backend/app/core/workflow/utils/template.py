@@ -0,0 +1,260 @@
+import logging
+import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+VARIABLE_PATTERN = re.compile(r"\${([^}]+)}")
+
+# 全角字符范围是 0xFF01 到 0xFF5E，对应半角字符 0x0021 到 0x007E
+_FULLWIDTH_TO_HALFWIDTH = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+
+_MISSING = object()
+
+
+def _make_accessor(var_path: tuple[str, ...]) -> Callable[[dict], Any]:
+    """Build a closure that walks a dotted path through node_outputs."""
+
+    def access(node_outputs: dict) -> Any:
+        value: Any = node_outputs
+        for key in var_path:
+            if isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                return _MISSING
+        return value
+
+    return access
+
+
+def _format_code_value(value: Any) -> str:
+    # 对于代码中的字符串，需要转换全角字符并正确转义
+    converted_value = str(value).translate(_FULLWIDTH_TO_HALFWIDTH)
+    escaped_value = converted_value.replace('"', '\\"').replace("\\", "\\\\")
+    return f'"{escaped_value}"'
+
+
+class CompiledTemplate:
+    """A `${node.field}` template split once into literals and path accessors."""
+
+    def __init__(self, text: str, is_code: bool = False):
+        self.text = text
+        self.is_code = is_code
+        self.references: list[tuple[str, ...]] = []
+        # parts 中的元素要么是字面量字符串，要么是 (原始占位符, accessor)
+        self._parts: list[str | tuple[str, Callable[[dict], Any]]] = []
+
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(text):
+            if match.start() > position:
+                self._parts.append(text[position : match.start()])
+            var_path = tuple(match.group(1).split("."))
+            self.references.append(var_path)
+            self._parts.append((match.group(0), _make_accessor(var_path)))
+            position = match.end()
+        if position < len(text):
+            self._parts.append(text[position:])
+
+        self._single_reference = (
+            self._parts[0][1]
+            if len(self._parts) == 1 and isinstance(self._parts[0], tuple)
+            else None
+        )
+
+    @property
+    def is_constant(self) -> bool:
+        return not self.references
+
+    def render(self, node_outputs: dict) -> str:
+        if self.is_constant:
+            return self.text
+        rendered = []
+        for part in self._parts:
+            if isinstance(part, str):
+                rendered.append(part)
+                continue
+            placeholder, access = part
+            value = access(node_outputs)
+            if value is _MISSING:
+                rendered.append(placeholder)  # 如果找不到变量，保持原样
+            elif self.is_code:
+                rendered.append(_format_code_value(value))
+            else:
+                rendered.append(str(value))
+        return "".join(rendered)
+
+    def resolve(self, node_outputs: dict) -> Any:
+        """Return the raw value when the template is exactly one reference."""
+        if self._single_reference is not None:
+            value = self._single_reference(node_outputs)
+            if value is not _MISSING:
+                return value
+        return self.render(node_outputs)
+
+    __call__ = render
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text: str, is_code: bool = False) -> CompiledTemplate:
+    return CompiledTemplate(text, is_code)
+
+
+def iter_template_strings(data: Any) -> Iterable[str]:
+    """Yield every string containing a `${...}` reference inside node data."""
+    if isinstance(data, str):
+        if "${" in data:
+            yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from iter_template_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_template_strings(value)
+
+
+def validate_template_references(nodes: list[dict[str, Any]]) -> list[str]:
+    """Compile every template in the workflow and check its node references.
+
+    Unknown references are only reported: at run time they render unchanged,
+    which is the behaviour workflows already rely on.
+    """
+    known_ids = {node["id"] for node in nodes} | {"start"}
+    problems = []
+    for node in nodes:
+        for text in iter_template_strings(node.get("data", {})):
+            for var_path in compile_template(text).references:
+                if var_path[0] not in known_ids:
+                    problems.append(
+                        f"Node {node['id']} references unknown node "
+                        f"'{var_path[0]}' in ${{{'.'.join(var_path)}}}"
+                    )
+    for problem in problems:
+        logger.warning(problem)
+    return problems
+
+
+# ---- if/else 条件编译 ----
+
+Predicate = Callable[[dict], bool]
+
+
+def _to_number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _length(value: Any) -> int | None:
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _numeric(compare: Callable[[float, float], bool]):
+    def predicate(field: Any, other: Any) -> bool:
+        left, right = _to_number(field), _to_number(other)
+        if left is None or right is None:
+            return False
+        return compare(left, right)
+
+    return predicate
+
+
+def _length_compare(compare: Callable[[int, int], bool]):
+    def predicate(field: Any, other: Any) -> bool:
+        length = _length(field)
+        expected = _to_number(other)
+        if length is None or expected is None:
+            return False
+        return compare(length, int(expected))
+
+    return predicate
+
+
+@lru_cache(maxsize=256)
+def _compile_regex(pattern: str) -> re.Pattern | None:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        logger.warning(f"Invalid regex in if/else condition '{pattern}': {e}")
+        return None
+
+
+def _regex_match(field: Any, other: Any) -> bool:
+    pattern = _compile_regex(str(other))
+    return bool(pattern and pattern.search(str(field)))
+
+
+# 字符串比较与原实现保持一致：两侧都按字符串处理
+_STRING_OPERATORS: dict[str, Callable[[str, str], bool]] = {
+    "contains": lambda field, other: other in field,
+    "notContains": lambda field, other: other not in field,
+    "startWith": lambda field, other: field.startswith(other),
+    "endWith": lambda field, other: field.endswith(other),
+    "equal": lambda field, other: field == other,
+    "notEqual": lambda field, other: field != other,
+}
+
+# 类型化比较：字段取原始值（单一变量引用时不做字符串化）
+_TYPED_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "greaterThan": _numeric(lambda a, b: a > b),
+    "lessThan": _numeric(lambda a, b: a < b),
+    "greaterThanOrEqual": _numeric(lambda a, b: a >= b),
+    "lessThanOrEqual": _numeric(lambda a, b: a <= b),
+    "numberEqual": _numeric(lambda a, b: a == b),
+    "regexMatch": _regex_match,
+    "lengthEqual": _length_compare(lambda a, b: a == b),
+    "lengthGreaterThan": _length_compare(lambda a, b: a > b),
+    "lengthLessThan": _length_compare(lambda a, b: a < b),
+}
+
+CONDITION_OPERATORS = {"empty", "notEmpty", *_STRING_OPERATORS, *_TYPED_OPERATORS}
+
+
+def compile_condition(condition: dict[str, Any]) -> Predicate:
+    """Compile one if/else condition into a predicate over node_outputs."""
+    operator = condition["comparison_operator"]
+    if operator not in CONDITION_OPERATORS:
+        raise ValueError(f"Unknown operator: {operator}")
+
+    field_template = compile_template(condition["field"] or "")
+    raw_value = condition.get("value")
+    if condition.get("compareType") == "variable":
+        value_template = compile_template(raw_value or "")
+        get_value: Callable[[dict], Any] = value_template.resolve
+    else:
+        get_value = lambda node_outputs: raw_value  # noqa: E731
+
+    if operator == "empty":
+        return lambda node_outputs: not field_template.render(node_outputs)
+    if operator == "notEmpty":
+        return lambda node_outputs: bool(field_template.render(node_outputs))
+
+    if operator in _STRING_OPERATORS:
+        compare = _STRING_OPERATORS[operator]
+        return lambda node_outputs: compare(
+            field_template.render(node_outputs), str(get_value(node_outputs))
+        )
+
+    typed_compare = _TYPED_OPERATORS[operator]
+    if operator == "regexMatch" and condition.get("compareType") != "variable":
+        # 常量正则在构建时编译并校验
+        _compile_regex(str(raw_value))
+    return lambda node_outputs: typed_compare(
+        field_template.resolve(node_outputs), get_value(node_outputs)
+    )
+
+
+def compile_case(case: dict[str, Any]) -> Predicate:
+    """Compile an if/else case (conditions joined by and/or) into a predicate."""
+    if case["case_id"] == "false_else" or not case["conditions"]:
+        return lambda node_outputs: False
+
+    predicates = [compile_condition(cond) for cond in case["conditions"]]
+    if case["logical_operator"] == "and":
+        return lambda node_outputs: all(p(node_outputs) for p in predicates)
+    return lambda node_outputs: any(p(node_outputs) for p in predicates)
@@ -2,6 +2,7 @@ from typing import Any
 
 from sqlmodel import Session, select
 
+from app.core.credential_cache import invalidate_model_provider_credentials
 from app.db.models import (ModelOutIdWithAndName, ModelProvider,
                            ModelProviderCreate, ModelProviderUpdate,
                            ModelProviderWithModelsListOut, Models,
@@ -25,6 +26,7 @@ def create_model_provider(
 
     session.add(db_model_provider)
     session.commit()
+    invalidate_model_provider_credentials()
     session.refresh(db_model_provider)
     return db_model_provider
 
@@ -55,6 +57,7 @@ def update_model_provider(
 
         session.add(db_model_provider)
         session.commit()
+        invalidate_model_provider_credentials()
         session.refresh(db_model_provider)
     return db_model_provider
 
@@ -77,6 +80,7 @@ def delete_model_provider(
 
         # 提交事务
         session.commit()
+        invalidate_model_provider_credentials()
 
         return model_provider
 
@@ -1,5 +1,6 @@
 from sqlmodel import Session, func, select
 
+from app.core.credential_cache import MODEL, credential_cache
 from app.db.models import (ModelOut, ModelProviderOut, Models, ModelsBase,
                            ModelsOut)
 
@@ -104,6 +105,7 @@ def _delete_model(session: Session, model_id: int) -> Models | None:
     if db_model:
         session.delete(db_model)
         session.commit()
+        credential_cache.invalidate(MODEL)
     return db_model
 
 
@@ -117,6 +119,7 @@ def _update_model(
             setattr(db_model, key, value)
         session.add(db_model)
         session.commit()
+        credential_cache.invalidate(MODEL)
         session.refresh(db_model)
     return db_model
 
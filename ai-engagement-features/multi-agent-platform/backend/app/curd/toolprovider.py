@@ -2,6 +2,7 @@ from typing import Any, Sequence
 
 from sqlmodel import Session, select
 
+from app.core.credential_cache import invalidate_tool_provider_credentials
 from app.db.models import (ProvidersListWithToolsOut, Tool,
                            ToolOutIdWithAndName, ToolProvider,
                            ToolProviderUpdate, ToolProviderWithToolsListOut)
@@ -13,6 +14,7 @@ def create_tool_provider(session: Session, tool_provider: ToolProvider) -> ToolP
     # 移除 api_key 相关操作
     session.add(db_provider)
     session.commit()
+    invalidate_tool_provider_credentials()
     session.refresh(db_provider)
     return db_provider
 
@@ -117,6 +119,7 @@ def update_tool_provider(
 
     session.add(db_provider)
     session.commit()
+    invalidate_tool_provider_credentials()
     session.refresh(db_provider)
     return db_provider
 
@@ -131,6 +134,7 @@ def delete_tool_provider(
 
     session.delete(db_provider)
     session.commit()
+    invalidate_tool_provider_credentials()
     return db_provider
 
 
@@ -408,11 +408,14 @@ class Interrupt(BaseModel):
 class TeamChat(BaseModel):
     messages: list[ChatMessage]
     interrupt: Interrupt | None = None
+    # 秒，Leader 路由和分类节点的 LLM 调用不会超过该截止时间
+    timeout: float | None = PydanticField(default=None, gt=0)
 
 
 class TeamChatPublic(BaseModel):
     message: ChatMessage | None = None
     interrupt: Interrupt | None = None
+    timeout: float | None = PydanticField(default=None, gt=0)
 
     @model_validator(mode="after")
     def check_either_field(cls: Any, values: Any) -> Any:
@@ -17,6 +17,7 @@ from starlette.middleware.cors import CORSMiddleware
 from app.api.main import api_router
 from app.core.config import settings
 from app.core.db import engine, init_db, init_modelprovider_model_db
+from app.core.rag.qdrant import close_async_qdrant_client
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -35,6 +36,7 @@ async def lifespan(app: FastAPI):
         init_modelprovider_model_db(session)
     yield
     # Shutdown
+    await close_async_qdrant_client()
 
 
 app = FastAPI(
@@ -6,6 +6,8 @@ from sqlmodel import Session
 from app.core.celery_app import celery_app
 from app.core.db import engine
 from app.core.rag.qdrant import QdrantStore
+from app.core.rag.reindex import reindex_collection
+from app.core.rag.retrieval_cache import retrieval_cache
 from app.db.models import Upload, UploadStatus
 
 logger = logging.getLogger(__name__)
@@ -31,6 +33,8 @@ def add_upload(
             session.add(upload)
             session.commit()
         finally:
+            # 无论成功与否都使该上传的检索缓存失效（可能已部分写入）
+            retrieval_cache.bump_upload_version(upload_id)
             if os.path.exists(file_path):
                 os.remove(file_path)
 
@@ -59,6 +63,7 @@ def edit_upload(
             session.add(upload)
             session.commit()
         finally:
+            retrieval_cache.bump_upload_version(upload_id)
             if os.path.exists(file_path):
                 os.remove(file_path)
 
@@ -98,6 +103,14 @@ def remove_upload(upload_id: int, user_id: int) -> None:
             upload.status = UploadStatus.FAILED
             session.add(upload)
             session.commit()
+        finally:
+            retrieval_cache.bump_upload_version(upload_id)
+
+
+@celery_app.task
+def reindex_embeddings(provider: str, batch_size: int = 64, drop_old: bool = False):
+    """Re-embed all uploads with another provider and switch to it"""
+    return reindex_collection(provider, batch_size, drop_old)
 
 
 @celery_app.task
@@ -109,22 +122,28 @@ def perform_search(
     top_k: int,
     score_threshold: float,
 ):
-    qdrant_store = QdrantStore()
-    if search_type == "vector":
-        results = qdrant_store.vector_search(
-            user_id, [upload_id], query, top_k, score_threshold
-        )
-    elif search_type == "fulltext":
-        results = qdrant_store.fulltext_search(
-            user_id, [upload_id], query, top_k, score_threshold
-        )
-    elif search_type == "hybrid":
-        results = qdrant_store.hybrid_search(
-            user_id, [upload_id], query, top_k, score_threshold
-        )
-    else:
+    if search_type not in ["vector", "fulltext", "hybrid"]:
         raise ValueError(f"Invalid search type: {search_type}")
 
+    def search():
+        qdrant_store = QdrantStore()
+        if search_type == "vector":
+            return qdrant_store.vector_search(
+                user_id, [upload_id], query, top_k, score_threshold, use_cache=False
+            )
+        elif search_type == "fulltext":
+            return qdrant_store.fulltext_search(
+                user_id, [upload_id], query, top_k, score_threshold, use_cache=False
+            )
+        return qdrant_store.hybrid_search(
+            user_id, [upload_id], query, top_k, score_threshold, use_cache=False
+        )
+
+    # 先查缓存，命中时无需初始化 QdrantStore 和 embedding 模型
+    results = retrieval_cache.get_or_search(
+        user_id, [upload_id], query, search_type, top_k, score_threshold, search
+    )
+
     return [
         {"content": doc.page_content, "score": doc.metadata.get("score", 0)}
         for doc in results
@@ -0,0 +1,141 @@
+"""Benchmark initialize_graph on large generated workflows.
+
+Usage (from the backend directory):
+
+    python scripts/benchmark_build_workflow.py --nodes 1000 --concurrency 4
+
+The generated workflow repeats a block of answer / if-else / parallel-join
+nodes, so it exercises plain edges, conditional edges and waiting edges
+without touching the database or any model provider.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.workflow.build_workflow import initialize_graph  # noqa: E402
+
+# 每个 block 包含的节点数：answer, ifelse, true/false 分支, 两个并行分支, join
+NODES_PER_BLOCK = 7
+
+
+def _answer(node_id: str, text: str) -> dict[str, Any]:
+    return {"id": node_id, "type": "answer", "data": {"answer": text}}
+
+
+def make_workflow(num_nodes: int) -> dict[str, Any]:
+    """Build a workflow config with roughly `num_nodes` nodes"""
+    nodes: list[dict[str, Any]] = [{"id": "start", "type": "start", "data": {}}]
+    edges: list[dict[str, Any]] = []
+
+    def connect(source: str, target: str, source_handle: str | None = None):
+        edge = {"source": source, "target": target, "type": "default"}
+        if source_handle:
+            edge["sourceHandle"] = source_handle
+        edges.append(edge)
+
+    previous = "start"
+    for block in range(max(1, num_nodes // NODES_PER_BLOCK)):
+        prefix = f"b{block}"
+        head = f"{prefix}-answer"
+        nodes.append(_answer(head, f"${{{previous}.response}} {block}"))
+        connect(previous, head)
+
+        # if-else 分支
+        ifelse = f"{prefix}-ifelse"
+        nodes.append(
+            {
+                "id": ifelse,
+                "type": "ifelse",
+                "data": {
+                    "cases": [
+                        {
+                            "case_id": "true",
+                            "logical_operator": "and",
+                            "conditions": [
+                                {
+                                    "field": f"${{{head}.response}}",
+                                    "comparison_operator": "contains",
+                                    "value": str(block),
+                                    "compareType": "constant",
+                                }
+                            ],
+                        },
+                        {"case_id": "false_else", "conditions": []},
+                    ]
+                },
+            }
+        )
+        connect(head, ifelse)
+        on_true, on_false = f"{prefix}-true", f"{prefix}-false"
+        nodes.append(_answer(on_true, "true"))
+        nodes.append(_answer(on_false, "false"))
+        connect(ifelse, on_true, "true")
+        connect(ifelse, on_false, "false_else")
+
+        # 并行分支 + join 汇合
+        left, right, join = f"{prefix}-left", f"{prefix}-right", f"{prefix}-join"
+        nodes.append(_answer(left, "left"))
+        nodes.append(_answer(right, "right"))
+        nodes.append({"id": join, "type": "join", "data": {"mode": "all"}})
+        for branch in (on_true, on_false):
+            connect(branch, left)
+            connect(branch, right)
+        connect(left, join)
+        connect(right, join)
+        previous = join
+
+    nodes.append({"id": "end", "type": "end", "data": {}})
+    connect(previous, "end")
+
+    return {
+        "id": 0,
+        "name": f"benchmark-{num_nodes}",
+        "nodes": nodes,
+        "edges": edges,
+        "metadata": {},
+    }
+
+
+async def _timed_build(config: dict[str, Any]) -> float:
+    start = time.perf_counter()
+    await initialize_graph(config, checkpointer=None)
+    return time.perf_counter() - start
+
+
+async def main(num_nodes: int, repeat: int, concurrency: int) -> None:
+    print(f"{'nodes':>8} {'edges':>8} {'median(s)':>10} {'min(s)':>8}")
+    for size in sorted({num_nodes // 4, num_nodes // 2, num_nodes, num_nodes * 2}):
+        config = make_workflow(size)
+        timings = [await _timed_build(config) for _ in range(repeat)]
+        print(
+            f"{len(config['nodes']):>8} {len(config['edges']):>8} "
+            f"{statistics.median(timings):>10.3f} {min(timings):>8.3f}"
+        )
+
+    # 并发构建不同的工作流，验证构建过程互不干扰
+    configs = [make_workflow(num_nodes) for _ in range(concurrency)]
+    start = time.perf_counter()
+    graphs = await asyncio.gather(
+        *(initialize_graph(config, checkpointer=None) for config in configs)
+    )
+    elapsed = time.perf_counter() - start
+    for config, graph in zip(configs, graphs, strict=True):
+        # 编译后的图额外包含 __start__ / __end__ 节点
+        assert len(graph.get_graph().nodes) >= len(config["nodes"])
+    print(f"{concurrency} concurrent builds of {num_nodes} nodes: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.nodes, args.repeat, args.concurrency))
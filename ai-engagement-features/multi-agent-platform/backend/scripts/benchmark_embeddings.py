@@ -0,0 +1,69 @@
+"""Compare CPU throughput of the local embedding backends.
+
+Usage (from the backend directory):
+
+    python scripts/benchmark_embeddings.py --texts 2000 --backends local fastembed
+
+Embeds the same synthetic chunks with each backend the way ingestion does
+(embed_documents over the whole upload) and reports chunks per second. Model
+loading is timed separately, since workers load a model once per process.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.rag.embeddings import get_embedding_model  # noqa: E402
+
+WORDS = (
+    "知识库 检索 向量 模型 文档 上传 工作流 智能体 agent workflow retrieval "
+    "embedding document chunk query latency throughput batch worker"
+).split()
+
+
+def make_texts(count: int, words_per_text: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(words_per_text)) for _ in range(count)
+    ]
+
+
+def benchmark(backend: str, texts: list[str], repeat: int) -> None:
+    start = time.perf_counter()
+    embedding_model = get_embedding_model(backend)
+    load_time = time.perf_counter() - start
+
+    # 预热一次，排除首次推理的初始化开销
+    embedding_model.embed_documents(texts[:8])
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embedding_model.embed_documents(texts)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(
+        f"{backend:>10} {embedding_model.dimension:>6} {load_time:>8.2f} "
+        f"{best:>8.2f} {len(texts) / best:>10.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=["local", "fastembed"])
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, args.words)
+    print(f"{'backend':>10} {'dim':>6} {'load(s)':>8} {'run(s)':>8} {'chunks/s':>10}")
+    for backend in args.backends:
+        benchmark(backend, texts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure the cold import cost of the builtin tool catalog.
+
+Usage (from the backend directory):
+
+    python scripts/benchmark_tool_import.py --repeat 5
+
+Each run imports app.core.tools.tool_manager in a fresh interpreter, once
+reading the generated manifest and once scanning every tool package
+(TOOL_MANIFEST_ENABLED=false, the previous behaviour). It reports the best
+import time, how many modules were loaded, and which tool SDKs were imported.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# 在全新的解释器中执行，避免受已导入模块的影响
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.core.tools.tool_manager
+elapsed = time.perf_counter() - start
+sdks = sorted(name for name in ("zhipuai", "numexpr", "pytz") if name in sys.modules)
+print(json.dumps({"seconds": elapsed, "modules": len(sys.modules), "sdks": sdks}))
+"""
+
+
+def run_probe(manifest_enabled: bool) -> dict:
+    env = dict(os.environ, TOOL_MANIFEST_ENABLED=str(manifest_enabled).lower())
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'import(s)':>10} {'modules':>8}  tool sdks")
+    for mode, manifest_enabled in (("manifest", True), ("scan", False)):
+        results = [run_probe(manifest_enabled) for _ in range(args.repeat)]
+        best = min(results, key=lambda result: result["seconds"])
+        print(
+            f"{mode:>10} {best['seconds']:>10.3f} {best['modules']:>8}  "
+            f"{', '.join(best['sdks']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Generate app/core/tools/manifest.json from the builtin tool packages.
+
+Usage (from the backend directory):
+
+    python scripts/generate_tool_manifest.py          # rewrite the manifest
+    python scripts/generate_tool_manifest.py --check  # fail if it is stale
+
+The API and Celery workers read provider and tool metadata from the manifest
+and import a tool package only when one of its tools is first used. Run this
+after adding or changing a tool; the --check mode runs in scripts/lint.sh so
+a stale manifest fails the build.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.tools.tool_manager import MANIFEST_PATH, ToolManager  # noqa: E402
+
+
+def render_manifest() -> str:
+    manifest = ToolManager.build_manifest()
+    return json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    content = render_manifest()
+    if args.check:
+        try:
+            current = Path(MANIFEST_PATH).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            current = ""
+        if current != content:
+            sys.exit(
+                f"{MANIFEST_PATH} is out of date, "
+                "run scripts/generate_tool_manifest.py"
+            )
+        print(f"{MANIFEST_PATH} is up to date")
+        return
+
+    Path(MANIFEST_PATH).write_text(content, encoding="utf-8")
+    print(f"Wrote {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,4 +5,5 @@ set -x
 
 mypy app
 ruff app
-ruff format app --check
\ No newline at end of file
+ruff format app --check
+python scripts/generate_tool_manifest.py --check
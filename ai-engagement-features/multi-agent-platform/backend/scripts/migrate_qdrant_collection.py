@@ -0,0 +1,33 @@
+"""Apply the QDRANT_* storage and index settings to the existing collection.
+
+Usage (from the backend directory):
+
+    QDRANT_QUANTIZATION=scalar QDRANT_ON_DISK=true \
+        python scripts/migrate_qdrant_collection.py
+
+New collections get these settings on creation; this script updates a
+collection created before they were set. Qdrant rebuilds the segments in the
+background, so searches keep working while the optimizer runs.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.rag.qdrant import QdrantStore  # noqa: E402
+
+
+def main() -> None:
+    qdrant_store = QdrantStore()
+    before = qdrant_store.get_collection_info().config
+    qdrant_store.migrate_collection_config()
+    after = qdrant_store.get_collection_info()
+    print(f"collection: {qdrant_store.collection_name}")
+    print(f"before: {before}")
+    print(f"after:  {after.config}")
+    print(f"status: {after.status} (optimizer: {after.optimizer_status})")
+
+
+if __name__ == "__main__":
+    main()
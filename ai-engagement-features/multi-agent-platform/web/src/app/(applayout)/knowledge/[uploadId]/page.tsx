@@ -65,6 +65,7 @@ function KnowledgeTest() {
   const [topK, setTopK] = useState(5);
   const [scoreThreshold, setScoreThreshold] = useState(0.5);
   const [searchTaskId, setSearchTaskId] = useState<string | null>(null);
+  const [inlineResults, setInlineResults] = useState<any>(null);
   const [isOptionsVisible, setIsOptionsVisible] = useState(false);
   const { t } = useTranslation();
 
@@ -92,7 +93,7 @@ function KnowledgeTest() {
       topK: number;
       scoreThreshold: number;
     }) =>
-      UploadsService.searchUpload({
+      UploadsService.searchUploadSync({
         uploadId: Number(uploadId),
         requestBody: {
           query: searchParams.query,
@@ -103,7 +104,14 @@ function KnowledgeTest() {
       }),
     {
       onSuccess: (data) => {
-        setSearchTaskId(data.task_id);
+        // 向量检索直接返回结果，全文/混合检索仍需轮询任务
+        if (data.status === "completed") {
+          setInlineResults(data);
+          setSearchTaskId(null);
+        } else {
+          setInlineResults(null);
+          setSearchTaskId(data.task_id);
+        }
       },
       onError: (error: ApiError) => {
         showToast(
@@ -115,7 +123,7 @@ function KnowledgeTest() {
     },
   );
 
-  const { data: searchResults, refetch: refetchSearchResults } = useQuery(
+  const { data: polledResults, refetch: refetchSearchResults } = useQuery(
     ["searchResults", searchTaskId],
     () =>
       UploadsService.getSearchResults({
@@ -129,10 +137,12 @@ function KnowledgeTest() {
   );
 
   useEffect(() => {
-    if (searchResults?.status === "completed") {
-      queryClient.setQueryData(["searchResults", searchTaskId], searchResults);
+    if (polledResults?.status === "completed") {
+      queryClient.setQueryData(["searchResults", searchTaskId], polledResults);
     }
-  }, [searchResults, searchTaskId, queryClient]);
+  }, [polledResults, searchTaskId, queryClient]);
+
+  const searchResults = inlineResults ?? polledResults;
 
   const handleSearch = () => {
     if (!query.trim()) {
@@ -148,6 +148,35 @@ export class UploadsService {
         });
     }
 
+    /**
+     * Search Upload Sync
+     * Search within a specific upload and return the results inline.
+     * Full-text and hybrid searches scan the whole upload in Python, so they
+     * are still handed to Celery and return a task id to poll.
+     * @returns any Successful Response
+     * @throws ApiError
+     */
+    public static searchUploadSync({
+        uploadId,
+        requestBody,
+    }: {
+        uploadId: number,
+        requestBody: Record<string, any>,
+    }): CancelablePromise<any> {
+        return __request(OpenAPI, {
+            method: 'POST',
+            url: '/api/v1/uploads/{upload_id}/search/sync',
+            path: {
+                'upload_id': uploadId,
+            },
+            body: requestBody,
+            mediaType: 'application/json',
+            errors: {
+                422: `Validation Error`,
+            },
+        });
+    }
+
     /**
      * Get Search Results
      * Retrieve the results of an asynchronous search task.